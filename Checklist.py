@@ -1,8 +1,13 @@
 from flask import Flask, abort, request, jsonify, Blueprint, current_app
 from shared_models import Article, Checklist, AdminUser, PlatformChecklist, PlatformChecklistQuestion, db,  ChecklistQuestion
+from cache_utils import PLATFORM_CHECKLIST_CACHE, cached_response, invalidate_cache
+from diagram_utils import diagram_urls, schedule_diagram_render
+from question_tree import QuestionTreeError, apply_links, insert_questions, write_question_tree
+from pagination_utils import CursorError, cursor_requested, paginate_by_cursor, total_requested
 from flask_login import current_user,login_required
 from datetime import datetime as dt
-from sqlalchemy import text
+from sqlalchemy import func
+from collections import defaultdict
 import json
 
 checklist_bp = Blueprint('checklist', __name__)
@@ -23,22 +28,39 @@ def get_checklists():
         Checklist.description,
         Checklist.version,
         Checklist.share_status,
-        Checklist.share_requested_at
+        Checklist.share_requested_at,
+        Checklist.created_at
     )
     query = query.filter(Checklist.share_status=='review')
     query = query.group_by(Checklist.id).order_by(Checklist.created_at.desc())
+
+    def serialize(items):
+        # 将查询结果转换为字典列表
+        return [{
+            'id': item.id,
+            'name': item.name,
+            'description': item.description,
+            'version': item.version,
+            'share_status': item.share_status,
+            'share_requested_at': item.share_requested_at.isoformat() if item.share_requested_at else None
+        } for item in items]
+
+    if cursor_requested():
+        # 游标分页：按 (created_at, id) 定位下一页，不做 OFFSET
+        try:
+            keyset = paginate_by_cursor(query, [(Checklist.created_at, True), (Checklist.id, True)], page_size)
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'checklists': serialize(keyset.items),
+            'next_cursor': keyset.next_cursor,
+            'has_more': keyset.has_more,
+            'total_items': keyset.total
+        }), 200
     
     # 分页处理
     paginated_checklists = query.paginate(page=page, per_page=page_size, error_out=False)
-    # 将查询结果转换为字典列表
-    checklists = [{
-        'id': item.id,
-        'name': item.name,
-        'description': item.description,
-        'version': item.version,
-        'share_status': item.share_status,
-        'share_requested_at': item.share_requested_at.isoformat() if item.share_requested_at else None
-    } for item in paginated_checklists.items]
+    checklists = serialize(paginated_checklists.items)
 
     return jsonify({
         'checklists': checklists,
@@ -136,6 +158,10 @@ def handle_review_checklist():
                 response_data = {"message": "Checklist rejected"}
         
         db.session.commit()
+        invalidate_cache(PLATFORM_CHECKLIST_CACHE)
+        if action == 'approve':
+            # 发布后在后台预渲染流程图
+            schedule_diagram_render(response_data['platform_checklist_id'])
         return jsonify(response_data), 200
 
     except Exception as e:
@@ -144,135 +170,143 @@ def handle_review_checklist():
         return jsonify({"error": f"Review failed: {str(e)}"}), 500
 
 def clone_questions(platform_checklist_id, questions):
+    """
+    将用户清单的问题克隆到平台清单，返回 {原始问题ID: 新问题ID}。
+    无论问题数量多少，都只执行固定条数的语句：批量插入取回ID，再用一条 UPDATE 回写有父问题或 follow-up 关系的问题。
+    """
     # 准备批量插入数据
-    questions_to_create = []
-    id_mapping = {}  # 原始ID -> 新ID索引
-    parent_mapping = {}  # 新ID索引 -> 原始父ID
-    follow_up_mapping = {}  # 原始问题ID -> follow_up_questions
-
-    # 收集问题数据和关系
-    for question in questions:
-        # 记录原始问题ID对应的索引位置
-        orig_id = question.id
-        idx = len(questions_to_create)
-        id_mapping[orig_id] = idx
-        
-        # 记录父关系（如果有）
-        if question.parent_id:
-            parent_mapping[idx] = question.parent_id
-        
-        # 记录follow_up关系（如果有）
-        if question.follow_up_questions:
-            follow_up_mapping[orig_id] = question.follow_up_questions
-        
-        # 准备问题数据
-        question_data = {
-            'checklist_id': platform_checklist_id,
-            'type': question.type,
-            'question': question.question,
-            'description': question.description,
-            'options': question.options.copy() if question.options else None
-        }
-        questions_to_create.append(question_data)
-    
-    # 批量插入问题
-    db.session.bulk_insert_mappings(PlatformChecklistQuestion, questions_to_create)
-    db.session.flush()
-    
-    # 获取批量生成的ID（MySQL版本）
-    result = db.session.execute(text("SELECT LAST_INSERT_ID()"))
-    first_id = result.scalar()
-    
-    # 计算所有生成的ID
-    question_ids = [first_id + i for i in range(len(questions_to_create))]
-    
+    questions_to_create = [{
+        'checklist_id': platform_checklist_id,
+        'type': question.type,
+        'question': question.question,
+        'description': question.description,
+        'options': question.options.copy() if question.options else None
+    } for question in questions]
+
+    # 批量插入问题并取回真实ID
+    question_ids = insert_questions(questions_to_create)
+
     # 构建真实ID映射 {原始ID: 新ID}
-    real_id_mapping = {}
-    for orig_id, idx in id_mapping.items():
-        real_id_mapping[orig_id] = question_ids[idx]
-    
-    # 批量更新父关系
-    parent_updates = []
-    for idx, parent_orig_id in parent_mapping.items():
-        if parent_orig_id in real_id_mapping:
-            parent_updates.append({
-                'id': question_ids[idx],
-                'parent_id': real_id_mapping[parent_orig_id]
-            })
-    
-    if parent_updates:
-        db.session.bulk_update_mappings(PlatformChecklistQuestion, parent_updates)
-    
-    # 批量更新follow-up关系
-    follow_up_updates = []
-    for orig_id, follow_dict in follow_up_mapping.items():
-        if orig_id not in real_id_mapping:
-            continue
-            
-        new_question_id = real_id_mapping[orig_id]
+    real_id_mapping = {question.id: new_id for question, new_id in zip(questions, question_ids)}
+
+    # 映射父关系和follow-up关系
+    links = {}
+    for question, new_id in zip(questions, question_ids):
+        parent_id = real_id_mapping.get(question.parent_id) if question.parent_id else None
+
         processed_follow_ups = {}
-        
-        for opt_index, child_ids in follow_dict.items():
+        for opt_index, child_ids in (question.follow_up_questions or {}).items():
             # 映射每个子问题的ID
-            new_child_ids = [real_id_mapping[child_id] for child_id in child_ids 
+            new_child_ids = [real_id_mapping[child_id] for child_id in child_ids
                            if child_id in real_id_mapping]
             if new_child_ids:
                 processed_follow_ups[opt_index] = new_child_ids
-        
-        if processed_follow_ups:
-            follow_up_updates.append({
-                'id': new_question_id,
-                'follow_up_questions': processed_follow_ups
-            })
-    
-    if follow_up_updates:
-        db.session.bulk_update_mappings(PlatformChecklistQuestion, follow_up_updates)
-    
+
+        if parent_id is not None or processed_follow_ups:
+            links[new_id] = (parent_id, processed_follow_ups or None)
+
+    apply_links(links)
     return real_id_mapping
     
 @checklist_bp.route('/platform_checklists', methods=['GET'])
+@cached_response(PLATFORM_CHECKLIST_CACHE, lambda: 'list:{}:{}:{}:{}:{}'.format(
+    request.args.get('page', 1, type=int),
+    request.args.get('page_size', 10, type=int),
+    request.args.get('versions_limit', type=int),
+    request.args.get('cursor'),
+    total_requested()))
 def get_platform_checklists():
+    """
+    分页查询平台清单主版本及其子版本。
+    可选参数 versions_limit：每个清单族只返回最新的 N 个子版本，不传则返回全部子版本。
+    传 cursor 参数时使用游标分页（首页传空字符串），响应中返回 next_cursor。
+    """
     page = request.args.get('page', 1, type=int)
     page_size = request.args.get('page_size', 10, type=int)
+    versions_limit = request.args.get('versions_limit', type=int)
 
     # 查询主版本 (parent_id 为 null 表示主版本)
-    paginated_checklists = PlatformChecklist.query.filter_by(parent_id=None).order_by(PlatformChecklist.created_at.desc()).paginate(page=page, per_page=page_size, error_out=False)
+    query = PlatformChecklist.query.filter_by(parent_id=None)
+    if cursor_requested():
+        try:
+            keyset = paginate_by_cursor(query, [(PlatformChecklist.created_at, True), (PlatformChecklist.id, True)], page_size)
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'checklists': serialize_platform_checklists(keyset.items, versions_limit),
+            'next_cursor': keyset.next_cursor,
+            'has_more': keyset.has_more,
+            'total_items': keyset.total
+        }), 200
+
+    paginated_checklists = query.order_by(PlatformChecklist.created_at.desc()).paginate(page=page, per_page=page_size, error_out=False)
+
+    return jsonify({
+        'checklists': serialize_platform_checklists(paginated_checklists.items, versions_limit),
+        'total_pages': paginated_checklists.pages,
+        'current_page': paginated_checklists.page,
+        'total_items': paginated_checklists.total
+    }), 200
+
+def serialize_platform_checklists(checklists, versions_limit=None):
+    # 一次查询取出本页所有主版本的子版本，避免逐个主版本查询
+    parent_ids = [checklist.id for checklist in checklists]
+    children_by_parent = load_child_versions(parent_ids, versions_limit)
 
     checklist_data = []
-    
-    # 遍历主版本并查询其子版本
-    for checklist in paginated_checklists.items:
-        checklist_info = {
+    for checklist in checklists:
+        checklist_data.append({
             'id': checklist.id,
             'name': checklist.name,
             'description': checklist.description,
             'clone_count':checklist.clone_count,
             'version': checklist.version,
             'can_update': True,
-            'versions': []  # 初始化子版本列表
-        }
-
-        # 查询当前主版本的子版本
-        child_checklists = PlatformChecklist.query.filter_by(parent_id=checklist.id).order_by(PlatformChecklist.version.desc()).all()
-        
-        # 将子版本添加到主版本中
-        for child in child_checklists:
-            checklist_info['versions'].append({
+            'versions': [{
                 'id': child.id,
                 'version': child.version,
                 'description': child.description,
                 'clone_count': child.clone_count,
                 'can_update': False
-            })
-        
-        checklist_data.append(checklist_info)
+            } for child in children_by_parent.get(checklist.id, [])]
+        })
+    return checklist_data
 
-    return jsonify({
-        'checklists': checklist_data,
-        'total_pages': paginated_checklists.pages,
-        'current_page': paginated_checklists.page,
-        'total_items': paginated_checklists.total
-    }), 200
+def load_child_versions(parent_ids, versions_limit=None):
+    """
+    批量查询多个主版本的子版本，返回 {parent_id: [子版本, ...]}，子版本按版本号降序排列。
+    versions_limit 为正数时，使用窗口函数在数据库中只保留每个清单族最新的 N 个版本。
+    """
+    children_by_parent = defaultdict(list)
+    if not parent_ids:
+        return children_by_parent
+
+    columns = (
+        PlatformChecklist.id,
+        PlatformChecklist.parent_id,
+        PlatformChecklist.version,
+        PlatformChecklist.description,
+        PlatformChecklist.clone_count
+    )
+    if versions_limit is not None and versions_limit > 0:
+        row_number = func.row_number().over(
+            partition_by=PlatformChecklist.parent_id,
+            order_by=PlatformChecklist.version.desc()
+        ).label('row_number')
+        ranked = db.session.query(*columns, row_number).filter(
+            PlatformChecklist.parent_id.in_(parent_ids)
+        ).subquery()
+        rows = db.session.query(
+            ranked.c.id, ranked.c.parent_id, ranked.c.version, ranked.c.description, ranked.c.clone_count
+        ).filter(ranked.c.row_number <= versions_limit).order_by(ranked.c.parent_id, ranked.c.version.desc()).all()
+    else:
+        rows = db.session.query(*columns).filter(
+            PlatformChecklist.parent_id.in_(parent_ids)
+        ).order_by(PlatformChecklist.parent_id, PlatformChecklist.version.desc()).all()
+
+    for row in rows:
+        children_by_parent[row.parent_id].append(row)
+    return children_by_parent
 
 @checklist_bp.route('/platform_checklists', methods=['POST'])
 @login_required
@@ -288,66 +322,23 @@ def create_platform_checklist():
 
     checklist = PlatformChecklist(user_id=current_user.id,name=name,mermaid_code=mermaid_code, description=description, version=1)
     db.session.add(checklist)
-    db.session.commit()
+    db.session.flush()  # 获取新 checklist 的 id
 
-    # 临时ID到真实ID的映射
-    id_mapping = {}
-    parent_mapping = {}  # 存储问题与其父问题的关系
-    # 第一遍：创建所有问题（不处理关系）
-    for item in questions:
-        question_text = item.get('question')
-        description_text = item.get('description', '')  # 默认为空字符串
-
-        # 检查问题内容是否有效
-        if not question_text:
-            return jsonify({'error': 'Each question must have text'}), 400
-
-        question = PlatformChecklistQuestion(
-            checklist_id=checklist.id,
-            type=item.get('type', 'text'),
-            question=question_text,
-            description=description_text,  # 将描述信息一起保存
-            options=item.get('options', []) if item.get('type') == 'choice' else None
-        )
-        db.session.add(question)
-        db.session.flush()  # 生成ID但不提交事务
-        
-        if 'tempId' in item:
-            id_mapping[item['tempId']] = question.id
-                # 记录父问题信息
-        if 'parentTempId' in item:
-            parent_mapping[question.id] = item['parentTempId']    
-
-    # 第二遍：建立层级关系
-    for question_id, parent_temp_id in parent_mapping.items():
-        if parent_temp_id in id_mapping:
-            question = PlatformChecklistQuestion.query.get(question_id)
-            question.parent_id = id_mapping[parent_temp_id]
-            
-    # 第三遍：处理选择题的follow-up关系
-    for item in questions:
-        if item.get('type') != 'choice' or 'tempId' not in item:
-            continue
-            
-        question_id = id_mapping[item['tempId']]
-        question = PlatformChecklistQuestion.query.get(question_id)
-        
-        # 处理follow-up问题
-        follow_ups = {}
-        for opt_index, follow_ids in item.get('followUpQuestions', {}).items():
-            if isinstance(follow_ids, list):  # 处理数组形式的follow-up IDs
-                follow_ups[opt_index] = [id_mapping[id] for id in follow_ids if id in id_mapping]
-            elif follow_ids in id_mapping:  # 处理单个ID的情况（向后兼容）
-                follow_ups[opt_index] = [id_mapping[follow_ids]]
-        
-        question.follow_up_questions = follow_ups if follow_ups else None
+    try:
+        id_mapping = write_question_tree(checklist.id, questions)
+    except QuestionTreeError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
 
     db.session.commit()
+    invalidate_cache(PLATFORM_CHECKLIST_CACHE)
+    schedule_diagram_render(checklist.id)
     return jsonify({'message': 'Checklist created successfully', 'checklist_id': checklist.id,
         'id_mapping': id_mapping}), 201
 
 
 @checklist_bp.route('/platform_checklists/<int:checklist_id>', methods=['GET'])
+@cached_response(PLATFORM_CHECKLIST_CACHE, lambda checklist_id: f'detail:{checklist_id}')
 def get_platform_checklist_details(checklist_id):
     """
     获取最新 Checklist 的详细信息。
@@ -384,7 +375,9 @@ def get_platform_checklist_details(checklist_id):
         'description': latest_version.description,
         'version': latest_version.version,
         'questions': questions_data,
-        'versions': versions_data
+        'versions': versions_data,
+        'diagram_status': latest_version.diagram_status,
+        **diagram_urls(latest_version)
     }), 200
 
 @checklist_bp.route('/platform_checklists/<int:id>', methods=['PUT'])
@@ -418,60 +411,16 @@ def update_platform_checklist(id):
     db.session.flush()  # 获取新 checklist 的 id
 
     questions = data.get('questions', [])
-    id_mapping = {}  # tempId to real ID mapping
-    parent_mapping = {}  # child question ID to parent tempId
-    # 添加问题
-    for item in questions:
-        question_text = item.get('question')
-        description_text = item.get('description', '')  # 默认为空字符串
-
-        # 检查问题内容是否有效
-        if not question_text:
-            return jsonify({'error': 'Each question must have text'}), 400
-
-        question = PlatformChecklistQuestion(
-            checklist_id=new_checklist.id,
-            type=item.get('type', 'text'),
-            question=question_text,
-            description=description_text,  # 将描述信息一起保存
-            options=item.get('options', []) if item.get('type') == 'choice' else None
-
-        )
-        db.session.add(question)
-        db.session.flush()
-        # 记录所有可能的ID映射关系
-        if 'tempId' in item:  # 新问题
-            id_mapping[str(item['tempId'])] = question.id
-        
-        # 记录父问题关系
-        if 'parentTempId' in item:
-            parent_mapping[question.id] = str(item['parentTempId'])
-    
-    # Second pass: establish parent-child relationships
-    for question_id, parent_temp_id in parent_mapping.items():
-        if parent_temp_id in id_mapping:
-            question = PlatformChecklistQuestion.query.get(question_id)
-            question.parent_id = id_mapping[parent_temp_id]
-
-    # Third pass: process follow-up questions for choice questions
-    for item in questions:
-        if item.get('type') != 'choice' or 'tempId' not in item:
-            continue
-            
-        question_id = id_mapping[item['tempId']]
-        question = PlatformChecklistQuestion.query.get(question_id)
-        
-        follow_ups = {}
-        for opt_index, follow_ids in item.get('followUpQuestions', {}).items():
-            if isinstance(follow_ids, list):  # 处理数组形式的follow-up IDs
-                follow_ups[opt_index] = [id_mapping[str(id)] for id in follow_ids if str(id) in id_mapping]
-            elif follow_ids in id_mapping:  # 处理单个ID的情况（向后兼容）
-                follow_ups[opt_index] = [id_mapping[follow_ids]]
-        
-        question.follow_up_questions = follow_ups if follow_ups else None
+    try:
+        id_mapping = write_question_tree(new_checklist.id, questions)
+    except QuestionTreeError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
 
     try:
         db.session.commit()
+        invalidate_cache(PLATFORM_CHECKLIST_CACHE)
+        schedule_diagram_render(new_checklist.id)
         return jsonify({'message': 'Checklist updated successfully',
             'checklist_id': new_checklist.id,
             'id_mapping': id_mapping}), 200
@@ -512,6 +461,8 @@ def edit_checklist(id):
             db.session.add(checklist)
         
         db.session.commit()
+        invalidate_cache(PLATFORM_CHECKLIST_CACHE)
+        schedule_diagram_render(checklist.id)
         
         return jsonify({
             'message': 'Checklist updated successfully',
@@ -583,6 +534,7 @@ def delete_platform_checklist_with_children(checklist_id):
             db.session.delete(version)
 
         db.session.commit()
+        invalidate_cache(PLATFORM_CHECKLIST_CACHE)
         return jsonify({'message': 'Parent checklist and all related versions deleted successfully.'}), 200
 
     except Exception as e:
@@ -604,6 +556,7 @@ def delete_platform_single_checklist(checklist_id):
         # 删除当前 Checklist
         db.session.delete(checklist)
         db.session.commit()
+        invalidate_cache(PLATFORM_CHECKLIST_CACHE)
         return jsonify({'message': 'Checklist deleted successfully.'}), 200
 
     except Exception as e:
@@ -2,7 +2,10 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime as dt, timedelta
+from collections import defaultdict
+from sqlalchemy import func
 from shared_models import db, User, FreezeRecord
+from pagination_utils import CursorError, cursor_requested, paginate_by_cursor
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -15,14 +18,68 @@ def get_users():
     query = User.query
     search = request.args.get('search')
     if search:
-        query = query.filter(
-            (User.username.ilike(f'%{search}%')) | 
-            (User.email.ilike(f'%{search}%')))
-    
+        query = query.filter(user_search_condition(search))
+    
+    if cursor_requested():
+        # 游标分页：按 (created_at, id) 倒序
+        try:
+            users = paginate_by_cursor(query, [(User.created_at, True), (User.id, True)], per_page)
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'users': serialize_users(users.items),
+            'total': users.total,
+            'next_cursor': users.next_cursor,
+            'has_more': users.has_more
+        })
+
     users = query.paginate(page=page, per_page=per_page, error_out=False)
     
+    return jsonify({
+        'users': serialize_users(users.items),
+        'total': users.total,
+        'pages': users.pages,
+        'current_page': users.page
+    })
+
+def user_search_condition(search):
+    """
+    默认按前缀匹配用户名或邮箱（LIKE 'xxx%'），可以使用 username/email 上的唯一索引；
+    以 * 或 % 开头时按包含匹配（LIKE '%xxx%'），需要扫描全表。
+    """
+    contains = search[0] in '*%'
+    term = search.lstrip('*%')
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    pattern = f'%{escaped}%' if contains else f'{escaped}%'
+    # MySQL 默认排序规则不区分大小写，直接使用 LIKE 才能走索引（ILIKE 会对列做 lower()）
+    return User.username.like(pattern, escape='\\') | User.email.like(pattern, escape='\\')
+
+def latest_freeze_records(user_ids, limit=3):
+    """一次查询取出每个用户最新的 limit 条冻结记录，返回 {user_id: [记录, ...]}"""
+    records_by_user = defaultdict(list)
+    if not user_ids:
+        return records_by_user
+
+    row_number = func.row_number().over(
+        partition_by=FreezeRecord.user_id,
+        order_by=(FreezeRecord.created_at.desc(), FreezeRecord.id.desc())
+    ).label('row_number')
+    ranked = db.session.query(FreezeRecord.id, row_number).filter(
+        FreezeRecord.user_id.in_(user_ids)
+    ).subquery()
+    records = FreezeRecord.query.join(ranked, FreezeRecord.id == ranked.c.id).filter(
+        ranked.c.row_number <= limit
+    ).order_by(FreezeRecord.user_id, FreezeRecord.created_at.desc(), FreezeRecord.id.desc()).all()
+
+    for record in records:
+        records_by_user[record.user_id].append(record)
+    return records_by_user
+
+def serialize_users(users):
+    # 本页所有用户的冻结记录一次查出，避免逐个用户查询
+    records_by_user = latest_freeze_records([user.id for user in users])
     users_data = []
-    for user in users.items:
+    for user in users:
         users_data.append({
             'id': user.id,
             'username': user.username,
@@ -38,15 +95,9 @@ def get_users():
                 'duration': record.duration,
                 'admin_id': record.admin_id,
                 'created_at': record.created_at.isoformat()
-            } for record in user.freeze_records.limit(3).all()]
+            } for record in records_by_user.get(user.id, [])]
         })
-    
-    return jsonify({
-        'users': users_data,
-        'total': users.total,
-        'pages': users.pages,
-        'current_page': users.page
-    })
+    return users_data
 
 @admin_bp.route('/users/<int:user_id>/freeze', methods=['POST'])
 @login_required
@@ -1,108 +1,119 @@
 import base64
-from flask import Flask, request, jsonify, render_template, send_from_directory, current_app
+import importlib
+from flask import Blueprint, Flask, request, jsonify, current_app
 from flask_login import LoginManager, UserMixin, current_user, login_user, logout_user, login_required # type: ignore
 from flask_cors import CORS
-from ahp_routes import ahp_bp
-from Checklist import checklist_bp
-from TodoList import todolist_bp
-from article import article_bp
-from minio_utils import minio_bp
-from BalancedDecision import balanced_decision_bp
-from mermaid_utils import mermaid_bp
-from statistics_routes import statistics_bp
-from logic_errors import logic_errors_bp
-from feedback import feedback_bp
-from inspirations import inspiration_bp
-from admin import admin_bp
 import pymysql
 from shared_models import AdminUser, db
-from werkzeug.security import generate_password_hash, check_password_hash
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives import hashes
+from identity_cache import load_identity
+from auth_utils import LoginBusyError, get_private_key, hash_password, needs_rehash, password_verifier
 from logging.handlers import RotatingFileHandler
 import os
 import logging
+import time
 pymysql.install_as_MySQLdb()
 
-app = Flask(__name__, static_folder='build', template_folder='build')
-CORS(app, supports_credentials=True)
-def create_app():  
+# 业务蓝图按 (模块, 蓝图变量) 登记，在 create_app 中才导入并注册；
+# 各模块依赖的 minio、Pillow 等较重的库也只在首次使用时导入，缩短 worker 冷启动时间
+BLUEPRINTS = (
+    ('ahp_routes', 'ahp_bp'),
+    ('Checklist', 'checklist_bp'),
+    ('TodoList', 'todolist_bp'),
+    ('article', 'article_bp'),
+    ('minio_utils', 'minio_bp'),
+    ('BalancedDecision', 'balanced_decision_bp'),
+    ('mermaid_utils', 'mermaid_bp'),
+    ('statistics_routes', 'statistics_bp'),
+    ('logic_errors', 'logic_errors_bp'),
+    ('feedback', 'feedback_bp'),
+    ('inspirations', 'inspiration_bp'),
+    ('admin', 'admin_bp'),
+    # 前端构建产物，包含捕获所有前端路由的 /<path:path>
+    ('static_assets', 'static_bp'),
+)
+
+# 登录注册等应用自身的路由
+core_bp = Blueprint('core', __name__)
+
+# 初始化 Flask-Login
+login_manager = LoginManager()
+
+def setup_logging(app):
+    # 各个应用实例共用名为 app 的 logger，多次调用 create_app（如测试）时不重复添加处理器
+    handler_names = {handler.name for handler in app.logger.handlers}
+
     # 确保日志目录存在
     os.makedirs('logs', exist_ok=True)
     
-    # 文件日志（100MB轮转，保留3个备份）
-    file_handler = RotatingFileHandler(
-        'logs/app.log',
-        maxBytes=1024 * 1024 * 100,
-        backupCount=3
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    
     # 按环境设置级别
     app.logger.setLevel(logging.INFO if not app.debug else logging.DEBUG)
-    app.logger.addHandler(file_handler)
+
+    # 文件日志（100MB轮转，保留3个备份）
+    if 'app_file' not in handler_names:
+        file_handler = RotatingFileHandler(
+            'logs/app.log',
+            maxBytes=1024 * 1024 * 100,
+            backupCount=3
+        )
+        file_handler.set_name('app_file')
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+        ))
+        app.logger.addHandler(file_handler)
     
     # 开发环境额外添加彩色控制台日志
-    if app.debug:
+    if app.debug and 'app_console' not in handler_names:
         import colorlog
         stream_handler = logging.StreamHandler()
+        stream_handler.set_name('app_console')
         stream_handler.setFormatter(colorlog.ColoredFormatter(
             '%(log_color)s%(asctime)s - %(levelname)s - %(message)s'
         ))
         app.logger.addHandler(stream_handler)
+
+def register_blueprints(app):
+    # 蓝图必须在处理第一个请求前注册，因此路由模块在这里全部导入；记录耗时以便观察冷启动
+    started = time.perf_counter()
+    app.register_blueprint(core_bp)
+    for module_name, blueprint_name in BLUEPRINTS:
+        module = importlib.import_module(module_name)
+        app.register_blueprint(getattr(module, blueprint_name))
+    app.logger.info(f"Registered {len(BLUEPRINTS) + 1} blueprints in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def create_app(config=None):
+    """
+    应用工厂。config 为字典，覆盖 config.py 中的同名配置（如测试时替换数据库地址）。
+    部署时使用 `gunicorn "app:create_app()"` 或 `flask --app app run`。
+    """
+    # 前端静态文件由 static_assets 蓝图提供，不使用 Flask 自带的 /static 路由
+    app = Flask(__name__, static_folder=None)
+    CORS(app, supports_credentials=True)
+    setup_logging(app)
     
+    app.config.from_pyfile('config.py')
+    if config:
+        app.config.from_mapping(config)
+    db.init_app(app)
+    login_manager.init_app(app)
+    register_blueprints(app)
     return app
 
-create_app()
-# 初始化 Flask-Login
-login_manager = LoginManager()
-login_manager.init_app(app)
-
-app.config.from_pyfile('config.py')
-db.init_app(app)
-app.register_blueprint(ahp_bp)
-app.register_blueprint(checklist_bp)
-app.register_blueprint(todolist_bp)
-app.register_blueprint(article_bp)
-app.register_blueprint(minio_bp)
-app.register_blueprint(balanced_decision_bp)
-app.register_blueprint(mermaid_bp)
-app.register_blueprint(statistics_bp)
-app.register_blueprint(logic_errors_bp)
-app.register_blueprint(feedback_bp)
-app.register_blueprint(inspiration_bp)
-app.register_blueprint(admin_bp)
-
-# 加载 RSA 私钥
-def load_private_key():
-    with open("private_key.pem", "rb") as key_file:
-        private_key = serialization.load_pem_private_key(
-            key_file.read(),
-            password=None
-        )
-    return private_key
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-    
-@app.route('/static/<path:path>')
-def static_files(path):
-    return send_from_directory(app.static_folder + '/static', path)
+_app = None
 
-@app.route('/images/<path:path>')
-def image_files(path):
-    return send_from_directory(app.static_folder + '/images', path)
+def __getattr__(name):
+    # 兼容 `from app import app`、`gunicorn app:app` 等引用模块级 app 的用法，首次访问时才创建
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# 捕获所有前端路由，将其指向 index.html
-@app.route('/<path:path>')
-def serve_react_app(path):
-    return send_from_directory(app.static_folder, 'index.html')
+# 加载 RSA 私钥：首次使用时读取，之后从内存返回，私钥文件修改后自动重新加载
+def load_private_key():
+    return get_private_key()
 
-@app.route('/test-log')
+@core_bp.route('/test-log')
 def test_log():
     current_app.logger.debug('Debug message')
     current_app.logger.info('Info message')
@@ -114,10 +125,10 @@ def test_log():
         current_app.logger.critical('Critical error', exc_info=True)
     return "Check your logs"
 
-# 用户加载函数
+# 用户加载函数：短 TTL 缓存，用户被修改（如修改密码、冻结）后立即失效
 @login_manager.user_loader
 def load_user(user_id):
-    return AdminUser.query.get(int(user_id))
+    return load_identity(AdminUser, int(user_id))
 
 # 自定义未登录时的响应
 @login_manager.unauthorized_handler
@@ -125,7 +136,7 @@ def unauthorized():
     # 返回 JSON 响应，通知前端用户未登录
     return jsonify({'error': 'Unauthorized', 'message': 'Please log in to access this resource.'}), 401
 
-@app.route('/login', methods=['POST'])
+@core_bp.route('/login', methods=['POST'])
 def login():
     # 获取 JSON 数据
     data = request.get_json()
@@ -134,7 +145,8 @@ def login():
             # 加载私钥
     private_key = load_private_key()
 
-    # 解密密码
+    # 解密密码（cryptography 在首次登录时才导入）
+    from cryptography.hazmat.primitives.asymmetric import padding
     password = private_key.decrypt(
         base64.b64decode(encrypted_password),
         padding.PKCS1v15()
@@ -143,19 +155,28 @@ def login():
     # 查询用户
     user = AdminUser.query.filter_by(username=username).first()
     
-    # 验证用户和密码
-    if user and user.check_password(password):
+    # 验证用户和密码（在有界线程池中计算哈希）
+    try:
+        valid = user is not None and password_verifier.verify(user.password_hash, password)
+    except LoginBusyError:
+        return jsonify({'message': 'Too many login attempts, please retry later'}), 503
+
+    if valid:
+        # 哈希强度配置变更后，用户下次登录时按新配置重新计算
+        if needs_rehash(user.password_hash):
+            user.set_password(password)
+            db.session.commit()
         login_user(user)  # 登录用户
         return jsonify({'message': 'Login successful', 'user_id': user.id,'username':username}), 200
 
     # 登录失败
     return jsonify({'message': 'Invalid credentials'}), 401
-@app.route('/logout', methods=['POST'])
+@core_bp.route('/logout', methods=['POST'])
 def logout():
     logout_user()  # 使用 Flask-Login 的 logout_user() 退出用户
     return jsonify({'message': 'Logout successful'}), 200
 
-@app.route('/register', methods=['POST'])
+@core_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
     username = data.get('username')
@@ -175,7 +196,7 @@ def register():
     user = AdminUser(
         username=username,
         email=email,
-        password_hash=generate_password_hash(password),
+        password_hash=hash_password(password),
         avatar_url=avatar_url
     )
 
@@ -187,7 +208,7 @@ def register():
 
 
 # 使用 current_user 的示例
-@app.route('/profile')
+@core_bp.route('/profile')
 @login_required
 def profile():
     return jsonify({
@@ -196,6 +217,7 @@ def profile():
     })
 
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
     app.run(debug=True,port=5001)
@@ -3,9 +3,21 @@ from sqlalchemy import desc
 from shared_models import PlatformArticle, db
 from datetime import datetime as dt
 from flask_login import current_user
+from article_search import ensure_fulltext_index, index_article, search_articles, unindex_article
+from pagination_utils import (CursorError, check_limit, cursor_requested, decode_offset_cursor, encode_offset_cursor,
+                              paginate_by_cursor, total_requested)
+import math
 
 article_bp = Blueprint('article', __name__)
 
+@article_bp.cli.command('create-search-index')
+def create_search_index():
+    """创建文章全文检索索引：flask article create-search-index"""
+    if ensure_fulltext_index():
+        print('FULLTEXT index is ready')
+    else:
+        print('Database is not MySQL, the in-memory search index will be used')
+
 @article_bp.route('/articles', methods=['POST'])
 def create_article():
     data = request.get_json()
@@ -20,6 +32,7 @@ def create_article():
     new_article.updated_at=dt.utcnow()
     db.session.add(new_article)
     db.session.commit()
+    index_article(new_article)
     return jsonify({'message': 'PlatformArticle created successfully', 'article': data}), 201
 
 @article_bp.route('/articles', methods=['GET'])
@@ -29,31 +42,59 @@ def get_articles():
     page = request.args.get('page', 1, type=int)
     page_size = request.args.get('page_size', 10, type=int)
     print(current_user.id)
-    query = PlatformArticle.query
 
     if search:
-        query = query.filter(
-            (PlatformArticle.title.ilike(f"%{search}%")) |
-            (PlatformArticle.keywords.ilike(f"%{search}%"))
-        )
+        # 关键词检索走全文索引，按相关度排序；相关度无法按键定位，游标中记录偏移量
+        if cursor_requested():
+            try:
+                check_limit(page_size)
+                offset = decode_offset_cursor(request.args.get('cursor'))
+            except CursorError as e:
+                return jsonify({'error': str(e)}), 400
+            rows, total, has_more = search_articles(search, tag, offset, page_size, total_requested())
+            return jsonify({
+                'articles': serialize_search_results(rows),
+                'next_cursor': encode_offset_cursor(offset + page_size) if has_more else None,
+                'has_more': has_more,
+                'total_items': total
+            }), 200
+
+        try:
+            check_limit(page_size)
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
+        page = max(page, 1)
+        rows, total, _ = search_articles(search, tag, (page - 1) * page_size, page_size)
+        return jsonify({
+            'articles': serialize_search_results(rows),
+            'total_pages': math.ceil(total / page_size) if page_size > 0 else 0,
+            'current_page': page,
+            'total_items': total
+        }), 200
+
+    query = PlatformArticle.query
     if tag:
         query = query.filter(PlatformArticle.tags == tag)
 
+    if cursor_requested():
+        # 游标分页：按 (reference_count, created_at, id) 倒序定位下一页，不做 OFFSET
+        try:
+            paginated_articles = paginate_by_cursor(query, [
+                (PlatformArticle.reference_count, True), (PlatformArticle.created_at, True), (PlatformArticle.id, True)
+            ], page_size)
+        except CursorError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'articles': [serialize_article(article) for article in paginated_articles.items],
+            'next_cursor': paginated_articles.next_cursor,
+            'has_more': paginated_articles.has_more,
+            'total_items': paginated_articles.total
+        }), 200
+
     paginated_articles = query.order_by(desc(PlatformArticle.reference_count), desc(PlatformArticle.created_at)).paginate(page=page, per_page=page_size, error_out=False)
     articles = paginated_articles.items
 
-    results = [
-        {
-            'id': article.id,
-            'title': article.title,
-            'author': article.author,
-            'tags': article.tags,
-            'keywords': article.keywords,
-            'created_at': article.created_at,
-            'updated_at': article.updated_at,
-            'reference_count': article.reference_count
-        } for article in articles
-    ]
+    results = [serialize_article(article) for article in articles]
 
     return jsonify({
         'articles': results,
@@ -62,6 +103,22 @@ def get_articles():
         'total_items': paginated_articles.total
     }), 200
 
+def serialize_article(article):
+    return {
+        'id': article.id,
+        'title': article.title,
+        'author': article.author,
+        'tags': article.tags,
+        'keywords': article.keywords,
+        'created_at': article.created_at,
+        'updated_at': article.updated_at,
+        'reference_count': article.reference_count
+    }
+
+def serialize_search_results(rows):
+    # 检索结果额外返回相关度和高亮片段
+    return [dict(serialize_article(article), score=score, snippet=snippet) for article, score, snippet in rows]
+
 @article_bp.route('/articles/<int:id>', methods=['GET'])
 def get_article(id):
     article = PlatformArticle.query.get(id)
@@ -96,6 +153,7 @@ def update_article(id):
     article.updated_at = dt.utcnow()
 
     db.session.commit()
+    index_article(article)
     return jsonify({'message': 'PlatformArticle updated successfully'}), 200
 
 @article_bp.route('/articles/<int:id>', methods=['DELETE'])
@@ -106,4 +164,5 @@ def delete_article(id):
 
     db.session.delete(article)
     db.session.commit()
+    unindex_article(id)
     return jsonify({'message': 'PlatformArticle deleted successfully'}), 200
\ No newline at end of file
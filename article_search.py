@@ -0,0 +1,203 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.exc import DBAPIError
+from shared_models import PlatformArticle, db
+from search_utils import DEFAULT_SEARCH_INDEX_TTL, InvertedIndex, highlight
+
+FULLTEXT_INDEX_NAME = 'ft_platform_article'
+# MySQL ngram 解析器的 ngram_token_size（默认 2），更短的检索词无法通过 FULLTEXT 索引命中
+NGRAM_TOKEN_SIZE = 2
+
+# 纯 Python 倒排索引的字段权重：标题 > 关键词 > 正文
+FIELD_WEIGHTS = {'title': 3.0, 'keywords': 2.0, 'content': 1.0}
+
+
+def use_fulltext():
+    """MySQL 使用 FULLTEXT 索引检索，其他数据库（SQLite/测试环境）使用内存倒排索引"""
+    return db.engine.dialect.name == 'mysql'
+
+
+def ensure_fulltext_index():
+    """在 MySQL 上创建 platform_article 的 ngram FULLTEXT 索引（支持中文），已存在时跳过"""
+    if not use_fulltext():
+        return False
+    exists = db.session.execute(text(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :name"
+    ), {'table': PlatformArticle.__tablename__, 'name': FULLTEXT_INDEX_NAME}).scalar()
+    if not exists:
+        db.session.execute(text(
+            f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} ON {PlatformArticle.__tablename__} "
+            "(title, keywords, content) WITH PARSER ngram"
+        ))
+        db.session.commit()
+    return True
+
+
+class ArticleIndex:
+    """
+    平台文章的内存倒排索引，首次检索时从数据库构建，之后随文章的增删改增量更新。
+    增量更新只作用于当前进程，索引超过 SEARCH_INDEX_TTL 后在后台线程中重新构建，使其他 worker 的修改生效，
+    重建期间检索继续使用旧索引。
+    """
+
+    def __init__(self):
+        self.index = InvertedIndex(FIELD_WEIGHTS)
+        self.built = False
+        self.built_at = None
+        self.pending = None  # 构建期间发生的增量更新，构建完成后重放到新索引上
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.refresh_thread = None
+
+    def build(self):
+        with self.lock:
+            self.pending = []
+        try:
+            # 在新的索引上构建完成后再替换，构建期间检索仍使用旧索引
+            index = InvertedIndex(FIELD_WEIGHTS)
+            rows = db.session.query(
+                PlatformArticle.id, PlatformArticle.title, PlatformArticle.keywords,
+                PlatformArticle.content, PlatformArticle.tags
+            ).yield_per(1000)
+            for row in rows:
+                self._add(index, row)
+            with self.lock:
+                # 构建期间提交的修改可能没有被读到，按发生顺序重放一遍（重复添加同一文档只会替换）
+                for apply in self.pending:
+                    apply(index)
+                self.index = index
+                self.built = True
+                self.built_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+            return
+        ttl = current_app.config.get('SEARCH_INDEX_TTL', DEFAULT_SEARCH_INDEX_TTL)
+        # 过期后只启动一个后台线程重新构建，所有请求在此期间继续使用旧索引
+        if time.monotonic() - self.built_at > ttl and self.refresh_lock.acquire(blocking=False):
+            app = current_app._get_current_object()
+            self.refresh_thread = threading.Thread(target=self._refresh, args=(app,),
+                                                   name='article-index-refresh', daemon=True)
+            self.refresh_thread.start()
+
+    def _refresh(self, app):
+        try:
+            with app.app_context():
+                self.build()
+        except Exception as e:
+            app.logger.warning(f"Rebuild article search index failed, keep using the old one: {str(e)}")
+        finally:
+            self.refresh_lock.release()
+
+    @staticmethod
+    def _add(index, article):
+        index.add(article.id, {
+            'title': article.title,
+            'keywords': article.keywords,
+            'content': article.content
+        }, meta={'tags': article.tags})
+
+    def _apply(self, change):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(change)
+            if self.built:
+                change(self.index)
+
+    def update(self, article):
+        fields = {'id': article.id, 'title': article.title, 'keywords': article.keywords,
+                  'content': article.content, 'tags': article.tags}
+        row = type('ArticleRow', (), fields)
+        self._apply(lambda index: self._add(index, row))
+
+    def remove(self, article_id):
+        self._apply(lambda index: index.remove(article_id))
+
+    def search(self, query, tag=None):
+        self.ensure_built()
+        filter_func = (lambda meta: meta.get('tags') == tag) if tag else None
+        return self.index.search(query, filter_func=filter_func)
+
+
+article_index = ArticleIndex()
+
+
+def index_article(article):
+    """文章新增或修改后调用，保持内存索引与数据库一致（MySQL 由 FULLTEXT 索引自动维护）"""
+    if not use_fulltext():
+        article_index.update(article)
+
+
+def unindex_article(article_id):
+    if not use_fulltext():
+        article_index.remove(article_id)
+
+
+def search_articles(search, tag, offset, limit, with_total=True):
+    """
+    按相关度检索文章，返回 (本页结果, 总数, 是否还有下一页)，with_total=False 时总数为 None。
+    本页结果为 [(article, score, snippet), ...]，snippet 为正文中高亮了命中词的片段。
+    """
+    offset = max(offset, 0)
+    if use_fulltext():
+        rows, total, has_more = None, None, False
+        # 短于 ngram_token_size 的检索词（如单个汉字）不会被 FULLTEXT 索引收录，直接用 LIKE 匹配
+        if all(len(term) >= NGRAM_TOKEN_SIZE for term in search.split()):
+            try:
+                rows, total, has_more = _fulltext_search(search, tag, offset, limit, with_total)
+            except DBAPIError as e:
+                # FULLTEXT 索引尚未创建（flask article create-search-index）等情况下退回 LIKE 检索
+                db.session.rollback()
+                current_app.logger.warning(f"Fulltext search failed, fall back to LIKE: {str(e)}")
+        if rows is None:
+            rows, total, has_more = _like_search(search, tag, offset, limit, with_total)
+    else:
+        ranked = article_index.search(search, tag)
+        total = len(ranked) if with_total else None
+        has_more = offset + limit < len(ranked)
+        page_ranked = ranked[offset:offset + limit]
+        articles = {article.id: article for article in PlatformArticle.query.filter(
+            PlatformArticle.id.in_([doc_id for doc_id, _ in page_ranked])
+        ).all()} if page_ranked else {}
+        rows = [(articles[doc_id], score) for doc_id, score in page_ranked if doc_id in articles]
+
+    return [(article, score, highlight(article.content, search)) for article, score in rows], total, has_more
+
+
+def _fulltext_search(search, tag, offset, limit, with_total):
+    relevance = match(
+        PlatformArticle.title, PlatformArticle.keywords, PlatformArticle.content, against=search
+    ).in_natural_language_mode()
+    query = db.session.query(PlatformArticle, relevance.label('score')).filter(relevance > 0)
+    if tag:
+        query = query.filter(PlatformArticle.tags == tag)
+    total = query.order_by(None).count() if with_total else None
+    items = query.order_by(
+        relevance.desc(), PlatformArticle.reference_count.desc(), PlatformArticle.id.desc()
+    ).offset(offset).limit(limit + 1).all()
+    return [(article, float(score)) for article, score in items[:limit]], total, len(items) > limit
+
+
+def _like_search(search, tag, offset, limit, with_total):
+    """不依赖 FULLTEXT 索引的检索：任一检索词出现在标题、关键词或正文中即命中，按引用次数排序，相关度记为 0"""
+    terms = search.split() or [search]
+    query = PlatformArticle.query.filter(or_(*[
+        column.contains(term, autoescape=True)
+        for term in terms
+        for column in (PlatformArticle.title, PlatformArticle.keywords, PlatformArticle.content)
+    ]))
+    if tag:
+        query = query.filter(PlatformArticle.tags == tag)
+    total = query.order_by(None).count() if with_total else None
+    items = query.order_by(
+        PlatformArticle.reference_count.desc(), PlatformArticle.id.desc()
+    ).offset(offset).limit(limit + 1).all()
+    return [(article, 0.0) for article in items[:limit]], total, len(items) > limit
@@ -0,0 +1,104 @@
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_PRIVATE_KEY_PATH = 'private_key.pem'
+DEFAULT_PASSWORD_HASH_WORKERS = 4
+
+
+class LoginBusyError(Exception):
+    """等待校验密码的登录请求过多"""
+
+
+class PrivateKeyCache:
+    """
+    RSA 私钥只在首次使用时读取并解析，之后常驻内存。
+    每次取用时比较文件的修改时间，私钥文件被替换（密钥轮换）后自动重新加载。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.mtime = None
+        self.key = None
+
+    def get(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        if self.key is not None and self.path == path and self.mtime == mtime:
+            return self.key
+        with self.lock:
+            if self.key is None or self.path != path or self.mtime != mtime:
+                from cryptography.hazmat.primitives import serialization
+                with open(path, 'rb') as key_file:
+                    self.key = serialization.load_pem_private_key(key_file.read(), password=None)
+                self.path, self.mtime = path, mtime
+            return self.key
+
+
+private_key_cache = PrivateKeyCache()
+
+
+def get_private_key():
+    return private_key_cache.get(current_app.config.get('PRIVATE_KEY_PATH', DEFAULT_PRIVATE_KEY_PATH))
+
+
+class PasswordVerifier:
+    """
+    在固定大小的线程池中校验密码哈希（hashlib 计算时会释放 GIL），限制同时进行的哈希计算数量，
+    登录高峰时不会占满所有请求线程；排队的请求超过上限时直接拒绝。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.slots = None
+
+    def _ensure_executor(self):
+        if self.executor is None:
+            with self.lock:
+                if self.executor is None:
+                    workers = current_app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_PASSWORD_HASH_WORKERS)
+                    self.slots = threading.BoundedSemaphore(workers * 4)
+                    self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def verify(self, password_hash, password):
+        self._ensure_executor()
+        if not self.slots.acquire(blocking=False):
+            raise LoginBusyError()
+        try:
+            return self.executor.submit(check_password_hash, password_hash, password).result()
+        finally:
+            self.slots.release()
+
+
+password_verifier = PasswordVerifier()
+
+
+def password_hash_method():
+    """config.PASSWORD_HASH_METHOD 为空时使用 werkzeug 的默认算法和强度"""
+    return current_app.config.get('PASSWORD_HASH_METHOD')
+
+
+def hash_password(password):
+    method = password_hash_method()
+    if method:
+        return generate_password_hash(password, method=method)
+    return generate_password_hash(password)
+
+
+@functools.lru_cache(maxsize=8)
+def resolved_hash_method(method):
+    """
+    werkzeug 补全默认参数后写入哈希的算法前缀，如 'scrypt' → 'scrypt:32768:8:1'、
+    'pbkdf2:sha256' → 'pbkdf2:sha256:1000000'。每种配置只在首次调用时计算一次哈希。
+    """
+    sample = generate_password_hash('', method=method) if method else generate_password_hash('')
+    return sample.split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    """已存哈希的算法或强度与配置（未配置时为 werkzeug 默认值）不一致时返回 True，登录成功后按新配置重新计算"""
+    return password_hash.split('$', 1)[0] != resolved_hash_method(password_hash_method())
@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response, Response
+
+# 作为 ttl 传给 set() 时缓存项永不过期（只用于命名空间版本号这类不能自然过期的键）
+NO_EXPIRY = object()
+
+
+class LRUTTLCache:
+    """
+    进程内 LRU + TTL 缓存，作为默认缓存后端。
+    需要多进程共享时，可替换为实现了相同 get/set/delete 接口的后端（如 Redis 封装）。
+    """
+
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """ttl 为 None 时使用默认 TTL，为 NO_EXPIRY 时永不过期；ttl <= 0 表示不缓存"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is NO_EXPIRY:
+            expires_at = None
+        elif ttl <= 0:
+            self.delete(key)
+            return
+        else:
+            expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache:
+    """
+    按命名空间缓存已序列化的 JSON 响应。
+    每个命名空间带一个版本号，失效时只需更换版本号，旧版本的缓存项随 LRU/TTL 自然淘汰，
+    因此共享缓存后端也不需要支持按前缀删除。
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUTTLCache()
+
+    def _generation_key(self, namespace):
+        return f'{namespace}:__generation__'
+
+    def generation(self, namespace):
+        generation = self.backend.get(self._generation_key(namespace))
+        if generation is None:
+            generation = uuid.uuid4().hex
+            # 版本号本身不过期，否则会导致整个命名空间被意外失效
+            self.backend.set(self._generation_key(namespace), generation, ttl=NO_EXPIRY)
+        return generation
+
+    def _key(self, namespace, key, generation):
+        return f'{namespace}:{generation or self.generation(namespace)}:{key}'
+
+    # 读缓存未命中后需要回写时，应先取 generation 再执行查询，读和写都使用同一个版本号：
+    # 查询期间命名空间被失效，旧数据只会写到旧版本下，不会被之后的请求读到
+    def get(self, namespace, key, generation=None):
+        return self.backend.get(self._key(namespace, key, generation))
+
+    def set(self, namespace, key, value, ttl=None, generation=None):
+        self.backend.set(self._key(namespace, key, generation), value, ttl=ttl)
+
+    def invalidate(self, namespace):
+        self.backend.set(self._generation_key(namespace), uuid.uuid4().hex, ttl=NO_EXPIRY)
+
+
+response_cache = ResponseCache()
+
+# 平台清单目录的响应缓存命名空间，所有写入平台清单的操作提交后都需要使其失效
+PLATFORM_CHECKLIST_CACHE = 'platform_checklists'
+
+
+def invalidate_cache(*namespaces):
+    """写操作提交后调用，使指定命名空间下的缓存全部失效"""
+    for namespace in namespaces:
+        response_cache.invalidate(namespace)
+
+
+def _conditional_response(body, etag, mimetype):
+    response = Response(body, status=200, mimetype=mimetype)
+    response.set_etag(etag)
+    # 客户端携带匹配的 If-None-Match 时直接返回 304
+    return response.make_conditional(request)
+
+
+def cached_response(namespace, key_func, ttl=None):
+    """
+    缓存视图函数的 200 响应，并支持 ETag/If-None-Match。
+    key_func 接收视图的关键字参数，返回缓存键；命中缓存时不会再执行查询和 JSON 序列化。
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            key = key_func(**kwargs)
+            # 在执行视图之前确定版本号，视图执行期间发生的失效会使本次结果直接作废
+            generation = response_cache.generation(namespace)
+            entry = response_cache.get(namespace, key, generation=generation)
+            if entry is not None:
+                body, etag, mimetype = entry
+                return _conditional_response(body, etag, mimetype)
+
+            response = make_response(func(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            response_cache.set(namespace, key, (body, etag, response.mimetype), ttl=ttl, generation=generation)
+            return _conditional_response(body, etag, response.mimetype)
+        return decorated_function
+    return decorator
@@ -7,3 +7,28 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 # Flask 应用的其他配置
 DEBUG = True  # 启用调试模式
 SECRET_KEY = 'decision_aid'  # 用于会话和表单加密
+
+# 开启后通过预签名地址直接与 MinIO 传输文件，不再经过应用服务器
+MINIO_PRESIGNED_MODE = False
+
+# 登录密码解密使用的 RSA 私钥，文件更新后自动重新加载
+PRIVATE_KEY_PATH = 'private_key.pem'
+# 密码哈希算法及强度，如 'scrypt:32768:8:1'、'pbkdf2:sha256:600000'；为 None 时使用 werkzeug 默认值
+# 修改后，已有用户在下次登录成功时按新配置重新计算哈希
+PASSWORD_HASH_METHOD = None
+# 同时进行密码哈希校验的线程数
+PASSWORD_HASH_WORKERS = 4
+
+# 已登录用户身份的缓存时间（秒），用户被修改后立即失效；设为 0 时不缓存
+USER_CACHE_TTL = 30
+
+# 内存检索索引（逻辑错误、SQLite 下的文章检索）的最长使用时间（秒），超过后整表重新载入，
+# 使其他 worker 进程写入的修改生效
+SEARCH_INDEX_TTL = 60
+
+# 前端构建产物所在目录（相对于应用目录）
+STATIC_FOLDER = 'build'
+
+# 统计按日汇总（daily_counts）使用的业务时区；统计接口请求该时区（或零点与之重合的时区）时直接读取汇总，
+# 其他时区按原表实时统计。修改后汇总在下次刷新时按新时区全部重建
+STATISTICS_TIMEZONE = 'Asia/Shanghai'
@@ -0,0 +1,86 @@
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, url_for
+import minio_utils
+from mermaid_utils import FORMATS, renderer
+from cache_utils import PLATFORM_CHECKLIST_CACHE, invalidate_cache
+from shared_models import PlatformChecklist, db
+
+# 平台清单流程图在 MinIO 中的存放路径
+DIAGRAM_PREFIX = 'diagram/'
+DIAGRAM_FORMATS = ('svg', 'png')
+
+diagram_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checklist-diagrams')
+
+
+def diagram_key(mermaid_code):
+    return hashlib.sha256(mermaid_code.encode('utf-8')).hexdigest()
+
+
+def diagram_urls(checklist):
+    """清单详情中返回的流程图地址，仅在预渲染完成后返回"""
+    if checklist.diagram_status != 'ready' or not checklist.diagram_key:
+        return {'diagram_url': None, 'diagram_png_url': None}
+    return {
+        'diagram_url': url_for('minio.serve_file', business_type='diagram', filename=f'{checklist.diagram_key}.svg'),
+        'diagram_png_url': url_for('minio.serve_file', business_type='diagram', filename=f'{checklist.diagram_key}.png')
+    }
+
+
+def schedule_diagram_render(checklist_id):
+    """
+    在发布事务提交之后调用：标记清单为待渲染并提交后台任务，将 mermaid_code 渲染为 SVG 和 PNG 并存入 MinIO。
+    渲染失败只记录在该清单版本上，不影响已提交的发布。
+    """
+    try:
+        checklist = PlatformChecklist.query.get(checklist_id)
+        if checklist is None or not checklist.mermaid_code:
+            return
+
+        key = diagram_key(checklist.mermaid_code)
+        if checklist.diagram_key == key and checklist.diagram_status == 'ready':
+            return
+        checklist.diagram_key = key
+        checklist.diagram_status = 'pending'
+        checklist.diagram_error = None
+        db.session.commit()
+        # 清单详情中的 diagram_status 已变化，缓存的响应需要失效
+        invalidate_cache(PLATFORM_CHECKLIST_CACHE)
+
+        app = current_app._get_current_object()
+        diagram_executor.submit(render_checklist_diagram, app, checklist_id, checklist.mermaid_code, key)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Schedule diagram render for platform checklist {checklist_id} failed: {str(e)}", exc_info=True)
+
+
+def render_checklist_diagram(app, checklist_id, mermaid_code, key):
+    with app.app_context():
+        try:
+            for fmt in DIAGRAM_FORMATS:
+                object_name = f'{DIAGRAM_PREFIX}{key}.{fmt}'
+                # 内容相同的流程图只需渲染和上传一次
+                try:
+                    minio_utils.minio_client.stat_object(minio_utils.BUCKET_NAME, object_name)
+                    continue
+                except minio_utils.s3_error():
+                    pass
+                _, future = renderer.submit(mermaid_code, fmt)
+                with open(future.result(), 'rb') as f:
+                    data = f.read()
+                minio_utils.upload_stream(object_name, io.BytesIO(data), content_type=FORMATS[fmt])
+            status, error = 'ready', None
+        except Exception as e:
+            app.logger.error(f"Render diagram for platform checklist {checklist_id} failed: {str(e)}", exc_info=True)
+            status, error = 'failed', str(e)[:255]
+
+        try:
+            # 期间 mermaid_code 可能已被再次修改，只更新仍对应本次渲染内容的记录
+            PlatformChecklist.query.filter_by(id=checklist_id, diagram_key=key).update(
+                {'diagram_status': status, 'diagram_error': error}, synchronize_session=False)
+            db.session.commit()
+            invalidate_cache(PLATFORM_CHECKLIST_CACHE)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Update diagram status for platform checklist {checklist_id} failed: {str(e)}", exc_info=True)
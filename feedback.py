@@ -2,6 +2,7 @@ from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_login import current_user, login_required
 from shared_models import Feedback,db
+from pagination_utils import CursorError, cursor_requested, paginate_by_cursor
 
 feedback_bp = Blueprint('feedback', __name__)
 
@@ -27,8 +28,31 @@ def submit_feedback():
 def get_feedback():
     page = request.args.get('page', 1, type=int)
     per_page = 10  # 每页显示 5 条记录
+    if cursor_requested():
+        # 游标分页：按 (created_at, id) 倒序，不做 OFFSET
+        try:
+            feedback_list = paginate_by_cursor(Feedback.query, [(Feedback.created_at, True), (Feedback.id, True)], per_page)
+        except CursorError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return jsonify({
+                "status": "success",
+                "data": serialize_feedback(feedback_list.items),
+                "next_cursor": feedback_list.next_cursor,
+                "has_more": feedback_list.has_more,
+                "total_items": feedback_list.total
+        }), 200
+
     feedback_list = Feedback.query.order_by(Feedback.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-    feedback_data = [{
+
+    return jsonify({
+            "status": "success",
+            "data": serialize_feedback(feedback_list),
+            "total_pages": feedback_list.pages,
+            "current_page": feedback_list.page
+    }), 200
+
+def serialize_feedback(feedback_list):
+    return [{
         "id": fb.id,
         "user_id": fb.user_id,
         "description": fb.description,
@@ -40,13 +64,6 @@ def get_feedback():
         "status": fb.status
     } for fb in feedback_list]
 
-    return jsonify({
-            "status": "success",
-            "data": feedback_data,
-            "total_pages": feedback_list.pages,
-            "current_page": feedback_list.page
-    }), 200
-
 @feedback_bp.route('/api/admin/feedback/<int:id>/respond', methods=['POST'])
 def respond_to_feedback(id):
     feedback = Feedback.query.get(id)
@@ -0,0 +1,89 @@
+import uuid
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from cache_utils import NO_EXPIRY, LRUTTLCache
+from shared_models import AdminUser, User, db
+
+DEFAULT_USER_CACHE_TTL = 30  # 秒
+
+# 缓存需要失效的模型：冻结/解冻会修改 User，修改密码会修改 AdminUser/User
+CACHED_MODELS = (AdminUser, User)
+
+identity_cache = LRUTTLCache(maxsize=1024, ttl=DEFAULT_USER_CACHE_TTL)
+
+
+def _cache_key(model, identity):
+    return f'{model.__name__}:{identity}'
+
+
+def _generation_key(key):
+    return f'{key}:__generation__'
+
+
+def _generation(key):
+    """
+    每个用户的缓存版本号，与 ResponseCache 的命名空间版本号相同：失效时更换版本号，
+    查询期间发生的失效会使查询结果写到旧版本下，不会被之后的请求读到。
+    """
+    generation = identity_cache.get(_generation_key(key))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        identity_cache.set(_generation_key(key), generation, ttl=NO_EXPIRY)
+    return generation
+
+
+def _snapshot(instance):
+    """复制出一个与会话无关的、已持久化状态的对象，供之后的请求 merge(load=False) 使用"""
+    mapper = inspect(instance).mapper
+    snapshot = mapper.class_manager.new_instance()
+    for attr in mapper.column_attrs:
+        setattr(snapshot, attr.key, getattr(instance, attr.key))
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def load_identity(model, identity):
+    """
+    按主键加载当前登录用户。命中缓存时通过 merge(load=False) 放入本次请求的会话，不执行 SQL；
+    缓存项在 TTL（config.USER_CACHE_TTL，为 0 时不缓存）到期或该用户被修改、删除后失效。
+    """
+    # 先取版本号再查询，读和写都使用同一个版本号
+    base_key = _cache_key(model, identity)
+    key = f'{base_key}:{_generation(base_key)}'
+    cached = identity_cache.get(key)
+    if cached is not None:
+        return db.session.merge(cached, load=False)
+
+    instance = db.session.get(model, identity)
+    ttl = current_app.config.get('USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL)
+    # USER_CACHE_TTL 设为 0 表示关闭缓存，每次请求都查询数据库
+    if instance is not None and ttl > 0:
+        identity_cache.set(key, _snapshot(instance), ttl=ttl)
+    return instance
+
+
+def invalidate_identity(model, identity):
+    identity_cache.set(_generation_key(_cache_key(model, identity)), uuid.uuid4().hex, ttl=NO_EXPIRY)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_identities(session, flush_context):
+    changed = session.info.setdefault('changed_identities', set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, CACHED_MODELS) and instance.id is not None:
+            key = (type(instance), instance.id)
+            changed.add(key)
+            invalidate_identity(*key)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_identities(session):
+    # 提交后再失效一次，避免其他请求在提交前把旧数据重新放回缓存
+    for key in session.info.pop('changed_identities', ()):
+        invalidate_identity(*key)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_identities(session):
+    session.info.pop('changed_identities', None)
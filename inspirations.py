@@ -4,6 +4,8 @@ from shared_models import Inspiration,Reflection, db
 from datetime import datetime as dt
 from flask_login import current_user, login_required
 from sqlalchemy import func
+from sqlalchemy.orm import with_expression
+from pagination_utils import CursorError, cursor_requested, paginate_by_cursor
 inspiration_bp = Blueprint('inspiration', __name__)
 
 # 获取所有启发内容（管理用）
@@ -17,8 +19,10 @@ def get_all_inspirations():
         search_term = request.args.get('search', '').strip()
         content_type = request.args.get('type')  # 'text' 或 'image'
         
-        # 构建基础查询
-        query = Inspiration.query.order_by(Inspiration.created_at.desc())
+        # 构建基础查询，是否有感想通过 EXISTS 子查询在同一条 SQL 中得出
+        query = Inspiration.query.options(
+            with_expression(Inspiration.has_reflections, reflections_exist(Inspiration.id))
+        ).order_by(Inspiration.created_at.desc())
         
         # 添加搜索条件
         if search_term:
@@ -41,22 +45,23 @@ def get_all_inspirations():
         if content_type in ['text', 'image']:
             query = query.filter(Inspiration.type == content_type)
         
+        if cursor_requested():
+            # 游标分页：按 (created_at, id) 倒序，不做 OFFSET
+            try:
+                pagination = paginate_by_cursor(query, [(Inspiration.created_at, True), (Inspiration.id, True)], per_page)
+            except CursorError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'data': serialize_inspirations(pagination.items),
+                'total': pagination.total,
+                'per_page': per_page,
+                'next_cursor': pagination.next_cursor,
+                'has_more': pagination.has_more
+            })
+
         # 执行分页查询
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        inspirations = pagination.items
-        
-        # 构建响应数据
-        result = []
-        for item in inspirations:
-            has_reflections = bool(item.reflections)
-            result.append({
-                'id': item.id,
-                'type': item.type,
-                'content': item.content,
-                'description': item.description,
-                'created_at': item.created_at.isoformat(),
-                'has_reflections': has_reflections
-            })
+        result = serialize_inspirations(pagination.items)
         
         return jsonify({
             'data': result,
@@ -69,6 +74,25 @@ def get_all_inspirations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def reflections_exist(inspiration_id):
+    """EXISTS 子查询：启发内容是否有感想，只探测一行，不加载感想"""
+    return db.session.query(Reflection.id).filter(Reflection.inspiration_id == inspiration_id).exists()
+
+def serialize_inspirations(inspirations):
+    # 构建响应数据
+    result = []
+    for item in inspirations:
+        has_reflections = bool(item.has_reflections)
+        result.append({
+            'id': item.id,
+            'type': item.type,
+            'content': item.content,
+            'description': item.description,
+            'created_at': item.created_at.isoformat(),
+            'has_reflections': has_reflections
+        })
+    return result
+
 # 创建启发内容
 @inspiration_bp.route('/api/admin/inspirations', methods=['POST'])
 @login_required
@@ -123,7 +147,7 @@ def delete_inspiration(id):
     inspiration = Inspiration.query.get_or_404(id)
     
     # 检查是否有感想
-    if inspiration.reflections:
+    if db.session.query(reflections_exist(id)).scalar():
         return jsonify({
             'error': '该启发已有用户感想，不能删除',
             'can_delete': False
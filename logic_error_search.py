@@ -0,0 +1,103 @@
+import threading
+import time
+from flask import current_app
+from shared_models import LogicError, db
+from search_utils import DEFAULT_SEARCH_INDEX_TTL, InvertedIndex
+
+# 名称和术语的权重高于描述和示例
+FIELD_WEIGHTS = {'name': 3.0, 'term': 3.0, 'description': 1.0, 'example': 0.5}
+
+
+def serialize_logic_error(error):
+    return {
+        'id': error.id,
+        'name': error.name,
+        'term': error.term,
+        'description': error.description,
+        'example': error.example
+    }
+
+
+class LogicErrorIndex:
+    """
+    逻辑错误的内存倒排索引。逻辑错误表数据量小且很少修改，
+    因此启动时整表载入内存，之后随新增/修改增量更新，检索和列表都不再访问数据库。
+    增量更新只作用于当前进程，其他 worker 的修改在索引超过 SEARCH_INDEX_TTL 后重新整表载入时生效。
+    """
+
+    def __init__(self):
+        self.index = InvertedIndex(FIELD_WEIGHTS)
+        self.records = {}  # id -> 序列化后的逻辑错误
+        self.built = False
+        self.built_at = None
+        self.version = 0  # 每次增量更新加一，用于发现构建期间发生的修改
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    def build(self):
+        while True:
+            version = self.version
+            records = {error.id: serialize_logic_error(error) for error in LogicError.query.all()}
+            with self.lock:
+                # 构建期间有写入时重新读取，避免漏掉刚提交的修改
+                if version != self.version:
+                    continue
+                self.index.clear()
+                for record in records.values():
+                    self._add(record)
+                self.records = records
+                self.built = True
+                self.built_at = time.monotonic()
+                return
+
+    def ensure_built(self):
+        if not self.built:
+            self.build()
+            return
+        ttl = current_app.config.get('SEARCH_INDEX_TTL', DEFAULT_SEARCH_INDEX_TTL)
+        # 过期后只由一个请求重新载入，其他请求在此期间继续使用旧索引
+        if time.monotonic() - self.built_at > ttl and self.refresh_lock.acquire(blocking=False):
+            try:
+                self.build()
+            finally:
+                self.refresh_lock.release()
+
+    def _add(self, record):
+        self.index.add(record['id'], {field: record[field] for field in FIELD_WEIGHTS})
+
+    def update(self, error):
+        record = serialize_logic_error(error)
+        with self.lock:
+            self.version += 1
+            if not self.built:
+                return
+            self._add(record)
+            self.records[record['id']] = record
+
+    def all(self):
+        self.ensure_built()
+        return [self.records[error_id] for error_id in sorted(self.records)]
+
+    def search(self, query):
+        """按相关度返回匹配的逻辑错误，最后一个词按前缀匹配，便于边输入边检索"""
+        self.ensure_built()
+        ranked = self.index.search(query, prefix=True)
+        return [self.records[error_id] for error_id, _ in ranked if error_id in self.records]
+
+
+logic_error_index = LogicErrorIndex()
+
+
+def warm_logic_error_index(app):
+    """应用启动时在后台构建索引；数据库暂不可用时保持未构建状态，首次访问时再构建"""
+    def run():
+        with app.app_context():
+            try:
+                logic_error_index.build()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Build logic error search index failed, will retry on first request: {str(e)}")
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name='logic-error-index', daemon=True).start()
@@ -1,48 +1,73 @@
 import logging
 import traceback
 from flask import Flask, json, request, jsonify, Blueprint, current_app as app
-from sqlalchemy import desc
+from sqlalchemy import bindparam, desc, func
+from sqlalchemy.orm import joinedload
 from shared_models import AnalysisContent, AnalysisData, Article, LogicError,PlatformArticle, db
 from datetime import datetime as dt
 from flask_login import current_user
+from logic_error_search import logic_error_index, serialize_logic_error, warm_logic_error_index
+from pagination_utils import CursorError, cursor_requested, offset_cursor_page, paginate_by_cursor
+import math
 
 logic_errors_bp = Blueprint('logic_errors', __name__)
 
+SUMMARY_LENGTH = 300  # 分析列表中内容摘要的长度
+
+@logic_errors_bp.record_once
+def build_search_index(state):
+    # 注册到应用时即在后台构建逻辑错误检索索引
+    warm_logic_error_index(state.app)
+
 @logic_errors_bp.route('/api/logic_errors', methods=['GET'])
 def get_logic_errors():
-    logic_errors = LogicError.query.all()
-    return jsonify([
-        {
-            'id': error.id,
-            'name': error.name,
-            'term': error.term,
-            'description': error.description,
-            'example': error.example
-        } for error in logic_errors
-    ])
+    return jsonify(logic_error_index.all())
 
 @logic_errors_bp.route('/api/logic_errors_page', methods=['GET'])
 def get_logic_errors_page():
     # 获取查询参数，默认为第一页
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search')
-    query = LogicError.query
+    per_page = 10  # 每页显示 10 条记录
     if search:
-        query = query.filter(
-            (LogicError.name.ilike(f"%{search}%")) |
-            (LogicError.term.ilike(f"%{search}%"))
-        )
-    per_page = 10  # 每页显示 5 条记录
-    logic_errors = query.order_by(desc(LogicError.id)).paginate(page=page, per_page=per_page, error_out=False)
-    result=[
-        {
-            'id': error.id,
-            'name': error.name,
-            'term': error.term,
-            'description': error.description,
-            'example': error.example
-        } for error in logic_errors
-    ]
+        # 检索走内存倒排索引，按相关度排序
+        matches = logic_error_index.search(search)
+        if cursor_requested():
+            try:
+                data, next_cursor = offset_cursor_page(matches, request.args.get('cursor'), per_page)
+            except CursorError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+            return jsonify({
+                    "status": "success",
+                    "data": data,
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None,
+                    "total_items": len(matches)
+            }),200
+        page = max(page, 1)
+        return jsonify({
+                "status": "success",
+                "data": matches[(page - 1) * per_page:page * per_page],
+                "total_pages": math.ceil(len(matches) / per_page),
+                "current_page": page
+        }),200
+
+    if cursor_requested():
+        # 游标分页：逻辑错误没有创建时间，按 id 倒序
+        try:
+            logic_errors = paginate_by_cursor(LogicError.query, [(LogicError.id, True)], per_page)
+        except CursorError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        return jsonify({
+                "status": "success",
+                "data": [serialize_logic_error(error) for error in logic_errors.items],
+                "next_cursor": logic_errors.next_cursor,
+                "has_more": logic_errors.has_more,
+                "total_items": logic_errors.total
+        }),200
+
+    logic_errors = LogicError.query.order_by(desc(LogicError.id)).paginate(page=page, per_page=per_page, error_out=False)
+    result = [serialize_logic_error(error) for error in logic_errors]
     return jsonify({
             "status": "success",
             "data": result,
@@ -64,6 +89,7 @@ def add_logic_error():
     logic_error = LogicError(name=name, term=term, description=description, example=example)
     db.session.add(logic_error)
     db.session.commit()
+    logic_error_index.update(logic_error)
     return jsonify({"message": "LogicError add successfully"}), 200
 
 # 编辑特定的逻辑错误
@@ -81,8 +107,36 @@ def update_logic_error(id):
     logic_error.example = data.get('example', logic_error.example)
     
     db.session.commit()
+    logic_error_index.update(logic_error)
     return jsonify({"message": "LogicError updated successfully"}), 200
 
+def validate_analysis_table(analysis_table):
+    """
+    在写数据库之前校验 analysisTable，返回 (待插入的行, 错误信息)。
+    每一项必须是对象，error.name 为非空字符串，facts 为数组（可省略），opinion 为字符串（可省略）。
+    """
+    if not isinstance(analysis_table, list):
+        return None, "analysisTable must be a list"
+    error_name_length = AnalysisData.__table__.c.error.type.length
+    rows = []
+    for index, item in enumerate(analysis_table):
+        if not isinstance(item, dict):
+            return None, f"analysisTable[{index}] must be an object"
+        facts = item.get('facts')
+        if facts is not None and not isinstance(facts, list):
+            return None, f"analysisTable[{index}].facts must be a list"
+        opinion = item.get('opinion')
+        if opinion is not None and not isinstance(opinion, str):
+            return None, f"analysisTable[{index}].opinion must be a string"
+        error = item.get('error')
+        name = error.get('name') if isinstance(error, dict) else None
+        if not isinstance(name, str) or not name:
+            return None, f"analysisTable[{index}].error.name is required"
+        if len(name) > error_name_length:
+            return None, f"analysisTable[{index}].error.name is too long"
+        rows.append({'facts': facts, 'opinion': opinion, 'error': name})
+    return rows, None
+
 @logic_errors_bp.route('/api/save_fact_opinion_analysis', methods=['POST'])
 def save_fact_opinion_analysis():
     data = request.get_json()
@@ -91,21 +145,21 @@ def save_fact_opinion_analysis():
     if not content or not analysis_table:
         return jsonify({"status": "error", "message": "Content or analysis data missing"}), 400
 
+    # 先校验全部数据，格式错误的请求不会开启任何数据库操作
+    rows, error = validate_analysis_table(analysis_table)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
+
     try:
         # 1. 将 content 数据保存到 AnalysisContent 表中
         new_analysis_content = AnalysisContent(user_id=current_user.id, content=content)
         db.session.add(new_analysis_content)
         db.session.flush()  # 保证 new_analysis_content.id 可以被 analysis_data 使用
 
-        # 2. 将每条 analysisTable 数据保存到 AnalysisData 表中
-        for item in analysis_table:
-            new_analysis_data = AnalysisData(
-                analysis_content_id=new_analysis_content.id,
-                facts=json.dumps(item.get('facts'), ensure_ascii=False),
-                opinion=item.get('opinion'),
-                error=item.get('error').get('name')
-            )
-            db.session.add(new_analysis_data)
+        # 2. 将 analysisTable 数据一次性批量（executemany）插入 AnalysisData 表，不逐行创建 ORM 对象
+        for row in rows:
+            row['analysis_content_id'] = new_analysis_content.id
+        db.session.execute(AnalysisData.__table__.insert(), rows)
 
         # 3. 提交所有数据到数据库
         db.session.commit()
@@ -128,54 +182,110 @@ def get_paged_analyses():
         page = request.args.get('page', 1, type=int)
         per_page = 5  # 每页显示 5 条记录
 
+        # 摘要在 SQL 中截取，多取一个字符用于判断是否需要加省略号，不读取完整的 content
+        query = db.session.query(
+            AnalysisContent.id,
+            AnalysisContent.created_at,
+            func.substr(AnalysisContent.content, 1, SUMMARY_LENGTH + 1).label('summary')
+        )
+
+        if cursor_requested():
+            # 游标分页：按 (created_at, id) 倒序，不做 OFFSET
+            analyses = paginate_by_cursor(query, [(AnalysisContent.created_at, True), (AnalysisContent.id, True)], per_page)
+            return jsonify({
+                "status": "success",
+                "data": serialize_analyses(analyses.items),
+                "next_cursor": analyses.next_cursor,
+                "has_more": analyses.has_more,
+                "total_items": analyses.total
+            }), 200
+
         # 分页查询 AnalysisContent 表
-        analyses = AnalysisContent.query.order_by(AnalysisContent.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        
-        # 将查询结果转换为 JSON 格式
-        result = []
-        for analysis in analyses.items:
-            content_summary = analysis.content[:300] + '...' if len(analysis.content) > 300 else analysis.content
-            result.append({
-                "id": analysis.id,
-                "content": content_summary,
-                "created_at": analysis.created_at
-            })
+        analyses = query.order_by(AnalysisContent.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
 
         # 返回数据，包括总页数、当前页
         return jsonify({
             "status": "success",
-            "data": result,
+            "data": serialize_analyses(analyses.items),
             "total_pages": analyses.pages,
             "current_page": analyses.page
         }), 200
 
+    except CursorError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500    
+
+def serialize_analyses(analyses):
+    # 将查询结果转换为 JSON 格式
+    result = []
+    for analysis in analyses:
+        summary = analysis.summary or ''
+        content_summary = summary[:SUMMARY_LENGTH] + '...' if len(summary) > SUMMARY_LENGTH else summary
+        result.append({
+            "id": analysis.id,
+            "content": content_summary,
+            "created_at": analysis.created_at
+        })
+    return result
     
 @logic_errors_bp.route('/api/analysis/<int:id>', methods=['GET'])
 def get_analysis_detail(id):
     try:
-        # 获取 AnalysisContent 对象
-        analysis_content = AnalysisContent.query.get(id)
+        # 分析内容及其分析数据通过一次 JOIN 查询取出
+        analysis_content = AnalysisContent.query.options(
+            joinedload(AnalysisContent.analysis_data)
+        ).filter_by(id=id).first()
         if not analysis_content:
             return jsonify({"status": "error", "message": "Analysis not found"}), 404
 
-        # 获取关联的 AnalysisData 对象
-        analysis_data = AnalysisData.query.filter_by(analysis_content_id=id).all()
-
         # 构造响应数据
         analysis_detail = {
             "id": analysis_content.id,
             "content": analysis_content.content,
             "created_at": analysis_content.created_at,
             "data": [{
-                "facts": json.loads(data.facts),  # 将 JSON 字符串转换回列表
+                "facts": decode_facts(data.facts),
                 "opinion": data.opinion,
                 "error": data.error
-            } for data in analysis_data]
+            } for data in analysis_content.analysis_data]
         }
 
         return jsonify({"status": "success", "data": analysis_detail}), 200
 
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
+
+def decode_facts(facts):
+    """
+    facts 以原生 JSON 存储。早期数据先 json.dumps 再存入 JSON 列，读出来是字符串，需要再解析一次；
+    执行 flask logic_errors migrate-facts 后不再有这类数据。
+    """
+    if isinstance(facts, str):
+        try:
+            return json.loads(facts)
+        except ValueError:
+            return facts
+    return facts
+
+@logic_errors_bp.cli.command('migrate-facts')
+def migrate_facts():
+    """将重复编码为 JSON 字符串的 analysis_data.facts 转为原生 JSON：flask logic_errors migrate-facts"""
+    table = AnalysisData.__table__
+    update = table.update().where(table.c.id == bindparam('row_id')).values(facts=bindparam('facts'))
+    last_id, migrated = 0, 0
+    while True:
+        # 按 id 分批处理，避免一次载入全表
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.facts).where(table.c.id > last_id).order_by(table.c.id).limit(1000)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        params = [{'row_id': row.id, 'facts': decode_facts(row.facts)} for row in rows if isinstance(row.facts, str)]
+        params = [param for param in params if not isinstance(param['facts'], str)]
+        if params:
+            db.session.execute(update, params)
+            db.session.commit()
+            migrated += len(params)
+    print(f'{migrated} analysis_data row(s) migrated')
@@ -1,48 +1,234 @@
-from flask import Flask, request, jsonify, send_file, Blueprint
+from flask import Flask, request, jsonify, send_file, Blueprint, url_for
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import hashlib
 import os
+import shutil
 import subprocess
-import uuid
+import threading
 import time
+import uuid
 
 mermaid_bp = Blueprint('mermaid', __name__)
 
 # Define the directory for storing temporary files
 TEMP_DIR = "temp_diagrams"
-os.makedirs(TEMP_DIR, exist_ok=True)
+# Rendered diagrams are cached here by SHA-256 of the Mermaid source plus output format
+CACHE_DIR = os.path.join(TEMP_DIR, "cache")
+os.makedirs(CACHE_DIR, exist_ok=True)
 
-@mermaid_bp.route('/generate-mermaid', methods=['POST'])
-def generate_mermaid():
-    try:
-        # Step 1: Get the Mermaid code from the request
-        data = request.get_json()
-        if not data or 'mermaid_code' not in data:
-            return jsonify({"error": "Mermaid code not provided"}), 400
+# mmdc location: MMDC_PATH environment variable first, then PATH
+MMDC_PATH = os.environ.get('MMDC_PATH') or shutil.which('mmdc') or 'mmdc'
+RENDER_WORKERS = int(os.environ.get('MERMAID_RENDER_WORKERS', 2))
+RENDER_TIMEOUT = 60  # seconds allowed for a single mmdc run
+SYNC_WAIT_TIMEOUT = 30  # seconds /generate-mermaid waits before answering with a job
+MAX_CACHE_ENTRIES = 1000
+FAILED_JOB_TTL = 600  # seconds a failed job stays pollable
+MAX_FAILED_JOBS = 200  # failed jobs kept at most, oldest dropped first
+
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+
+class MermaidRenderer:
+    """
+    Renders Mermaid diagrams on a bounded pool of workers and caches the output on disk.
+    Identical source/format pairs share one cache entry and one in-flight job, so
+    requests for unchanged diagrams never start Chromium again.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mermaid-render')
+        self.jobs = {}  # job id -> Future
+        self.failed_at = {}  # job id -> time.monotonic() of the failure, oldest first
+        # Re-entrant: a job that is already done runs its done-callback inside submit()
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def job_id(mermaid_code, fmt):
+        return hashlib.sha256(f'{fmt}\0{mermaid_code}'.encode('utf-8')).hexdigest()
 
-        mermaid_code = data['mermaid_code']
+    @staticmethod
+    def output_path(job_id, fmt):
+        return os.path.join(CACHE_DIR, f'{job_id}.{fmt}')
+
+    def cached(self, job_id, fmt):
+        path = self.output_path(job_id, fmt)
+        return path if os.path.exists(path) else None
+
+    def submit(self, mermaid_code, fmt='png'):
+        """Returns (job_id, future); the future resolves to the rendered file path."""
+        job_id = self.job_id(mermaid_code, fmt)
+        with self.lock:
+            self._prune_failures()
+            future = self.jobs.get(job_id)
+            # Re-submit if a previous attempt failed, otherwise join the in-flight job
+            if future is None or (future.done() and future.exception() is not None):
+                future = self.executor.submit(self._render, mermaid_code, fmt, job_id)
+                self.jobs[job_id] = future
+                self.failed_at.pop(job_id, None)
+                future.add_done_callback(lambda f, job_id=job_id: self._finished(job_id, f))
+        return job_id, future
+
+    def status(self, job_id, fmt):
+        if self.cached(job_id, fmt):
+            return {'status': 'done'}
+        with self.lock:
+            self._prune_failures()
+            future = self.jobs.get(job_id)
+        if future is None:
+            return None
+        if not future.done():
+            return {'status': 'pending'}
+        error = future.exception()
+        if error is not None:
+            return {'status': 'failed', 'error': describe_error(error)}
+        return {'status': 'done'}
+
+    def _finished(self, job_id, future):
+        # Successful jobs are served from the cache from now on; failures stay pollable for FAILED_JOB_TTL
+        with self.lock:
+            if self.jobs.get(job_id) is not future:
+                return
+            if future.exception() is None:
+                del self.jobs[job_id]
+            else:
+                self.failed_at[job_id] = time.monotonic()
+                self._prune_failures()
+
+    def _prune_failures(self):
+        """Forgets expired failures, and the oldest ones beyond MAX_FAILED_JOBS, with their captured output. Caller holds the lock."""
+        expired_before = time.monotonic() - FAILED_JOB_TTL
+        for job_id, failed_at in list(self.failed_at.items()):
+            if failed_at > expired_before and len(self.failed_at) <= MAX_FAILED_JOBS:
+                break
+            del self.failed_at[job_id]
+            del self.jobs[job_id]
+
+    def _render(self, mermaid_code, fmt, job_id):
+        output_file = self.output_path(job_id, fmt)
+        if os.path.exists(output_file):
+            return output_file
 
-        # Step 2: Create a unique filename for the Mermaid diagram
         unique_id = str(uuid.uuid4())
         input_file = os.path.join(TEMP_DIR, f"{unique_id}.mmd")
-        output_file = os.path.join(TEMP_DIR, f"{unique_id}.png")
-
-        # Step 3: Write the Mermaid code to a temporary file
-        with open(input_file, 'w', encoding='utf-8') as f:
-            f.write(mermaid_code)
-
-        # Step 4: Run the Mermaid CLI to generate the diagram
-        mmdc_path = r'C:\Users\tuxia\AppData\Roaming\npm\mmdc.cmd'  # Assuming 'mmdc' is available in PATH
-        subprocess.run([mmdc_path, '-i', input_file, '-o', output_file, '-f', 'png'], check=True)
-
-        # Step 5: Send the generated diagram as a response
-        return send_file(output_file, mimetype='image/png', as_attachment=True, download_name='diagram.png')
-    except FileNotFoundError:
-        return jsonify({"error": "Mermaid CLI (mmdc) not found. Please ensure it's installed and in your PATH."}), 500
-    except subprocess.CalledProcessError:
-        return jsonify({"error": "Failed to generate the Mermaid diagram."}), 500
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        # Step 6: Clean up the temporary files
-        if os.path.exists(input_file):
-            os.remove(input_file)
+        temp_output = os.path.join(TEMP_DIR, f"{unique_id}.{fmt}")
+        try:
+            with open(input_file, 'w', encoding='utf-8') as f:
+                f.write(mermaid_code)
+            subprocess.run([MMDC_PATH, '-i', input_file, '-o', temp_output, '-f', fmt],
+                           check=True, timeout=RENDER_TIMEOUT, capture_output=True)
+            # Publish atomically so readers never see a partially written file
+            os.replace(temp_output, output_file)
+        finally:
+            for path in (input_file, temp_output):
+                if os.path.exists(path):
+                    os.remove(path)
+        self._prune_cache()
+        return output_file
+
+    def _prune_cache(self):
+        """Drops the least recently written files once the cache grows past MAX_CACHE_ENTRIES."""
+        entries = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR)]
+        if len(entries) <= MAX_CACHE_ENTRIES:
+            return
+        entries.sort(key=lambda path: os.path.getmtime(path))
+        for path in entries[:len(entries) - MAX_CACHE_ENTRIES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+renderer = MermaidRenderer()
+
+
+def describe_error(error):
+    if isinstance(error, FileNotFoundError):
+        return "Mermaid CLI (mmdc) not found. Please ensure it's installed and in your PATH."
+    if isinstance(error, (subprocess.CalledProcessError, subprocess.TimeoutExpired)):
+        return "Failed to generate the Mermaid diagram."
+    return str(error)
+
+
+def parse_render_request():
+    data = request.get_json(silent=True)
+    if not data or 'mermaid_code' not in data:
+        return None, None, (jsonify({"error": "Mermaid code not provided"}), 400)
+    fmt = data.get('format', 'png')
+    if fmt not in FORMATS:
+        return None, None, (jsonify({"error": "Unsupported format", "allowed_formats": list(FORMATS)}), 400)
+    return data['mermaid_code'], fmt, None
+
+
+def job_response(job_id, fmt, status):
+    body = dict(status, job_id=job_id, format=fmt,
+                poll_url=url_for('mermaid.get_mermaid_job', job_id=job_id, format=fmt))
+    if status['status'] == 'done':
+        body['url'] = url_for('mermaid.get_mermaid_diagram', job_id=job_id, fmt=fmt)
+        return jsonify(body), 200
+    if status['status'] == 'failed':
+        return jsonify(body), 500
+    return jsonify(body), 202
+
+
+@mermaid_bp.route('/generate-mermaid', methods=['POST'])
+def generate_mermaid():
+    """Renders synchronously and returns the image; cache hits return immediately."""
+    mermaid_code, fmt, error = parse_render_request()
+    if error:
+        return error
+
+    job_id = renderer.job_id(mermaid_code, fmt)
+    output_file = renderer.cached(job_id, fmt)
+    if output_file is None:
+        job_id, future = renderer.submit(mermaid_code, fmt)
+        try:
+            output_file = future.result(timeout=SYNC_WAIT_TIMEOUT)
+        except FutureTimeoutError:
+            # Still rendering: let the client poll instead of holding the worker
+            return job_response(job_id, fmt, {'status': 'pending'})
+        except Exception as e:
+            return jsonify({"error": describe_error(e)}), 500
+
+    return send_file(os.path.abspath(output_file), mimetype=FORMATS[fmt], as_attachment=True,
+                     download_name=f'diagram.{fmt}')
+
+
+@mermaid_bp.route('/mermaid/jobs', methods=['POST'])
+def create_mermaid_job():
+    """Starts a render without waiting: 200 with the diagram URL on a cache hit, otherwise 202 and a poll URL."""
+    mermaid_code, fmt, error = parse_render_request()
+    if error:
+        return error
+
+    job_id = renderer.job_id(mermaid_code, fmt)
+    if renderer.cached(job_id, fmt):
+        return job_response(job_id, fmt, {'status': 'done'})
+    job_id, _ = renderer.submit(mermaid_code, fmt)
+    return job_response(job_id, fmt, renderer.status(job_id, fmt) or {'status': 'pending'})
+
+
+@mermaid_bp.route('/mermaid/jobs/<job_id>', methods=['GET'])
+def get_mermaid_job(job_id):
+    fmt = request.args.get('format', 'png')
+    if fmt not in FORMATS:
+        return jsonify({"error": "Unsupported format", "allowed_formats": list(FORMATS)}), 400
+    status = renderer.status(job_id, fmt)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return job_response(job_id, fmt, status)
+
 
+@mermaid_bp.route('/mermaid/diagrams/<job_id>.<fmt>', methods=['GET'])
+def get_mermaid_diagram(job_id, fmt):
+    if fmt not in FORMATS or not all(c in '0123456789abcdef' for c in job_id):
+        return jsonify({"error": "Diagram not found"}), 404
+    output_file = renderer.cached(job_id, fmt)
+    if output_file is None:
+        return jsonify({"error": "Diagram not found"}), 404
+    # Content-addressed: the same URL always yields the same bytes
+    response = send_file(os.path.abspath(output_file), mimetype=FORMATS[fmt], conditional=True, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
@@ -1,82 +1,150 @@
+import io
+import logging
 import threading
-from flask import Blueprint, request, jsonify
-from minio import Minio
-from minio.error import S3Error
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Response, current_app, redirect, request, jsonify
 import os
 import re
+import secrets
 import time
+from datetime import datetime, timedelta, timezone
 from urllib.parse import quote
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.exceptions import RequestEntityTooLarge
 
 minio_bp = Blueprint('minio', __name__)
-minio_client = None
-# 配置 MinIO 客户端
-def initialize_minio():
-    global minio_client
-    try:
-        minio_client = Minio(
-            'localhost:9000',  # MinIO 的地址
+logger = logging.getLogger(__name__)
+
+BUCKET_NAME = 'decision-aid-bucket'
+MINIO_ENDPOINT = 'localhost:9000'  # MinIO 的地址
+MINIO_SECURE = False  # 如果使用的是 HTTP 而不是 HTTPS
+
+
+def s3_error():
+    """
+    返回 minio.error.S3Error。minio SDK 只在首次使用时导入，因此用 `except s3_error():` 捕获：
+    except 子句的表达式只在异常发生时才求值，能抛出 S3Error 时 SDK 必然已经导入。
+    """
+    from minio.error import S3Error
+    return S3Error
+
+
+class LazyMinioClient:
+    """首次调用时才导入 minio SDK 并创建客户端、检查存储桶，导入本模块不会连接 MinIO"""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _initialize(self):
+        from minio import Minio
+
+        # 配置 MinIO 客户端
+        client = Minio(
+            MINIO_ENDPOINT,
             access_key='minioadmin',  # MinIO 的访问密钥
             secret_key='minioadmin',  # MinIO 的私密密钥
-            secure=False  # 如果使用的是 HTTP 而不是 HTTPS
+            secure=MINIO_SECURE
         )
-    except S3Error as e:
-        minio_client = None
-        print("Warning: Unable to connect to MinIO, retrying...")
+        # 创建存储桶（如果不存在），MinIO 暂不可用时跳过，不影响客户端创建
+        try:
+            if not client.bucket_exists(BUCKET_NAME):
+                client.make_bucket(BUCKET_NAME)
+        except Exception as e:
+            logger.warning(f"Unable to check MinIO bucket {BUCKET_NAME}: {e}")
+        return client
 
-# 启动时异步初始化
-threading.Thread(target=initialize_minio).start()
+    def __getattr__(self, name):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._initialize()
+        return getattr(self._client, name)
 
 
-BUCKET_NAME = 'decision-aid-bucket'
-
-# 使用 MinIO 时应检查 minio_client 是否可用
-if minio_client:
-    # MinIO 可用时的处理
-    # 创建存储桶（如果不存在）
-    if not minio_client.bucket_exists(BUCKET_NAME):
-        minio_client.make_bucket(BUCKET_NAME)
-    pass
-else:
-    # MinIO 不可用时的处理，跳过或做替代方案
-    pass
+minio_client = LazyMinioClient()
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+FORM_OVERHEAD = 64 * 1024  # multipart 表单中除文件内容外的边界、字段等开销
+
+class LimitedUploadStream:
+    """
+    包装 wsgi.input，在读取请求体的同时计数，超过 limit 字节立即中止。
+    每次读取都不会越过 limit + 1 字节，因此超限请求最多只会读取 limit + 1 字节。
+    """
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.bytes_read = 0
+
+    def _clamp(self, size):
+        remaining = self.limit + 1 - self.bytes_read
+        if size is None or size < 0 or size > remaining:
+            return remaining
+        return size
+
+    def _count(self, data):
+        self.bytes_read += len(data)
+        if self.bytes_read > self.limit:
+            raise RequestEntityTooLarge()
+        return data
+
+    def read(self, size=-1):
+        return self._count(self.stream.read(self._clamp(size)))
+
+    def readline(self, size=-1):
+        return self._count(self.stream.readline(self._clamp(size)))
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+def upload_limit(business_type):
+    """业务类型对应的单文件大小上限，未知类型取所有类型中的最大值"""
+    if business_type in ALLOWED_TYPES:
+        return ALLOWED_TYPES[business_type]['max_size']
+    return max(item['max_size'] for item in ALLOWED_TYPES.values())
+
+def file_too_large_response(limit):
+    return jsonify({'error': f'单个文件大小不能超过 {limit//(1024*1024)}MB'}), 413
+
+@minio_bp.errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(e):
+    return file_too_large_response(upload_limit(request.args.get('type')))
+
 @minio_bp.before_request
-def check_file_size():
-    if request.method == 'POST':
-        # 处理单文件上传
-        if 'file' in request.files:
-            file = request.files['file']
-            file.seek(0, 2)  # 移动到文件末尾
-            size = file.tell()
-            file.seek(0)  # 重置文件指针
-            if size > MAX_FILE_SIZE:
-                return jsonify({'error': f'单个文件大小不能超过 {MAX_FILE_SIZE//(1024*1024)}MB'}), 400
-        
-        # 处理多文件上传 (字段名为 files[])
-        elif 'files[]' in request.files:
-            for file in request.files.getlist('files[]'):
-                file.seek(0, 2)
-                size = file.tell()
-                file.seek(0)
-                if size > MAX_FILE_SIZE:
-                    return jsonify({
-                        'error': f'文件 {file.filename} 大小超过限制 ({MAX_FILE_SIZE//(1024*1024)}MB)'
-                    }), 400
-        
-        # 处理自定义多文件字段名
-        else:
-            for file_field in request.files:
-                for file in request.files.getlist(file_field):
-                    file.seek(0, 2)
-                    size = file.tell()
-                    file.seek(0)
-                    if size > MAX_FILE_SIZE:
-                        return jsonify({
-                            'error': f'文件 {file.filename} 大小超过限制 ({MAX_FILE_SIZE//(1024*1024)}MB)'
-                        }), 400
-        
+def guard_upload_size():
+    """
+    在读取请求体之前限制上传大小：先检查 Content-Length，再用计数流在读取过程中截断，
+    超限的请求不会被完整读入或落盘。前端可在查询参数中带上 type 以使用该业务类型的上限。
+    """
+    if request.method != 'POST' or request.mimetype != 'multipart/form-data':
+        return
+
+    limit = upload_limit(request.args.get('type'))
+    body_limit = limit + FORM_OVERHEAD
+    if request.content_length is not None and request.content_length > body_limit:
+        return file_too_large_response(limit)
+    request.environ['wsgi.input'] = LimitedUploadStream(request.environ['wsgi.input'], body_limit)
+
+def exceeds_limit(file, limit):
+    """
+    判断已解析的文件是否超过上限。请求体总字节数不超过上限时文件必然不超限，无需测量；
+    只有请求体接近上限时才定位到文件末尾精确测量（此时文件已受计数流约束）。
+    """
+    stream = request.environ.get('wsgi.input')
+    if isinstance(stream, LimitedUploadStream) and stream.bytes_read <= limit:
+        return False
+    file.stream.seek(0, 2)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    return size > limit
+
 def mixed_filename(original_filename):
     base, ext = os.path.splitext(original_filename)
     # 保留前10个安全字符（包括中文）
@@ -84,6 +152,11 @@ def mixed_filename(original_filename):
     timestamp = int(time.time())
     return f"{timestamp}_{safe_base}{ext}"
 
+def presigned_filename(original_filename):
+    """直传的对象名在 mixed_filename 之后附加随机部分（基础名最多 10 个字符），与 /upload 写入的对象名不会重复"""
+    base, ext = os.path.splitext(mixed_filename(original_filename))
+    return f"{base}_{secrets.token_hex(8)}{ext}"
+
 ALLOWED_EXTENSIONS = {
     'avatar': {'jpg', 'jpeg', 'png'},
     'article': {'jpg', 'jpeg', 'png'},
@@ -93,6 +166,29 @@ ALLOWED_EXTENSIONS = {
     'review': {'jpg', 'jpeg', 'png'}
 }
 
+# 定义允许上传的业务类型、对应路径和单文件大小上限
+ALLOWED_TYPES = {
+    'avatar': {'prefix': 'avatar/', 'max_size': MAX_FILE_SIZE},
+    'article': {'prefix': 'article/', 'max_size': MAX_FILE_SIZE},
+    'feedback': {'prefix': 'feedback/', 'max_size': MAX_FILE_SIZE},
+    'inspiration': {'prefix': 'inspiration/', 'max_size': MAX_FILE_SIZE},
+    'reflection': {'prefix': 'reflection/', 'max_size': MAX_FILE_SIZE},
+    'review': {'prefix': 'review/', 'max_size': MAX_FILE_SIZE}
+}
+
+# 预签名直传时 MinIO 按扩展名校验的 Content-Type
+UPLOAD_CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+
+def upload_content_type(filename):
+    return UPLOAD_CONTENT_TYPES[filename.rsplit('.', 1)[1].lower()]
+
 def allowed_file(filename, business_type):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS.get(business_type, set())
@@ -102,16 +198,6 @@ def upload_file():
     # 获取业务类型参数
     business_type = request.form.get('type')
     
-    # 定义允许的业务类型和对应路径
-    ALLOWED_TYPES = {
-        'avatar': 'avatar/',
-        'article': 'article/',
-        'feedback': 'feedback/',
-        'inspiration': 'inspiration/',
-        'reflection': 'reflection/',
-        'review': 'review/'
-    }
-    
     # 验证业务类型
     if not business_type or business_type not in ALLOWED_TYPES:
         return jsonify({
@@ -131,27 +217,275 @@ def upload_file():
             'error': 'Invalid file type',
             'allowed_file_types': ALLOWED_EXTENSIONS.get(business_type)
         }), 400
+    # 按业务类型校验文件大小
+    limit = ALLOWED_TYPES[business_type]['max_size']
+    if exceeds_limit(file, limit):
+        return file_too_large_response(limit)
+
     # 将文件名安全化并添加业务路径前缀
-    filename = ALLOWED_TYPES[business_type] + mixed_filename(file.filename)
+    filename = ALLOWED_TYPES[business_type]['prefix'] + mixed_filename(file.filename)
 
     try:
-        # 将文件保存到 MinIO
-        minio_client.put_object(
-            BUCKET_NAME,
-            filename,
-            file.stream,
-            os.fstat(file.fileno()).st_size,
-            content_type=file.content_type
-        )
+        # 将文件保存到 MinIO，大文件自动切分为分片并发上传
+        upload_stream(filename, file.stream, content_type=file.content_type)
+        # 图片在后台生成缩略图，不占用本次请求的时间
+        if business_type in IMAGE_TYPES and is_image(filename):
+            schedule_derivatives(filename)
 
         # 生成可访问的 presigned URL
         file_url = f'http://localhost:5000/files/{filename}'
 
         return jsonify({'url': file_url,'filename':filename}), 200
 
-    except S3Error as err:
+    except s3_error() as err:
+        return jsonify({'error': str(err)}), 500
+
+MULTIPART_THRESHOLD = 5 * 1024 * 1024  # 超过该大小使用分片上传（S3 要求分片至少 5MB）
+MULTIPART_PART_SIZE = 5 * 1024 * 1024  # 分片大小
+MULTIPART_PARALLELISM = 4  # 并发上传的分片数
+
+# 上传吞吐统计，按上传方式（single / multipart）分别累计
+UPLOAD_METRICS = {
+    'single': {'count': 0, 'bytes': 0, 'seconds': 0.0, 'failures': 0},
+    'multipart': {'count': 0, 'bytes': 0, 'seconds': 0.0, 'failures': 0}
+}
+upload_metrics_lock = threading.Lock()
+
+def stream_size(stream):
+    """获取可定位流的剩余长度，不依赖 fileno()，内存中的流同样适用；不可定位时返回 -1"""
+    try:
+        position = stream.tell()
+        stream.seek(0, 2)
+        size = stream.tell() - position
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return -1
+
+def record_upload_metrics(mode, size, seconds, failed=False):
+    with upload_metrics_lock:
+        metrics = UPLOAD_METRICS[mode]
+        if failed:
+            metrics['failures'] += 1
+            return
+        metrics['count'] += 1
+        metrics['bytes'] += max(size, 0)
+        metrics['seconds'] += seconds
+
+def upload_stream(object_name, stream, content_type=None):
+    """
+    将文件流写入 MinIO。小文件一次性上传；超过 MULTIPART_THRESHOLD 或长度未知时走分片上传，
+    由 MinIO SDK 的有界线程池并发上传各分片，任一分片失败都会中止整个分片上传，不留下残缺对象。
+    """
+    size = stream_size(stream)
+    multipart = size < 0 or size > MULTIPART_THRESHOLD
+    mode = 'multipart' if multipart else 'single'
+    started = time.monotonic()
+    try:
+        if multipart:
+            result = minio_client.put_object(
+                BUCKET_NAME, object_name, stream, size,
+                content_type=content_type or 'application/octet-stream',
+                part_size=MULTIPART_PART_SIZE,
+                num_parallel_uploads=MULTIPART_PARALLELISM
+            )
+        else:
+            result = minio_client.put_object(
+                BUCKET_NAME, object_name, stream, size,
+                content_type=content_type or 'application/octet-stream'
+            )
+    except Exception:
+        record_upload_metrics(mode, size, time.monotonic() - started, failed=True)
+        raise
+    record_upload_metrics(mode, size, time.monotonic() - started)
+    return result
+
+@minio_bp.route('/upload/metrics', methods=['GET'])
+def get_upload_metrics():
+    """返回各上传方式的累计次数、字节数和平均吞吐（MB/s）"""
+    with upload_metrics_lock:
+        snapshot = {mode: dict(metrics) for mode, metrics in UPLOAD_METRICS.items()}
+    for metrics in snapshot.values():
+        seconds = metrics['seconds']
+        metrics['throughput_mbps'] = round(metrics['bytes'] / seconds / (1024 * 1024), 2) if seconds else 0
+    return jsonify(snapshot), 200
+
+PRESIGNED_URL_EXPIRES = timedelta(minutes=15)  # 预签名地址的有效期
+
+def presigned_mode_enabled():
+    # 预签名直传模式需在配置中显式开启：MINIO_PRESIGNED_MODE = True
+    return current_app.config.get('MINIO_PRESIGNED_MODE', False)
+
+def upload_token_serializer():
+    # /upload/presign 签发的对象名凭证，/upload/complete 只登记持有有效凭证的对象
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='presigned-upload')
+
+@minio_bp.route('/upload/presign', methods=['POST'])
+def presign_upload():
+    """
+    预签名直传第一步：校验业务类型和扩展名后，返回浏览器直接 POST 到 MinIO 的地址和表单字段。
+    上传完成后需调用 /upload/complete 登记对象。
+    """
+    if not presigned_mode_enabled():
+        return jsonify({'error': 'Presigned upload is disabled'}), 404
+
+    data = request.get_json() or {}
+    business_type = data.get('type')
+    original_filename = data.get('filename', '')
+
+    if not business_type or business_type not in ALLOWED_TYPES:
+        return jsonify({
+            'error': 'Invalid or missing type parameter',
+            'allowed_types': list(ALLOWED_TYPES.keys())
+        }), 400
+
+    if not allowed_file(original_filename, business_type):
+        return jsonify({
+            'error': 'Invalid file type',
+            'allowed_file_types': sorted(ALLOWED_EXTENSIONS.get(business_type, set()))
+        }), 400
+
+    filename = ALLOWED_TYPES[business_type]['prefix'] + presigned_filename(original_filename)
+    content_type = upload_content_type(filename)
+    limit = ALLOWED_TYPES[business_type]['max_size']
+
+    # 使用 POST 策略而不是预签名 PUT：对象名、Content-Type 和大小上限都写进签名的策略中，
+    # 不符合条件的上传由 MinIO 直接拒绝，与经过应用服务器的 /upload 使用同样的限制
+    from minio.datatypes import PostPolicy
+    policy = PostPolicy(BUCKET_NAME, datetime.now(timezone.utc) + PRESIGNED_URL_EXPIRES)
+    policy.add_equals_condition('key', filename)
+    policy.add_equals_condition('Content-Type', content_type)
+    policy.add_content_length_range_condition(1, limit)
+    try:
+        form_data = minio_client.presigned_post_policy(policy)
+    except s3_error() as err:
         return jsonify({'error': str(err)}), 500
 
+    return jsonify({
+        'upload_url': f"{'https' if MINIO_SECURE else 'http'}://{MINIO_ENDPOINT}/{BUCKET_NAME}",
+        'method': 'POST',
+        # 以 multipart/form-data 提交这些字段，file 字段放在最后
+        'fields': dict(form_data, key=filename, **{'Content-Type': content_type}),
+        'filename': filename,
+        'upload_token': upload_token_serializer().dumps({'key': filename}),
+        'max_size': limit,
+        'expires_in': int(PRESIGNED_URL_EXPIRES.total_seconds())
+    }), 200
+
+@minio_bp.route('/upload/complete', methods=['POST'])
+def complete_upload():
+    """
+    预签名直传第二步：凭 /upload/presign 返回的 upload_token 确认对象已写入 MinIO，并校验其大小和类型。
+    只处理该凭证签发的对象名，凭证无效、过期或与 filename 不符时返回 403，不会读取或删除其他对象。
+    返回值与 /upload 保持一致。
+    """
+    if not presigned_mode_enabled():
+        return jsonify({'error': 'Presigned upload is disabled'}), 404
+
+    data = request.get_json() or {}
+    filename = data.get('filename', '')
+    try:
+        # 上传须在策略有效期内开始，登记再多留出同样长的时间
+        token = upload_token_serializer().loads(data.get('upload_token', ''),
+                                                max_age=2 * PRESIGNED_URL_EXPIRES.total_seconds())
+    except BadSignature:
+        return jsonify({'error': 'Invalid or expired upload token'}), 403
+    if not isinstance(token, dict) or token.get('key') != filename:
+        return jsonify({'error': 'Upload token does not match filename'}), 403
+
+    business_type = filename.split('/', 1)[0]
+    if business_type not in ALLOWED_TYPES or not allowed_file(filename, business_type):
+        return jsonify({'error': 'Invalid filename'}), 400
+
+    try:
+        stat = minio_client.stat_object(BUCKET_NAME, filename)
+        limit = ALLOWED_TYPES[business_type]['max_size']
+        # 对象名由 presign 生成且带随机部分，只会由直传写入，不合规时删除不会影响 /upload 写入的对象
+        if stat.size > limit:
+            minio_client.remove_object(BUCKET_NAME, filename)
+            return file_too_large_response(limit)
+        # 策略已限制 Content-Type，这里再确认一次，防止策略之外写入的对象被登记
+        if stat.content_type != upload_content_type(filename):
+            minio_client.remove_object(BUCKET_NAME, filename)
+            return jsonify({'error': 'Invalid content type'}), 400
+    except s3_error() as err:
+        return jsonify({'error': str(err)}), 404
+
+    current_app.logger.info(f"Presigned upload completed: {filename} ({stat.size} bytes)")
+    if business_type in IMAGE_TYPES and is_image(filename):
+        schedule_derivatives(filename)
+    file_url = f'http://localhost:5000/files/{filename}'
+    return jsonify({'url': file_url, 'filename': filename}), 200
+
+# 图片缩略图：以 WebP 格式存放在同一存储桶的 derived/ 前缀下
+IMAGE_TYPES = {'avatar', 'article', 'inspiration', 'reflection'}
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+DERIVED_PREFIX = 'derived/'
+DERIVATIVE_WIDTHS = (64, 128, 256, 512, 1024)
+DERIVATIVE_QUALITY = 80
+
+derivative_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+pending_derivatives = set()
+pending_derivatives_lock = threading.Lock()
+
+def is_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+def pick_derivative_width(width):
+    """选择不小于请求宽度的最小预设宽度，超出预设范围时使用最大宽度"""
+    for candidate in DERIVATIVE_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return DERIVATIVE_WIDTHS[-1]
+
+def derivative_name(object_path, width):
+    return f"{DERIVED_PREFIX}{width}/{object_path.rsplit('.', 1)[0]}.webp"
+
+def schedule_derivatives(object_path):
+    """提交后台任务生成所有预设宽度的缩略图，同一对象同时只会有一个任务"""
+    with pending_derivatives_lock:
+        if object_path in pending_derivatives:
+            return
+        pending_derivatives.add(object_path)
+    derivative_executor.submit(generate_derivatives, object_path)
+
+def generate_derivatives(object_path):
+    try:
+        # Pillow 为可选依赖，未安装时直接返回原图
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed, image derivatives are disabled")
+        with pending_derivatives_lock:
+            pending_derivatives.discard(object_path)
+        return
+
+    try:
+        obj = minio_client.get_object(BUCKET_NAME, object_path)
+        try:
+            original = Image.open(io.BytesIO(obj.read()))
+            original.load()
+        finally:
+            obj.close()
+            obj.release_conn()
+
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+        for width in DERIVATIVE_WIDTHS:
+            image = original.copy()
+            if image.width > width:
+                image.thumbnail((width, image.height))
+            buffer = io.BytesIO()
+            image.save(buffer, format='WEBP', quality=DERIVATIVE_QUALITY)
+            size = buffer.tell()
+            buffer.seek(0)
+            minio_client.put_object(BUCKET_NAME, derivative_name(object_path, width), buffer, size,
+                                    content_type='image/webp')
+    except Exception:
+        logger.exception(f"Failed to generate derivatives for {object_path}")
+    finally:
+        with pending_derivatives_lock:
+            pending_derivatives.discard(object_path)
+
 def rfc5987_encode(filename):
     return "filename*=utf-8''{}".format(quote(filename, safe=''))
 
@@ -163,7 +497,8 @@ def serve_file(business_type, filename):
         'article': 'article/',
         'feedback': 'feedback/',
         'inspiration': 'inspiration/',
-        'reflection': 'reflection/'
+        'reflection': 'reflection/',
+        'diagram': 'diagram/'  # 平台清单预渲染的流程图，仅供读取
     }
     
     # 验证业务类型
@@ -175,12 +510,102 @@ def serve_file(business_type, filename):
 
     # 构建完整的存储路径
     object_path = ALLOWED_TYPES[business_type] + filename
-    
+
+    # 图片可通过 ?w= 请求缩略图，缩略图尚未生成时先返回原图并在后台生成
+    stat = None
+    width = request.args.get('w', type=int)
+    if width and business_type in IMAGE_TYPES and is_image(filename):
+        derived_path = derivative_name(object_path, pick_derivative_width(width))
+        try:
+            stat = minio_client.stat_object(BUCKET_NAME, derived_path)
+            object_path = derived_path
+        except s3_error():
+            # 缩略图不存在：原图确实存在时才提交生成任务，不存在的对象直接返回 404
+            try:
+                stat = minio_client.stat_object(BUCKET_NAME, object_path)
+            except s3_error() as err:
+                return jsonify({'error': str(err)}), 404
+            schedule_derivatives(object_path)
+
+    # 预签名模式下直接重定向到 MinIO，下载流量不再经过应用服务器
+    if presigned_mode_enabled():
+        try:
+            download_url = minio_client.presigned_get_object(
+                BUCKET_NAME, object_path, expires=PRESIGNED_URL_EXPIRES,
+                response_headers={'response-content-disposition': f'inline; filename={rfc5987_encode(filename)}'}
+            )
+        except s3_error() as err:
+            return jsonify({'error': str(err)}), 404
+        return redirect(download_url, code=302)
+
+    if stat is None:
+        try:
+            stat = minio_client.stat_object(BUCKET_NAME, object_path)
+        except s3_error() as err:
+            return jsonify({'error': str(err)}), 404
+
+    # 条件请求：ETag 优先，其次 Last-Modified
+    last_modified = stat.last_modified.replace(microsecond=0) if stat.last_modified else None
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(stat.etag)
+    else:
+        not_modified = bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+    if not_modified:
+        response = Response(status=304)
+        response.set_etag(stat.etag)
+        response.last_modified = last_modified
+        return response
+
+    # Range 请求：If-Range 与当前 ETag 不一致时按完整内容返回
+    status = 200
+    offset, length = 0, stat.size
+    byte_range = request.range
+    if_range = request.if_range
+    range_valid = 'If-Range' not in request.headers or if_range.etag == stat.etag or \
+        bool(if_range.date and last_modified and last_modified <= if_range.date)
+    if byte_range and range_valid:
+        range_for_length = byte_range.range_for_length(stat.size)
+        if range_for_length is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{stat.size}'})
+        start, stop = range_for_length
+        status = 206
+        offset, length = start, stop - start
+
     try:
-        response = minio_client.get_object(BUCKET_NAME, object_path)
-        return response.data, 200, {
-            'Content-Type': response.headers['Content-Type'],
-            'Content-Disposition': f'inline; filename={rfc5987_encode(filename)}'
-        }
-    except S3Error as err:
-        return jsonify({'error': str(err)}), 404
\ No newline at end of file
+        # length=0 表示读取到对象末尾，空对象时不需要发起 Range 请求
+        obj = minio_client.get_object(BUCKET_NAME, object_path, offset=offset, length=length if status == 206 else 0)
+    except s3_error() as err:
+        return jsonify({'error': str(err)}), 404
+
+    response = Response(ObjectStream(obj), status=status, direct_passthrough=True, headers={
+        'Content-Type': stat.content_type or 'application/octet-stream',
+        'Content-Disposition': f'inline; filename={rfc5987_encode(filename)}',
+        'Content-Length': str(length),
+        'Accept-Ranges': 'bytes'
+    })
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {offset}-{offset + length - 1}/{stat.size}'
+    response.set_etag(stat.etag)
+    response.last_modified = last_modified
+    return response
+
+STREAM_CHUNK_SIZE = 64 * 1024  # 每次从 MinIO 读取并转发的字节数
+
+class ObjectStream:
+    """
+    逐块转发 MinIO 对象内容的响应体。WSGI 服务器在响应结束后调用 close()，
+    无论响应体是否被读取（HEAD 请求、客户端中断等）都会关闭对象并释放连接。
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.obj.stream(STREAM_CHUNK_SIZE))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.obj.close()
+            self.obj.release_conn()
@@ -0,0 +1,135 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import request
+from sqlalchemy import and_, or_
+
+
+MAX_PAGE_SIZE = 100
+
+
+class CursorError(ValueError):
+    """cursor 参数无法解析"""
+
+
+class PageSizeError(CursorError):
+    """每页条数不在 1 ~ MAX_PAGE_SIZE 之间，接口按无效分页参数返回 400"""
+
+
+def check_limit(limit):
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise PageSizeError(f'Page size must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def encode_cursor(payload):
+    """将游标内容编码为不透明的 URL 安全字符串，客户端只需原样传回"""
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if not isinstance(payload, dict):
+        raise CursorError('Invalid cursor')
+    return payload
+
+
+def cursor_requested():
+    """请求中带了 cursor 参数（首页传空字符串）时使用游标分页，否则保持原有的 page 分页"""
+    return 'cursor' in request.args
+
+
+def total_requested():
+    """游标分页默认不统计总数，传 with_total=1 时才执行 COUNT"""
+    return request.args.get('with_total', type=int) == 1
+
+
+def paginate_by_cursor(query, keys, limit):
+    """按请求中的 cursor、with_total 参数做游标分页，cursor 无效时抛出 CursorError"""
+    return keyset_paginate(query, keys, request.args.get('cursor'), limit, total_requested())
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_more = next_cursor is not None
+        self.total = total
+
+
+def keyset_paginate(query, keys, cursor=None, limit=10, with_total=False):
+    """
+    按 keys 做游标分页（keyset pagination），keys 为 [(列, 是否降序), ...]，最后一列必须唯一（通常是 id）。
+    通过 WHERE (k1, k2, ...) 在上一页最后一行之后 定位下一页，不使用 OFFSET，翻到任意深度的代价都相同。
+    查询结果的每一行需要能通过列名取到 keys 中的各列。limit 超出 1 ~ MAX_PAGE_SIZE 时抛出 PageSizeError。
+    """
+    check_limit(limit)
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        values = decode_cursor(cursor).get('k')
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise CursorError('Invalid cursor')
+        values = [_decode_value(value) for value in values]
+        # 展开为 (k1 < v1) OR (k1 = v1 AND k2 < v2) OR ...，兼容不支持行值比较的数据库
+        conditions = []
+        for index, (column, descending) in enumerate(keys):
+            beyond = column < values[index] if descending else column > values[index]
+            equals = [keys[i][0] == values[i] for i in range(index)]
+            conditions.append(and_(*equals, beyond))
+        query = query.filter(or_(*conditions))
+
+    query = query.order_by(None).order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({'k': [_encode_value(getattr(last, column.key)) for column, _ in keys]})
+    return KeysetPage(rows, next_cursor, total)
+
+
+def decode_offset_cursor(cursor):
+    """按偏移量分页的游标（用于按相关度排序等无法按键定位的结果），空游标表示第一页"""
+    if not cursor:
+        return 0
+    offset = decode_cursor(cursor).get('o')
+    if not isinstance(offset, int) or offset < 0:
+        raise CursorError('Invalid cursor')
+    return offset
+
+
+def encode_offset_cursor(offset):
+    return encode_cursor({'o': offset})
+
+
+def offset_cursor_page(items, cursor, limit):
+    """对已在内存中排好序的结果做游标分页，返回 (本页结果, 下一页游标)"""
+    check_limit(limit)
+    offset = decode_offset_cursor(cursor)
+    page = items[offset:offset + limit]
+    next_cursor = encode_offset_cursor(offset + limit) if offset + limit < len(items) else None
+    return page, next_cursor
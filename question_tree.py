@@ -0,0 +1,119 @@
+import uuid
+from sqlalchemy import case, literal, select
+from shared_models import PlatformChecklistQuestion, db
+
+
+# 回写关系时每条 UPDATE 最多包含的问题数，避免 CASE 分支和绑定参数过多
+LINK_BATCH_SIZE = 500
+
+
+class QuestionTreeError(ValueError):
+    """问题树数据不合法（例如问题缺少文本）"""
+
+
+def _temp_key(value):
+    # 前端传来的 tempId 可能是数字也可能是字符串，统一按字符串比较
+    return str(value)
+
+
+def _build_rows(checklist_id, items):
+    """校验并构造待插入的问题行，校验失败时不会产生任何数据库操作"""
+    rows = []
+    for item in items:
+        question_text = item.get('question')
+        # 检查问题内容是否有效
+        if not question_text:
+            raise QuestionTreeError('Each question must have text')
+
+        rows.append({
+            'checklist_id': checklist_id,
+            'type': item.get('type', 'text'),
+            'question': question_text,
+            'description': item.get('description', ''),  # 默认为空字符串
+            'options': item.get('options', []) if item.get('type') == 'choice' else None
+        })
+    return rows
+
+
+def _resolve_links(items, question_ids, id_mapping):
+    """在内存中解析 parentTempId 和 followUpQuestions，返回需要回写的关系"""
+    links = {}
+    for item, question_id in zip(items, question_ids):
+        parent_id = None
+        if 'parentTempId' in item:
+            parent_id = id_mapping.get(_temp_key(item['parentTempId']))
+
+        follow_ups = {}
+        if item.get('type') == 'choice' and 'tempId' in item:
+            for opt_index, follow_ids in (item.get('followUpQuestions') or {}).items():
+                if isinstance(follow_ids, list):  # 处理数组形式的follow-up IDs
+                    follow_ups[opt_index] = [id_mapping[_temp_key(id)] for id in follow_ids if _temp_key(id) in id_mapping]
+                elif _temp_key(follow_ids) in id_mapping:  # 处理单个ID的情况（向后兼容）
+                    follow_ups[opt_index] = [id_mapping[_temp_key(follow_ids)]]
+
+        if parent_id is not None or follow_ups:
+            links[question_id] = (parent_id, follow_ups or None)
+    return links
+
+
+def insert_questions(rows):
+    """
+    批量插入问题并按 rows 的顺序返回数据库生成的真实ID，语句数与问题数量无关。
+    每行带上客户端生成的 insert_key：支持 RETURNING 的数据库直接在 INSERT 中取回 (id, insert_key)，
+    否则再按 insert_key 前缀查询一次，不依赖 LAST_INSERT_ID() 连续分配等假设。
+    取回ID后用一条按前缀匹配的 UPDATE 清空本批的 insert_key，关联键只在插入期间有效。
+    """
+    if not rows:
+        return []
+    batch = uuid.uuid4().hex
+    keyed_rows = [dict(row, insert_key=f'{batch}:{index}') for index, row in enumerate(rows)]
+
+    table = PlatformChecklistQuestion.__table__
+    stmt = table.insert().values(keyed_rows)
+    batch_keys = table.c.insert_key.like(f'{batch}:%')
+    if getattr(db.session.get_bind().dialect, 'insert_returning', False):
+        result = db.session.execute(stmt.returning(table.c.id, table.c.insert_key)).all()
+    else:
+        db.session.execute(stmt)
+        result = db.session.execute(select(table.c.id, table.c.insert_key).where(batch_keys)).all()
+    db.session.execute(table.update().where(batch_keys).values(insert_key=None))
+
+    id_by_key = {row.insert_key: row.id for row in result}
+    return [id_by_key[row['insert_key']] for row in keyed_rows]
+
+
+def apply_links(links):
+    """
+    回写父问题和 follow-up 关系，links: {问题ID: (parent_id, follow_ups)}，只包含确有关系的问题。
+    每 LINK_BATCH_SIZE 个问题一条 UPDATE ... SET 列 = CASE id WHEN ... END WHERE id IN (...)：
+    pymysql 的 executemany 对 UPDATE 会逐行执行，因此不使用 executemany。
+    """
+    table = PlatformChecklistQuestion.__table__
+    question_ids = list(links)
+    for start in range(0, len(question_ids), LINK_BATCH_SIZE):
+        batch = question_ids[start:start + LINK_BATCH_SIZE]
+        db.session.execute(table.update().where(table.c.id.in_(batch)).values(
+            parent_id=case({question_id: literal(links[question_id][0], db.Integer)
+                            for question_id in batch}, value=table.c.id),
+            # 没有 follow-up 的问题写入 SQL NULL，与插入时一致
+            follow_up_questions=case({question_id: literal(links[question_id][1], db.JSON(none_as_null=True))
+                                      for question_id in batch}, value=table.c.id)
+        ))
+
+
+def write_question_tree(checklist_id, items):
+    """
+    将前端提交的问题树写入指定平台清单版本。
+    先在内存中完成校验和 tempId/parentTempId/followUpQuestions 的解析，
+    再批量写入全部问题（见 insert_questions），最后只对有层级或 follow-up 关系的问题用一条 UPDATE 回写。
+    语句数与问题数量无关（见 tests/test_question_tree.py）。返回 {tempId: 新问题ID}。
+    """
+    rows = _build_rows(checklist_id, items)
+    id_mapping = {}
+    if rows:
+        question_ids = insert_questions(rows)
+        for item, question_id in zip(items, question_ids):
+            if 'tempId' in item:
+                id_mapping[_temp_key(item['tempId'])] = question_id
+        apply_links(_resolve_links(items, question_ids, id_mapping))
+    return id_mapping
@@ -0,0 +1,162 @@
+import html
+import math
+import re
+import threading
+from collections import defaultdict
+
+# 拉丁字母/数字按单词切分，中日韩文字按二元组（bigram）切分
+WORD_PATTERN = re.compile(r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]')
+
+# 进程内检索索引的默认有效期（秒），见 config.SEARCH_INDEX_TTL
+DEFAULT_SEARCH_INDEX_TTL = 60
+
+
+def tokenize(text, unigrams=False):
+    """
+    将文本切分为检索词：英文单词整体作为一个词，连续的中文切分为相邻两字组成的二元组。
+    unigrams=True 时（建索引时使用）每个中文字符也单独作为一个词，单字查询才能命中多字词语。
+    """
+    if not text:
+        return []
+    tokens = []
+    for run in WORD_PATTERN.findall(text.lower()):
+        if CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                if unigrams:
+                    tokens.extend(run)
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class InvertedIndex:
+    """
+    内存倒排索引，支持按字段加权的 TF-IDF 排序、增量增删文档和前缀匹配。
+    每个文档可附带少量元数据（如标签），用于在检索结果上做过滤。
+    """
+
+    def __init__(self, field_weights):
+        self.field_weights = field_weights
+        self.postings = defaultdict(dict)  # token -> {doc_id: 加权词频}
+        self.doc_tokens = {}  # doc_id -> 该文档包含的 token 集合，用于删除和更新
+        self.meta = {}
+        self.lock = threading.RLock()
+        self._sorted_tokens = None  # 前缀匹配使用的有序词表，索引变化后重建
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, doc_id, fields, meta=None):
+        """新增或替换文档，fields 为 {字段名: 文本}"""
+        weighted = defaultdict(float)
+        for field, text in fields.items():
+            weight = self.field_weights.get(field, 1.0)
+            for token in tokenize(text, unigrams=True):
+                weighted[token] += weight
+        with self.lock:
+            self._remove(doc_id)
+            for token, frequency in weighted.items():
+                self.postings[token][doc_id] = frequency
+            self.doc_tokens[doc_id] = set(weighted)
+            self.meta[doc_id] = meta or {}
+            self._sorted_tokens = None
+
+    def remove(self, doc_id):
+        with self.lock:
+            self._remove(doc_id)
+            self._sorted_tokens = None
+
+    def _remove(self, doc_id):
+        for token in self.doc_tokens.pop(doc_id, ()):
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[token]
+        self.meta.pop(doc_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.postings.clear()
+            self.doc_tokens.clear()
+            self.meta.clear()
+            self._sorted_tokens = None
+
+    def _expand_prefix(self, token):
+        """返回以 token 开头的所有索引词（用于输入过程中的前缀匹配）"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        lo, hi = 0, len(tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tokens[mid] < token:
+                lo = mid + 1
+            else:
+                hi = mid
+        matches = []
+        while lo < len(tokens) and tokens[lo].startswith(token):
+            matches.append(tokens[lo])
+            lo += 1
+        return matches
+
+    def search(self, query, prefix=False, filter_func=None):
+        """
+        返回按相关度降序排列的 [(doc_id, score), ...]，相关度相同时 ID 大的（较新的）在前。
+        prefix=True 时查询的最后一个词按前缀匹配；filter_func 接收文档元数据，返回 False 的文档被排除。
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self.lock:
+            total = len(self.doc_tokens) or 1
+            scores = defaultdict(float)
+            for position, term in enumerate(terms):
+                expanded = [term]
+                if prefix and position == len(terms) - 1:
+                    expanded = self._expand_prefix(term) or [term]
+                for token in expanded:
+                    docs = self.postings.get(token)
+                    if not docs:
+                        continue
+                    idf = math.log(1 + total / len(docs))
+                    for doc_id, frequency in docs.items():
+                        scores[doc_id] += math.log1p(frequency) * idf
+            if filter_func is not None:
+                scores = {doc_id: score for doc_id, score in scores.items() if filter_func(self.meta.get(doc_id, {}))}
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+def highlight(text, query, width=60):
+    """截取包含查询词的片段并用 <mark> 标记命中处，其余内容做 HTML 转义"""
+    if not text:
+        return ''
+    lowered = text.lower()
+    needles = [query.lower().strip()] + sorted(set(tokenize(query)), key=len, reverse=True)
+    needles = [needle for needle in needles if needle]
+    position = -1
+    for needle in needles:
+        position = lowered.find(needle)
+        if position >= 0:
+            break
+    if position < 0:
+        snippet, start, end = text[:width * 2], 0, min(len(text), width * 2)
+    else:
+        start = max(0, position - width)
+        end = min(len(text), position + width)
+        snippet = text[start:end]
+
+    pattern = re.compile('|'.join(re.escape(needle) for needle in needles), re.IGNORECASE) if needles else None
+    parts = []
+    last = 0
+    if pattern is not None:
+        for match in pattern.finditer(snippet):
+            parts.append(html.escape(snippet[last:match.start()]))
+            parts.append(f'<mark>{html.escape(match.group(0))}</mark>')
+            last = match.end()
+    parts.append(html.escape(snippet[last:]))
+    return ('...' if start > 0 else '') + ''.join(parts) + ('...' if end < len(text) else '')
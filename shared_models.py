@@ -2,7 +2,8 @@ from datetime import datetime as dt
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import JSON
 from flask_login import UserMixin # type: ignore
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from auth_utils import hash_password
 
 db = SQLAlchemy()
 
@@ -19,7 +20,7 @@ class AdminUser(db.Model, UserMixin):
 
     def set_password(self, password):
         """使用密码哈希存储密码"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """验证用户输入的密码是否正确"""
@@ -36,7 +37,7 @@ class User(db.Model, UserMixin):
     is_active = db.Column(db.Boolean, default=True)  # 账户是否激活
     is_frozen = db.Column(db.Boolean, default=False)  # 账户是否被冻结
     frozen_until = db.Column(db.DateTime, nullable=True)  # 冻结截止时间
-    created_at = db.Column(db.DateTime, default=dt.utcnow)       # 创建时间
+    created_at = db.Column(db.DateTime, default=dt.utcnow, index=True)       # 创建时间
     updated_at = db.Column(db.DateTime, onupdate=dt.utcnow)      # 更新时间
 
     # 冻结记录关系
@@ -45,7 +46,7 @@ class User(db.Model, UserMixin):
     decision_groups = db.relationship('DecisionGroup', secondary='group_members', back_populates='members')
     def set_password(self, password):
         """使用密码哈希存储密码"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         """验证用户输入的密码是否正确"""
@@ -86,7 +87,7 @@ class AHPHistory(db.Model):
     best_choice_name = db.Column(db.String(255), nullable=False)
     request_data = db.Column(JSON, nullable=False)
     response_data = db.Column(JSON, nullable=False)
-    created_at = db.Column(db.DateTime, default=dt.utcnow)
+    created_at = db.Column(db.DateTime, default=dt.utcnow, index=True)
 
 class DecisionGroup(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -115,7 +116,7 @@ class BalancedDecision(db.Model):
     comparisons = db.Column(db.Text, nullable=False)
     groups = db.Column(db.Text, nullable=False)
     result = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=dt.utcnow)
+    created_at = db.Column(db.DateTime, default=dt.utcnow, index=True)
 
 class Article(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -125,7 +126,7 @@ class Article(db.Model):
     tags = db.Column(db.String(255), nullable=True)
     keywords = db.Column(db.String(255), nullable=True)
     reference_count = db.Column(db.Integer, nullable=False, default=0)
-    created_at = db.Column(db.DateTime, default=dt.utcnow)
+    created_at = db.Column(db.DateTime, default=dt.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=dt.utcnow, onupdate=dt.utcnow)
 
 class PlatformArticle(db.Model):
@@ -162,7 +163,7 @@ class Checklist(db.Model):
     mermaid_code = db.Column(db.Text, nullable=True)  # 存储流程图代码
     is_clone = db.Column(db.Boolean, nullable=True)
     platform_checklist_id = db.Column(db.Integer, db.ForeignKey('platform_checklist.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=dt.utcnow)
+    created_at = db.Column(db.DateTime, default=dt.utcnow, index=True)
     share_status = db.Column(db.Enum('pending', 'review', 'approved', 'rejected', 
                                   name='checklist_share_status'),
                            default='pending', nullable=False)
@@ -180,6 +181,9 @@ class PlatformChecklist(db.Model):
     mermaid_code = db.Column(db.Text, nullable=True)  # 存储流程图代码
     clone_count = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=dt.utcnow)
+    diagram_key = db.Column(db.String(64), nullable=True)  # 预渲染流程图在 MinIO 中的文件名（mermaid_code 的 SHA-256）
+    diagram_status = db.Column(db.String(20), nullable=True)  # 预渲染状态：pending / ready / failed
+    diagram_error = db.Column(db.String(255), nullable=True)  # 预渲染失败原因
     @property
     def serialized(self):
         data = {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -210,6 +214,7 @@ class PlatformChecklistQuestion(db.Model):
     options = db.Column(db.JSON)  # 存储选项列表
     follow_up_questions = db.Column(db.JSON)  # 存储选项关联 { "0": 5 }
     parent_id = db.Column(db.Integer, db.ForeignKey('platform_checklist_question.id'))  # 父问题ID
+    insert_key = db.Column(db.String(48), index=True)  # 批量插入时客户端生成的关联键，用于取回新ID
     # 关系
     checklist = db.relationship('PlatformChecklist', backref=db.backref('questions', lazy=True))
     parent = db.relationship('PlatformChecklistQuestion', remote_side=[id], backref='children')
@@ -229,7 +234,7 @@ class ChecklistDecision(db.Model):
     user_id = db.Column(db.Integer, nullable=False)
     decision_name = db.Column(db.String(100), nullable=False)
     final_decision = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=dt.utcnow)
+    created_at = db.Column(db.DateTime, default=dt.utcnow, index=True)
 
 
 # Review 数据模型
@@ -263,7 +268,7 @@ class AnalysisData(db.Model):
     facts = db.Column(db.JSON)
     opinion = db.Column(db.Text)
     error = db.Column(db.String(255), nullable=False)
-    analysis_content = db.relationship('AnalysisContent', backref=db.backref('analysis_data', lazy=True))
+    analysis_content = db.relationship('AnalysisContent', backref=db.backref('analysis_data', lazy=True, order_by='AnalysisData.id'))
 
 class Feedback(db.Model):
     __tablename__ = 'feedback'
@@ -290,6 +295,8 @@ class Inspiration(db.Model):
     
     # 一对多关系：一个启发内容可以有多个感想
     reflections = db.relationship('Reflection', backref='inspiration', lazy=True, cascade='all, delete-orphan')
+    # 是否有感想，由查询通过 with_expression 填充（EXISTS 子查询），不加载感想列表
+    has_reflections = db.query_expression()
 
 class Reflection(db.Model):
     """感想内容表"""
@@ -301,4 +308,22 @@ class Reflection(db.Model):
     updated_at = db.Column(db.DateTime, default=dt.utcnow, onupdate=dt.utcnow)
     
     # 外键关联启发内容
-    inspiration_id = db.Column(db.Integer, db.ForeignKey('inspirations.id'), nullable=False)        
\ No newline at end of file
+    inspiration_id = db.Column(db.Integer, db.ForeignKey('inspirations.id'), nullable=False)        
+
+# 统计汇总：每个统计对象在业务时区中每天新增的记录数
+class DailyCount(db.Model):
+    __tablename__ = 'daily_counts'
+
+    entity = db.Column(db.String(32), primary_key=True)  # 统计对象，如 users、articles
+    day = db.Column(db.Date, primary_key=True)           # 业务时区（config.STATISTICS_TIMEZONE）的日期
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+# 统计汇总的进度：已汇总到哪一天以及截至该天的累计总数
+class RollupState(db.Model):
+    __tablename__ = 'rollup_state'
+
+    entity = db.Column(db.String(32), primary_key=True)
+    refreshed_through = db.Column(db.Date, nullable=True)  # 已汇总的最后一个完整日期
+    total = db.Column(db.Integer, nullable=False, default=0)
+    timezone = db.Column(db.String(64), nullable=True)     # 汇总使用的业务时区，配置变更后全部重建
+    updated_at = db.Column(db.DateTime, default=dt.utcnow, onupdate=dt.utcnow)
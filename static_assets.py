@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from flask import Blueprint, Response, abort, request, send_file
+from werkzeug.security import safe_join
+
+try:
+    # brotli 为可选依赖，未安装时只提供 gzip 压缩版本
+    import brotli
+except ImportError:
+    brotli = None
+
+static_bp = Blueprint('static_assets', __name__)
+
+DEFAULT_STATIC_FOLDER = 'build'
+INDEX_FILE = 'index.html'
+
+# 文件名中带内容哈希的资源（如 main.3f2a1b9c.js、logo.6ce24c58023cc2f8.svg）内容不会变化，可永久缓存
+FINGERPRINT_PATTERN = re.compile(r'\.[0-9a-f]{8,}\.')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 其他资源（包括 index.html）每次都需要用 ETag 向服务器确认
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+MEMORY_MAX_SIZE = 512 * 1024  # 不超过该大小的文件原文常驻内存，更大的文件每次从磁盘发送
+COMPRESS_MIN_SIZE = 1024  # 太小的文件压缩后收益不大
+COMPRESS_MAX_SIZE = 8 * 1024 * 1024
+COMPRESSIBLE_EXTENSIONS = {
+    '.html', '.js', '.mjs', '.css', '.json', '.map', '.svg', '.txt', '.xml',
+    '.ico', '.webmanifest', '.ttf', '.otf', '.eot'
+}
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class StaticAsset:
+    """一个静态文件：强 ETag、修改时间、常驻内存的原文及预压缩版本"""
+
+    def __init__(self, path, relpath):
+        stat = os.stat(path)
+        self.path = path
+        self.relpath = relpath
+        self.mtime_ns = stat.st_mtime_ns
+        self.last_modified = int(stat.st_mtime)
+        self.size = stat.st_size
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.immutable = bool(FINGERPRINT_PATTERN.search(os.path.basename(relpath)))
+        self.data = None
+        self.encodings = {}
+
+        if self.size > COMPRESS_MAX_SIZE:
+            digest = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            self.etag = digest.hexdigest()
+            return
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.etag = hashlib.sha1(data).hexdigest()
+        if self.size <= MEMORY_MAX_SIZE:
+            self.data = data
+        if self.size >= COMPRESS_MIN_SIZE and os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            self._compress(data)
+
+    def _compress(self, data):
+        variants = {'gzip': gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(data, quality=BROTLI_QUALITY)
+        for encoding, compressed in variants.items():
+            # 压缩后没有明显变小的（如已压缩过的字体）不保留
+            if len(compressed) < self.size * 0.9:
+                self.encodings[encoding] = compressed
+
+
+class StaticAssets:
+    """
+    前端构建产物（build/）的内存清单。应用启动时在后台扫描目录，预先计算 ETag 和压缩版本；
+    清单中还没有的文件在首次请求时加载。带哈希文件名的资源加载后不再检查磁盘，
+    其余文件（如 index.html）每次请求比较修改时间，重新构建前端后自动重新加载。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.root = None
+        self.assets = {}
+
+    def init_app(self, app):
+        self.root = os.path.join(app.root_path, app.config.get('STATIC_FOLDER', DEFAULT_STATIC_FOLDER))
+        threading.Thread(target=self.build, args=(app,), name='static-assets', daemon=True).start()
+
+    def build(self, app):
+        assets = {}
+        try:
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    path = os.path.join(directory, filename)
+                    relpath = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    assets[relpath] = StaticAsset(path, relpath)
+        except OSError as e:
+            app.logger.warning(f"Build static asset manifest failed, assets will be loaded on first request: {str(e)}")
+            return
+        with self.lock:
+            # 构建期间请求中已加载的文件以较新的为准
+            assets.update(self.assets)
+            self.assets = assets
+        app.logger.info(f"Static asset manifest built: {len(assets)} files, brotli {'enabled' if brotli else 'disabled'}")
+
+    def get(self, relpath):
+        asset = self.assets.get(relpath)
+        if asset is not None and asset.immutable:
+            return asset
+
+        path = safe_join(self.root, relpath)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            mtime_ns = None
+        if mtime_ns is None or not os.path.isfile(path):
+            with self.lock:
+                self.assets.pop(relpath, None)
+            return None
+        if asset is not None and asset.mtime_ns == mtime_ns:
+            return asset
+
+        asset = StaticAsset(path, relpath)
+        with self.lock:
+            self.assets[relpath] = asset
+        return asset
+
+    def discard(self, asset):
+        with self.lock:
+            if self.assets.get(asset.relpath) is asset:
+                del self.assets[asset.relpath]
+
+
+static_assets = StaticAssets()
+
+
+@static_bp.record_once
+def build_static_assets(state):
+    # 注册到应用时即在后台扫描前端构建目录
+    static_assets.init_app(state.app)
+
+
+def choose_encoding(asset):
+    for encoding in ('br', 'gzip'):
+        if encoding in asset.encodings and request.accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def asset_response(asset):
+    encoding = choose_encoding(asset)
+    if encoding is None and asset.data is None:
+        # 大文件从磁盘发送，条件请求和 Range 由 send_file 处理
+        try:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag,
+                                 last_modified=asset.last_modified, conditional=True)
+        except FileNotFoundError:
+            # 带哈希的资源不再检查磁盘，文件被删除（如重新构建前端）后从清单中移除
+            static_assets.discard(asset)
+            abort(404)
+    else:
+        if encoding is None:
+            response = Response(asset.data, mimetype=asset.mimetype)
+            response.set_etag(asset.etag)
+        else:
+            response = Response(asset.encodings[encoding], mimetype=asset.mimetype)
+            response.headers['Content-Encoding'] = encoding
+            # 强 ETag 需要区分不同编码的响应体
+            response.set_etag(f'{asset.etag}-{encoding}')
+        response.last_modified = asset.last_modified
+        # 处理 If-None-Match / If-Modified-Since（304）以及未压缩响应的 Range 请求
+        response = response.make_conditional(request, accept_ranges=encoding is None,
+                                             complete_length=asset.size if encoding is None else None)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL
+    if asset.encodings:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def serve_asset(relpath):
+    asset = static_assets.get(relpath)
+    if asset is None:
+        abort(404)
+    return asset_response(asset)
+
+
+@static_bp.route('/')
+def index():
+    return serve_asset(INDEX_FILE)
+
+
+@static_bp.route('/static/<path:path>')
+def static_files(path):
+    return serve_asset(f'static/{path}')
+
+
+@static_bp.route('/images/<path:path>')
+def image_files(path):
+    return serve_asset(f'images/{path}')
+
+
+# 构建目录根下的文件（如 favicon.ico、manifest.json）直接返回，其余前端路由都指向 index.html
+@static_bp.route('/<path:path>')
+def serve_react_app(path):
+    asset = static_assets.get(path)
+    if asset is None:
+        return serve_asset(INDEX_FILE)
+    return asset_response(asset)
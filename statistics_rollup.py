@@ -0,0 +1,188 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import extract
+from sqlalchemy.exc import IntegrityError
+from shared_models import (AHPHistory, Article, BalancedDecision, Checklist, ChecklistDecision, DailyCount,
+                           RollupState, User, db)
+
+# 统计对象 -> (模型, 附加过滤条件)
+ROLLUP_SOURCES = {
+    'users': (User, None),
+    'articles': (Article, None),
+    'checklists': (Checklist, None),
+    'clones': (Checklist, Checklist.is_clone == True),
+    'decisions': (ChecklistDecision, None),
+    'ahp': (AHPHistory, None),
+    'balanced_decisions': (BalancedDecision, None),
+}
+
+# 增量刷新时重新汇总已汇总过的最近几天，以覆盖延迟写入或删除的记录
+LOOKBACK_DAYS = 2
+
+# 按日汇总使用的业务时区（config.STATISTICS_TIMEZONE），daily_counts 中的日期都是该时区的本地日期
+DEFAULT_STATISTICS_TIMEZONE = 'UTC'
+
+_refresh_lock = threading.Lock()
+
+
+def pytz_timezone(name):
+    """按 IANA 时区名返回 pytz 时区，pytz 在首次统计时才导入，不影响应用启动"""
+    import pytz
+    return pytz.timezone(name)
+
+
+def to_date(value):
+    """DATE() 在 MySQL 中返回 date，在 SQLite 中返回字符串"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def local_date(value, tz):
+    """UTC 时间 value（datetime 或 SQLite 返回的字符串）在时区 tz 中的日期"""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+
+def rollup_timezone():
+    return pytz_timezone(current_app.config.get('STATISTICS_TIMEZONE') or DEFAULT_STATISTICS_TIMEZONE)
+
+
+def local_today(tz, now=None):
+    now = now or datetime.utcnow()
+    return now.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+
+def local_midnight_utc(day, tz):
+    """时区 tz 中 day 当天零点对应的 UTC 时间（不带时区信息，与 created_at 一致），可正确处理夏令时"""
+    local = tz.normalize(tz.localize(datetime(day.year, day.month, day.day)))
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def whole_hour_offsets(tz, year=None):
+    """时区在冬夏两季与 UTC 的偏移都是整小时时，本地零点总是落在 UTC 整点上"""
+    year = year or datetime.utcnow().year
+    return all(tz.utcoffset(datetime(year, month, 1)).total_seconds() % 3600 == 0 for month in (1, 7))
+
+
+def count_by_day(entity, start, end=None, tz=None):
+    """
+    统计 UTC 时间 [start, end) 内每天的新增数，返回 {tz 的本地日期: count}。
+    过滤条件使用 created_at 的范围比较，可以走 created_at 索引。
+    UTC 直接按 DATE(created_at) 分组；其他时区先按 UTC 小时（偏移不是整小时的时区按分钟）分组，
+    再换算成本地日期，夏令时切换当天也能归入正确的日期。
+    """
+    model, condition = ROLLUP_SOURCES[entity]
+    tz = tz or pytz_timezone('UTC')
+    day = db.func.date(model.created_at)
+    if tz.zone == 'UTC':
+        columns = [day]
+    elif whole_hour_offsets(tz):
+        columns = [day, extract('hour', model.created_at)]
+    else:
+        columns = [day, extract('hour', model.created_at), extract('minute', model.created_at)]
+
+    query = db.session.query(*columns, db.func.count(model.id)).filter(model.created_at >= start)
+    if end is not None:
+        query = query.filter(model.created_at < end)
+    if condition is not None:
+        query = query.filter(condition)
+
+    counts = {}
+    for row in query.group_by(*columns).all():
+        utc_day, count = to_date(row[0]), row[-1]
+        if len(row) == 2:
+            local_day = utc_day
+        else:
+            moment = datetime(utc_day.year, utc_day.month, utc_day.day, int(row[1]), int(row[2]) if len(row) == 4 else 0)
+            local_day = moment.replace(tzinfo=timezone.utc).astimezone(tz).date()
+        counts[local_day] = counts.get(local_day, 0) + count
+    return counts
+
+
+def refresh_entity(entity, full=False, today=None):
+    """
+    将 entity 按业务时区汇总到昨天为止。增量刷新只重新汇总上次进度之前 LOOKBACK_DAYS 天到昨天之间的日期；
+    full=True、首次刷新或业务时区配置变更后从最早一条记录开始全部重建。返回重新汇总的天数。
+    """
+    model, condition = ROLLUP_SOURCES[entity]
+    tz = rollup_timezone()
+    today = today or local_today(tz)
+    yesterday = today - timedelta(days=1)
+    state = db.session.get(RollupState, entity)
+    full = full or state is None or state.refreshed_through is None or state.timezone != tz.zone
+
+    if full:
+        query = db.session.query(db.func.min(model.created_at))
+        if condition is not None:
+            query = query.filter(condition)
+        earliest = query.scalar()
+        start = local_date(earliest, tz) if earliest is not None else today
+    else:
+        if state.refreshed_through >= yesterday:
+            return 0
+        start = state.refreshed_through - timedelta(days=LOOKBACK_DAYS - 1)
+
+    if state is None:
+        state = RollupState(entity=entity, total=0)
+        db.session.add(state)
+
+    if start <= yesterday:
+        counts = count_by_day(entity, local_midnight_utc(start, tz), local_midnight_utc(today, tz), tz)
+        stale = DailyCount.query.filter(DailyCount.entity == entity, DailyCount.day >= start)
+        if full:
+            stale = DailyCount.query.filter(DailyCount.entity == entity)
+        stale.delete(synchronize_session=False)
+        if counts:
+            db.session.execute(DailyCount.__table__.insert(), [
+                {'entity': entity, 'day': day, 'count': count} for day, count in sorted(counts.items())
+            ])
+    elif full:
+        DailyCount.query.filter(DailyCount.entity == entity).delete(synchronize_session=False)
+
+    state.refreshed_through = yesterday
+    state.timezone = tz.zone
+    state.total = db.session.query(db.func.coalesce(db.func.sum(DailyCount.count), 0)).filter(
+        DailyCount.entity == entity).scalar()
+    db.session.commit()
+    return max((yesterday - start).days + 1, 0)
+
+
+def refresh_rollups(entities=None, full=False):
+    """刷新指定（默认全部）统计对象的汇总，返回 {entity: 重新汇总的天数}"""
+    refreshed = {}
+    with _refresh_lock:
+        for entity in entities or ROLLUP_SOURCES:
+            try:
+                refreshed[entity] = refresh_entity(entity, full=full)
+            except IntegrityError:
+                # 其他进程正在刷新同一统计对象，以它的结果为准
+                db.session.rollback()
+                refreshed[entity] = 0
+    return refreshed
+
+
+def ensure_fresh(entity):
+    """汇总落后于（业务时区的）昨天或业务时区配置变更时按需刷新，通常每天只有第一次请求需要刷新"""
+    state = db.session.get(RollupState, entity)
+    tz = rollup_timezone()
+    yesterday = local_today(tz) - timedelta(days=1)
+    if (state is None or state.refreshed_through is None or state.refreshed_through < yesterday
+            or state.timezone != tz.zone):
+        refresh_rollups([entity])
+        state = db.session.get(RollupState, entity)
+    return state
+
+
+def rollup_total(entity):
+    """
+    返回 entity 的总数：已汇总部分读取 rollup_state 中的累计值，汇总之后（通常只有今天）的数据实时统计，
+    因此查询量与表的总行数无关。
+    """
+    state = ensure_fresh(entity)
+    live_from = state.refreshed_through + timedelta(days=1)
+    return state.total + sum(count_by_day(entity, local_midnight_utc(live_from, rollup_timezone())).values())
@@ -1,131 +1,144 @@
-from flask import Flask, jsonify, request, Blueprint
-from datetime import datetime, timedelta
-from shared_models import ChecklistDecision, db, User, Article, Checklist, AHPHistory, BalancedDecision
+import click
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, jsonify, request, Blueprint, current_app
+from statistics_rollup import refresh_rollups, rollup_total
+from statistics_trend import GRANULARITIES, build_trend, parse_timezone, trend_buckets
 
 statistics_bp = Blueprint('statistics', __name__)
 
-# Example: User Statistics Endpoint
-@statistics_bp.route('/api/statistics/users', methods=['GET'])
-def get_user_statistics():
-    # Get time range from request parameters
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    # Query total user count
-    total_users = User.query.count()
-
-    # Query new users in the given time range
-    new_users = db.session.query(
-        db.func.date(User.created_at), db.func.count(User.id)
-    ).filter(User.created_at >= start_date).group_by(db.func.date(User.created_at)).all()
+# 仪表盘统计并发查询使用的线程池，线程数不宜超过数据库连接池大小
+dashboard_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='statistics')
 
+def trend_data(trend):
     # Format data for the front-end
-    new_users_data = [{"date": date.isoformat(), "count": count} for date, count in new_users]
+    return [{"date": day.isoformat(), "count": count} for day, count in trend]
 
-    return jsonify({
-        "total_users": total_users,
-        "new_users_trend": new_users_data
-    })
+def parse_trend_options():
+    """
+    解析统计区间参数：days 天数，granularity 为 day/week/month，tz 为 IANA 时区名（默认 UTC）。
+    参数无效时抛出 ValueError。
+    """
+    # Get time range from request parameters
+    days = int(request.args.get('days', 30))
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unsupported granularity: {granularity}')
+    tz = parse_timezone(request.args.get('tz'))
+    trend_buckets(days, granularity, tz)  # 提前校验区间范围
+    return {'days': days, 'granularity': granularity, 'tz': tz}
+
+def with_trend_options(builder):
+    try:
+        options = parse_trend_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(builder(**options))
+
+# 定时任务（如每天凌晨）执行：flask statistics refresh-rollups，--full 全部重建
+@statistics_bp.cli.command('refresh-rollups')
+@click.option('--full', is_flag=True, help='Rebuild all daily rollups from scratch.')
+def refresh_rollups_command(full):
+    for entity, days in refresh_rollups(full=full).items():
+        click.echo(f'{entity}: {days} day(s) refreshed')
+
+def user_statistics(days, granularity, tz):
+    # 总数读取汇总表，趋势按区间补零
+    return {
+        "total_users": rollup_total('users'),
+        "new_users_trend": trend_data(build_trend('users', days, granularity, tz))
+    }
+
+def article_statistics(days, granularity, tz):
+    return {
+        "total_articles": rollup_total('articles'),
+        "new_articles_trend": trend_data(build_trend('articles', days, granularity, tz))
+    }
+
+def checklist_statistics(days, granularity, tz):
+    return {
+        "total_checklists": rollup_total('checklists'),
+        "total_clones": rollup_total('clones'),
+        "checklist_trend": trend_data(build_trend('checklists', days, granularity, tz))
+    }
+
+def checklist_decision_statistics(days, granularity, tz):
+    # 查询总决策数和指定时间范围内的决策趋势
+    return {
+        "total_decisions": rollup_total('decisions'),
+        "decision_trend": trend_data(build_trend('decisions', days, granularity, tz))
+    }
+
+def ahp_data_statistics(days, granularity, tz):
+    return {
+        "total_ahp_data": rollup_total('ahp'),
+        "ahp_trend": trend_data(build_trend('ahp', days, granularity, tz))
+    }
+
+def balanced_decision_data_statistics(days, granularity, tz):
+    return {
+        "total_balanced_decision_data": rollup_total('balanced_decisions'),
+        "balanced_decision_trend": trend_data(build_trend('balanced_decisions', days, granularity, tz))
+    }
+
+# 仪表盘可请求的统计序列，名称与各统计接口路径一致
+STATISTICS_SERIES = {
+    'users': user_statistics,
+    'articles': article_statistics,
+    'checklists': checklist_statistics,
+    'checklist_decisions': checklist_decision_statistics,
+    'ahp_data': ahp_data_statistics,
+    'balanced_decision_data': balanced_decision_data_statistics,
+}
+
+# Example: User Statistics Endpoint
+@statistics_bp.route('/api/statistics/users', methods=['GET'])
+def get_user_statistics():
+    return with_trend_options(user_statistics)
 
 # Example: Article Statistics Endpoint
 @statistics_bp.route('/api/statistics/articles', methods=['GET'])
 def get_article_statistics():
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-
-    total_articles = Article.query.count()
-
-    new_articles = db.session.query(
-        db.func.date(Article.created_at), db.func.count(Article.id)
-    ).filter(Article.created_at >= start_date).group_by(db.func.date(Article.created_at)).all()
-
-    new_articles_data = [{"date": date.isoformat(), "count": count} for date, count in new_articles]
-
-    return jsonify({
-        "total_articles": total_articles,
-        "new_articles_trend": new_articles_data
-    })
+    return with_trend_options(article_statistics)
 
 # Example: Checklist Statistics Endpoint
 @statistics_bp.route('/api/statistics/checklists', methods=['GET'])
 def get_checklist_statistics():
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-
-    total_checklists = Checklist.query.count()
-    total_clones = Checklist.query.filter(Checklist.is_clone == True).count()
-
-    checklist_trend = db.session.query(
-        db.func.date(Checklist.created_at), db.func.count(Checklist.id)
-    ).filter(Checklist.created_at >= start_date).group_by(db.func.date(Checklist.created_at)).all()
-
-    checklist_trend_data = [{"date": date.isoformat(), "count": count} for date, count in checklist_trend]
-
-    return jsonify({
-        "total_checklists": total_checklists,
-        "total_clones": total_clones,
-        "checklist_trend": checklist_trend_data
-    })
+    return with_trend_options(checklist_statistics)
 
 @statistics_bp.route('/api/statistics/checklist_decisions', methods=['GET'])
 def get_checklist_decision_statistics():
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-
-    # 查询总决策数
-    total_decisions = ChecklistDecision.query.count()
-
-    # 查询指定时间范围内的决策趋势
-    decision_trend = db.session.query(
-        db.func.date(ChecklistDecision.created_at), db.func.count(ChecklistDecision.id)
-    ).filter(ChecklistDecision.created_at >= start_date).group_by(db.func.date(ChecklistDecision.created_at)).all()
-
-    decision_trend_data = [{"date": date.isoformat(), "count": count} for date, count in decision_trend]
-
-    return jsonify({
-        "total_decisions": total_decisions,
-        "decision_trend": decision_trend_data
-    })
+    return with_trend_options(checklist_decision_statistics)
 
 # Example: AHP and BalancedDecision Data Statistics Endpoint
 @statistics_bp.route('/api/statistics/ahp_data', methods=['GET'])
 def get_ahp_data_statistics():
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-
-    total_ahp_data = AHPHistory.query.count()
-
-    ahp_trend = db.session.query(
-        db.func.date(AHPHistory.created_at), db.func.count(AHPHistory.id)
-    ).filter(AHPHistory.created_at >= start_date).group_by(db.func.date(AHPHistory.created_at)).all()
-
-    ahp_trend_data = [{"date": date.isoformat(), "count": count} for date, count in ahp_trend]
-
-    return jsonify({
-        "total_ahp_data": total_ahp_data,
-        "ahp_trend": ahp_trend_data
-    })
+    return with_trend_options(ahp_data_statistics)
 
 @statistics_bp.route('/api/statistics/balanced_decision_data', methods=['GET'])
 def get_balanced_decision_data_statistics():
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-
-    total_balanced_decision_data = BalancedDecision.query.count()
-
-    balanced_decision_trend = db.session.query(
-        db.func.date(BalancedDecision.created_at), db.func.count(BalancedDecision.id)
-    ).filter(BalancedDecision.created_at >= start_date).group_by(db.func.date(BalancedDecision.created_at)).all()
-
-    balanced_decision_trend_data = [{"date": date.isoformat(), "count": count} for date, count in balanced_decision_trend]
-
-    return jsonify({
-        "total_balanced_decision_data": total_balanced_decision_data,
-        "balanced_decision_trend": balanced_decision_trend_data
-    })
+    return with_trend_options(balanced_decision_data_statistics)
+
+def run_series(app, name, options):
+    # 每个线程使用独立的应用上下文和数据库会话，上下文结束时会话自动释放
+    with app.app_context():
+        return STATISTICS_SERIES[name](**options)
+
+@statistics_bp.route('/api/statistics/dashboard', methods=['GET'])
+def get_dashboard_statistics():
+    """
+    一次返回仪表盘所需的多个统计序列，各序列并发查询。
+    series 为逗号分隔的序列名（也可重复传参），缺省返回全部。
+    """
+    try:
+        options = parse_trend_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    names = [name.strip() for value in request.args.getlist('series') for name in value.split(',') if name.strip()]
+    names = list(dict.fromkeys(names)) or list(STATISTICS_SERIES)
+    unknown = [name for name in names if name not in STATISTICS_SERIES]
+    if unknown:
+        return jsonify({"error": f"Unknown series: {', '.join(unknown)}", "allowed_series": list(STATISTICS_SERIES)}), 400
+
+    app = current_app._get_current_object()
+    futures = {name: dashboard_executor.submit(run_series, app, name, options) for name in names}
+    return jsonify({name: future.result() for name, future in futures.items()})
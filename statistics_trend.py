@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+from sqlalchemy import Date, DateTime, literal, select, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import Cast
+from shared_models import DailyCount, db
+from statistics_rollup import (ROLLUP_SOURCES, count_by_day, ensure_fresh, local_midnight_utc, local_today,
+                               pytz_timezone, rollup_timezone)
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# 日历派生表由 UNION ALL 构造，SQLite 默认最多允许 500 个复合查询，区间数需小于该值
+MAX_BUCKETS = 400
+
+
+def parse_timezone(name):
+    """IANA 时区名（如 Asia/Shanghai），无效时抛出 ValueError"""
+    import pytz
+    try:
+        return pytz.timezone(name or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f'Unknown timezone: {name}')
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())  # 周一为一周的开始
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def trend_buckets(days, granularity='day', tz=None, now=None):
+    """
+    按时区 tz 的本地日期划分统计区间，覆盖最近 days 天（含今天），
+    返回 [(区间开始日期, 区间结束日期, UTC 开始时间, UTC 结束时间), ...]，区间左闭右开。
+    """
+    if days < 0:
+        raise ValueError('days must not be negative')
+    tz = tz or pytz_timezone('UTC')
+    today = local_today(tz, now)
+    day = bucket_start(today - timedelta(days=days), granularity)
+    buckets = []
+    while day <= today:
+        end = next_bucket(day, granularity)
+        buckets.append((day, end, local_midnight_utc(day, tz), local_midnight_utc(end, tz)))
+        day = end
+        if len(buckets) > MAX_BUCKETS:
+            raise ValueError(f'Too many {granularity} buckets, use a shorter range or a coarser granularity')
+    return buckets
+
+
+class DerivedColumnCast(Cast):
+    """
+    MySQL 中派生表的列由参数推断为字符串，显式 CAST 为日期类型以便与 created_at 按时间比较并使用索引；
+    SQLite 以文本存储日期时间，CAST 反而会转成数字，因此编译为原值。在编译时按方言区分，同一查询可用于两种数据库。
+    """
+    inherit_cache = True
+
+
+@compiles(DerivedColumnCast, 'sqlite')
+def compile_derived_column_cast_sqlite(element, compiler, **kw):
+    return compiler.process(element.clause, **kw)
+
+
+def typed_literal(value, type_):
+    return DerivedColumnCast(literal(value, type_), type_)
+
+
+def calendar_table(buckets):
+    """将区间列表构造成 SQL 中的日历派生表（UNION ALL），用于 LEFT JOIN 补齐没有数据的区间"""
+    rows = [
+        select(
+            literal(index).label('bucket'),
+            typed_literal(start_day, Date).label('start_day'),
+            typed_literal(end_day, Date).label('end_day'),
+            typed_literal(start_at, DateTime).label('start_at'),
+            typed_literal(end_at, DateTime).label('end_at')
+        ) for index, (start_day, end_day, start_at, end_at) in enumerate(buckets)
+    ]
+    return union_all(*rows).subquery('calendar')
+
+
+def aligned_to_rollup_days(buckets, tz):
+    """所有区间边界都是业务时区 tz 的零点时（请求的时区与业务时区相同，或两者的零点重合），可直接使用 daily_counts"""
+    return all(start_at == local_midnight_utc(start_day, tz) and end_at == local_midnight_utc(end_day, tz)
+               for start_day, end_day, start_at, end_at in buckets)
+
+
+def build_trend(entity, days, granularity='day', tz=None):
+    """
+    返回补齐了空区间的趋势 [(区间开始日期, count), ...]，区间按 tz 的本地时间划分。
+    区间边界与业务时区（config.STATISTICS_TIMEZONE）的零点对齐时，已汇总的日期从 daily_counts 聚合，
+    汇总之后的部分实时统计；其他时区直接按 created_at 范围 JOIN 原表统计，
+    查询量只与所选时间范围内的行数有关，与表的总行数无关。
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unsupported granularity: {granularity}')
+    buckets = trend_buckets(days, granularity, tz)
+    calendar = calendar_table(buckets)
+
+    rollup_tz = rollup_timezone()
+    if aligned_to_rollup_days(buckets, rollup_tz):
+        state = ensure_fresh(entity)
+        counts = db.session.query(
+            calendar.c.bucket, db.func.coalesce(db.func.sum(DailyCount.count), 0)
+        ).select_from(calendar).outerjoin(DailyCount, db.and_(
+            DailyCount.entity == entity,
+            DailyCount.day >= calendar.c.start_day,
+            DailyCount.day < calendar.c.end_day,
+            DailyCount.day <= state.refreshed_through
+        )).group_by(calendar.c.bucket).all()
+        totals = {bucket: int(count) for bucket, count in counts}
+
+        live_from = state.refreshed_through + timedelta(days=1)
+        for day, count in count_by_day(entity, local_midnight_utc(live_from, rollup_tz), tz=rollup_tz).items():
+            for index, (start_day, end_day, _, _) in enumerate(buckets):
+                if start_day <= day < end_day:
+                    totals[index] = totals.get(index, 0) + count
+                    break
+    else:
+        model, condition = ROLLUP_SOURCES[entity]
+        join_condition = db.and_(model.created_at >= calendar.c.start_at, model.created_at < calendar.c.end_at)
+        if condition is not None:
+            join_condition = db.and_(join_condition, condition)
+        counts = db.session.query(
+            calendar.c.bucket, db.func.count(model.id)
+        ).select_from(calendar).outerjoin(model, join_condition).group_by(calendar.c.bucket).all()
+        totals = {bucket: count for bucket, count in counts}
+
+    return [(bucket[0], totals.get(index, 0)) for index, bucket in enumerate(buckets)]
@@ -0,0 +1,138 @@
+import os
+import sys
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+
+# 项目模块都在仓库根目录下
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from shared_models import AdminUser, db  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    # 每个测试使用独立的 SQLite 文件库，多个线程可以各自建立连接
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+        'STATIC_FOLDER': str(tmp_path / 'build'),
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(app):
+    user = AdminUser(username='admin', email='admin@example.com')
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def login(client, admin):
+    """让测试客户端以管理员身份登录"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(admin.id)
+        session['_fresh'] = True
+    return admin
+
+
+@contextmanager
+def count_statements(engine):
+    """统计代码块内发往数据库的 SQL 语句数量，executemany 计为一条"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def statement_counter(app):
+    return lambda: count_statements(db.engine)
+
+
+@pytest.fixture(params=[{'page': 1}, {'cursor': ''}], ids=['page', 'cursor'])
+def list_query(request):
+    """列表接口的两种分页方式：页码与游标"""
+    return request.param
+
+
+@pytest.fixture
+def list_page(client, login, statement_counter, list_query):
+    """
+    以管理员身份按 list_query 请求列表接口的第一页（每页 50 条），返回 (响应 JSON, SQL 语句数)。
+    每个接口第一次请求前先预热一次，使当前登录用户进入身份缓存，语句数只包含列表本身的查询。
+    """
+    warmed = set()
+
+    def request_page(url):
+        if url not in warmed:
+            client.get(url, query_string={'per_page': 50, **list_query})
+            warmed.add(url)
+        with statement_counter() as statements:
+            response = client.get(url, query_string={'per_page': 50, **list_query})
+        assert response.status_code == 200
+        return response.get_json(), len(statements)
+    return request_page
+
+
+@pytest.fixture
+def assert_constant_list_queries(list_page):
+    """
+    检查列表接口的 SQL 语句数与本页条数无关（没有 N+1 查询）：
+    add_rows(start, count) 写入第 start 起的 count 条记录，key 为响应中列表所在的字段。
+    """
+    def check(url, add_rows, key):
+        add_rows(0, 2)
+        body, few = list_page(url)
+        assert len(body[key]) == 2
+        add_rows(2, 30)
+        body, many = list_page(url)
+        assert len(body[key]) == 32
+        assert many == few
+    return check
+
+
+class Execution:
+    def __init__(self, statement, executemany, rowcount):
+        self.statement = statement
+        self.executemany = executemany
+        self.rowcount = rowcount
+
+
+@contextmanager
+def record_executions(engine):
+    """记录代码块内每次发往数据库的执行：语句、是否为 executemany 以及影响的行数"""
+    executions = []
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executions.append(Execution(statement, executemany, cursor.rowcount))
+
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    try:
+        yield executions
+    finally:
+        event.remove(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+@pytest.fixture
+def execution_recorder(app):
+    return lambda: record_executions(db.engine)
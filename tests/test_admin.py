@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+from shared_models import FreezeRecord, User, db
+
+
+def add_users(admin, start, count, records_per_user=5):
+    base = datetime(2024, 1, 1)
+    for number in range(start, start + count):
+        user = User(username=f'user{number}', email=f'user{number}@example.com', password_hash='x',
+                    created_at=base + timedelta(minutes=number))
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([FreezeRecord(user_id=user.id, action='freeze', reason=f'reason {index}',
+                                         admin_id=admin.id, created_at=base + timedelta(days=index))
+                            for index in range(records_per_user)])
+    db.session.commit()
+
+
+def test_user_list_query_count_is_constant(login, assert_constant_list_queries):
+    assert_constant_list_queries('/api/admin/users', lambda start, count: add_users(login, start, count), 'users')
+
+
+def test_user_list_returns_latest_three_freeze_records(client, login):
+    add_users(login, 0, 1)
+    user = client.get('/api/admin/users').get_json()['users'][0]
+    assert [record['reason'] for record in user['freeze_records']] == ['reason 4', 'reason 3', 'reason 2']
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from app import BLUEPRINTS, create_app
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只在具体接口中才用到的较重依赖，启动应用时不应导入
+DEFERRED_MODULES = ('minio', 'PIL', 'colorlog', 'pytz')
+
+IMPORT_TIME_SCRIPT = '''
+import importlib, json, sys, time
+started = time.perf_counter()
+import app
+timings = {'app': time.perf_counter() - started}
+for module_name, _ in app.BLUEPRINTS:
+    started = time.perf_counter()
+    importlib.import_module(module_name)
+    timings[module_name] = time.perf_counter() - started
+started = time.perf_counter()
+app.create_app()
+timings['create_app'] = time.perf_counter() - started
+print(json.dumps({'timings': timings, 'modules': sorted(sys.modules)}))
+'''
+
+
+def measure_startup():
+    """在新的解释器中导入 app、各路由模块并创建应用，返回各步耗时（秒）和已导入的模块"""
+    output = subprocess.run([sys.executable, '-c', IMPORT_TIME_SCRIPT], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['timings'], set(result['modules'])
+
+
+def test_create_app_does_not_duplicate_log_handlers(app):
+    handlers = list(app.logger.handlers)
+    create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    assert app.logger.handlers == handlers
+    assert [handler.name for handler in handlers].count('app_file') == 1
+
+
+def test_startup_defers_heavy_imports():
+    _, modules = measure_startup()
+    for name in DEFERRED_MODULES:
+        assert not any(module == name or module.startswith(name + '.') for module in modules), name
+
+
+@pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason='设置 RUN_BENCHMARKS=1 运行性能基准')
+def test_startup_import_time():
+    timings, _ = measure_startup()
+    # 路由模块本身只应包含轻量的导入，较重的依赖都推迟到首次使用
+    assert sum(timings[module_name] for module_name, _ in BLUEPRINTS) < 1.0
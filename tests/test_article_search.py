@@ -0,0 +1,150 @@
+import os
+import random
+import time
+import pytest
+from sqlalchemy.exc import ProgrammingError
+import article_search
+from article_search import article_index, search_articles
+from search_utils import InvertedIndex, highlight
+from shared_models import PlatformArticle, db
+
+
+@pytest.fixture
+def articles(app):
+    rows = [
+        PlatformArticle(title='决策矩阵入门', content='介绍如何为候选方案打分。', author='a', tags='method', keywords='矩阵'),
+        PlatformArticle(title='清单的力量', content='决策矩阵可以和清单配合使用。', author='a', tags='method', keywords='清单'),
+        PlatformArticle(title='认知偏差', content='确认偏差会影响决策。', author='b', tags='psychology', keywords='偏差'),
+    ] + [PlatformArticle(title=f'决策笔记 {number}', content='决策记录', author='c', tags='notes', keywords='')
+         for number in range(12)]
+    db.session.add_all(rows)
+    db.session.commit()
+    article_index.built = False
+    yield rows
+    article_index.built = False
+
+
+def test_title_match_ranks_above_content_match(articles):
+    rows, total, has_more = search_articles('决策矩阵', '', 0, 10)
+    assert [article.title for article, _, _ in rows[:2]] == ['决策矩阵入门', '清单的力量']
+    # 只包含“决策”的文章也会命中，但排在后面
+    assert total == 15 and has_more
+
+
+def test_tag_filter_and_snippet(articles):
+    rows, total, _ = search_articles('偏差', 'psychology', 0, 10)
+    assert total == 1
+    assert rows[0][2] == '确认<mark>偏差</mark>会影响决策。'
+
+
+def test_highlight_escapes_html():
+    assert highlight('<b>决策</b> 矩阵', '矩阵') == '&lt;b&gt;决策&lt;/b&gt; <mark>矩阵</mark>'
+
+
+def test_page_and_cursor_contract(client, login, articles):
+    page = client.get('/articles', query_string={'search': '决策', 'page': 2, 'page_size': 5}).get_json()
+    assert page['current_page'] == 2
+    assert page['total_items'] == 15 and page['total_pages'] == 3
+    assert len(page['articles']) == 5
+
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        body = client.get('/articles', query_string={'search': '决策', 'page_size': 4, 'cursor': cursor}).get_json()
+        seen.extend(article['id'] for article in body['articles'])
+        cursor = body['next_cursor']
+        assert body['has_more'] == (cursor is not None)
+    assert len(seen) == len(set(seen)) == 15
+
+
+def test_new_article_is_searchable(client, login, articles):
+    client.post('/articles', json={'title': '贝叶斯更新', 'content': '先验与后验', 'author': 'a',
+                                   'tags': 'method', 'keywords': ''})
+    rows, total, _ = search_articles('贝叶斯', '', 0, 10)
+    assert total == 1
+
+
+def test_index_reloads_after_ttl(app, articles):
+    assert search_articles('认知', '', 0, 10)[1] == 1
+    # 其他 worker 写入的文章不会增量更新到本进程的索引
+    db.session.add(PlatformArticle(title='认知负荷', content='...', author='d', tags='psychology', keywords=''))
+    db.session.commit()
+    assert search_articles('认知', '', 0, 10)[1] == 1
+    app.config['SEARCH_INDEX_TTL'] = 0
+    # 过期后在后台重建，本次请求仍使用旧索引
+    assert search_articles('认知', '', 0, 10)[1] == 1
+    article_index.refresh_thread.join(timeout=10)
+    app.config['SEARCH_INDEX_TTL'] = 3600
+    assert search_articles('认知', '', 0, 10)[1] == 2
+
+
+def test_build_replays_changes_made_during_build(app, articles, monkeypatch):
+    removed = articles[2]
+    added = type('ArticleRow', (), {'id': 10_000, 'title': '贝叶斯更新', 'keywords': '', 'content': '',
+                                    'tags': 'method'})
+    add = article_index._add
+
+    def add_during_build(index, row):
+        # 模拟构建读取数据期间其他请求修改了文章
+        if not article_index.pending:
+            article_index.update(added)
+            article_index.remove(removed.id)
+        add(index, row)
+
+    monkeypatch.setattr(article_index, '_add', add_during_build)
+    article_index.build()
+    monkeypatch.undo()
+    assert article_index.pending is None
+    assert [doc_id for doc_id, _ in article_index.search('贝叶斯')] == [added.id]
+    assert article_index.search('认知') == []
+
+
+@pytest.fixture
+def fulltext(monkeypatch):
+    """模拟 MySQL：走 FULLTEXT 分支，FULLTEXT 查询本身由各用例替换"""
+    monkeypatch.setattr(article_search, 'use_fulltext', lambda: True)
+    return monkeypatch
+
+
+def test_missing_fulltext_index_falls_back_to_like(articles, fulltext):
+    def fail(*args):
+        raise ProgrammingError('SELECT ... MATCH', {}, Exception("Can't find FULLTEXT index matching the column list"))
+
+    fulltext.setattr(article_search, '_fulltext_search', fail)
+    rows, total, has_more = search_articles('偏差', '', 0, 10)
+    assert total == 1 and not has_more
+    assert rows[0][0].title == '认知偏差'
+
+
+def test_short_terms_use_like(articles, fulltext):
+    def fail(*args):
+        raise AssertionError('短于 ngram_token_size 的检索词不应使用 FULLTEXT 查询')
+
+    fulltext.setattr(article_search, '_fulltext_search', fail)
+    rows, total, has_more = search_articles('矩', '', 0, 1)
+    assert total == 2 and has_more
+    assert {article.title for article, _, _ in search_articles('矩', '', 0, 10)[0]} == {'决策矩阵入门', '清单的力量'}
+
+
+@pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason='设置 RUN_BENCHMARKS=1 运行性能基准')
+def test_benchmark_article_index():
+    # 文章数可用 BENCHMARK_ARTICLES 调整，10 万篇需要数 GB 内存
+    count = int(os.environ.get('BENCHMARK_ARTICLES', 20_000))
+    rng = random.Random(0)
+    vocabulary = [chr(code) for code in range(0x4e00, 0x4e00 + 400)]
+    index = InvertedIndex({'title': 3.0, 'keywords': 2.0, 'content': 1.0})
+    started = time.perf_counter()
+    for doc_id in range(count):
+        index.add(doc_id, {
+            'title': ''.join(rng.choices(vocabulary, k=12)),
+            'keywords': ''.join(rng.choices(vocabulary, k=4)),
+            'content': ''.join(rng.choices(vocabulary, k=200)),
+        })
+    build_seconds = time.perf_counter() - started
+
+    queries = [''.join(rng.choices(vocabulary, k=2)) for _ in range(200)]
+    started = time.perf_counter()
+    for query in queries:
+        index.search(query)
+    per_query_ms = (time.perf_counter() - started) / len(queries) * 1000
+    print(f'\n{count} articles: build {build_seconds:.1f}s, {per_query_ms:.2f} ms per query')
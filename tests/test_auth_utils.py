@@ -0,0 +1,49 @@
+import base64
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from auth_utils import hash_password, needs_rehash
+from shared_models import AdminUser, db
+
+METHODS = [None, 'scrypt', 'scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256', 'pbkdf2:sha256:600000']
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_fresh_hash_does_not_need_rehash(app, method):
+    app.config['PASSWORD_HASH_METHOD'] = method
+    assert not needs_rehash(hash_password('secret'))
+
+
+def test_changed_strength_needs_rehash(app):
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
+    password_hash = hash_password('secret')
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:700000'
+    assert needs_rehash(password_hash)
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    assert needs_rehash(password_hash)
+
+
+@pytest.fixture
+def private_key(app, tmp_path):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = tmp_path / 'private_key.pem'
+    path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                       serialization.NoEncryption()))
+    app.config['PRIVATE_KEY_PATH'] = str(path)
+    return key
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2:sha256:600000'])
+def test_login_keeps_current_hash(app, client, admin, private_key, statement_counter, method):
+    app.config['PASSWORD_HASH_METHOD'] = method
+    admin.set_password('secret')
+    db.session.commit()
+    password_hash = admin.password_hash
+    encrypted = base64.b64encode(private_key.public_key().encrypt(b'secret', padding.PKCS1v15())).decode('ascii')
+
+    with statement_counter() as statements:
+        response = client.post('/login', json={'username': 'admin', 'password': encrypted})
+    assert response.status_code == 200
+    assert not any(statement.startswith('UPDATE') for statement in statements)
+    db.session.expire_all()
+    assert AdminUser.query.filter_by(username='admin').one().password_hash == password_hash
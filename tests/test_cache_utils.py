@@ -0,0 +1,63 @@
+import pytest
+from flask import jsonify
+import cache_utils
+from cache_utils import NO_EXPIRY, LRUTTLCache, cached_response, invalidate_cache
+
+NAMESPACE = 'test_namespace'
+
+
+@pytest.fixture(autouse=True)
+def empty_namespace():
+    invalidate_cache(NAMESPACE)
+
+
+def make_view(calls, invalidate_during_view=False):
+    @cached_response(NAMESPACE, lambda: 'key')
+    def view():
+        calls.append(len(calls))
+        if invalidate_during_view:
+            # 模拟视图查询期间另一个请求提交了写操作
+            invalidate_cache(NAMESPACE)
+        return jsonify({'calls': len(calls)})
+    return view
+
+
+def test_cached_response_hits_and_revalidates(app):
+    calls = []
+    view = make_view(calls)
+    with app.test_request_context('/'):
+        first = view()
+    with app.test_request_context('/'):
+        second = view()
+    with app.test_request_context('/', headers={'If-None-Match': first.get_etag()[0]}):
+        not_modified = view()
+    assert calls == [0]
+    assert second.get_json() == {'calls': 1}
+    assert not_modified.status_code == 304
+
+
+def test_invalidation_during_view_is_not_cached(app):
+    calls = []
+    stale_view = make_view(calls, invalidate_during_view=True)
+    with app.test_request_context('/'):
+        stale_view()
+    fresh_view = make_view(calls)
+    with app.test_request_context('/'):
+        response = fresh_view()
+    # 第一次的结果写在失效前的版本下，第二次必须重新执行视图
+    assert response.get_json() == {'calls': 2}
+    with app.test_request_context('/'):
+        assert fresh_view().get_json() == {'calls': 2}
+
+
+def test_lru_ttl_cache_ttl_semantics(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_utils.time, 'monotonic', lambda: now[0])
+    cache = LRUTTLCache(ttl=10)
+    cache.set('default', 1)
+    cache.set('never', 2, ttl=NO_EXPIRY)
+    cache.set('disabled', 3, ttl=0)
+    assert cache.get('disabled') is None
+    now[0] += 3600
+    assert cache.get('default') is None
+    assert cache.get('never') == 2
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import event
+import Checklist as checklist_module
+from shared_models import AdminUser, Checklist, ChecklistQuestion, PlatformChecklist, PlatformChecklistQuestion, db
+
+CHECKLISTS = 24
+QUESTIONS = 30
+
+
+@pytest.fixture
+def serialized_writes(app):
+    """SQLite 默认的延迟事务在并发写入时会直接报 database is locked，改为 BEGIN IMMEDIATE 排队等待"""
+    engine = db.engine
+
+    @event.listens_for(engine, 'connect')
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def begin_immediate(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+    db.session.remove()
+    engine.dispose()
+    yield
+    event.remove(engine, 'connect', disable_pysqlite_transactions)
+    event.remove(engine, 'begin', begin_immediate)
+    engine.dispose()
+
+
+def create_review_checklists():
+    base = PlatformChecklist(user_id=1, name='base', version=1)
+    db.session.add(base)
+    db.session.flush()
+    checklist_ids = []
+    for number in range(CHECKLISTS):
+        checklist = Checklist(user_id=1, name=f'c{number}', platform_checklist_id=base.id, share_status='review')
+        db.session.add(checklist)
+        db.session.flush()
+        for index in range(0, QUESTIONS, 3):
+            root = ChecklistQuestion(checklist_id=checklist.id, type='choice', question=f'c{number}-q{index}',
+                                     description='', options=['a', 'b'])
+            db.session.add(root)
+            db.session.flush()
+            children = [ChecklistQuestion(checklist_id=checklist.id, question=f'c{number}-q{child}',
+                                          description='', parent_id=root.id) for child in (index + 1, index + 2)]
+            db.session.add_all(children)
+            db.session.flush()
+            root.follow_up_questions = {'0': [children[0].id], '1': [children[1].id]}
+        checklist_ids.append(checklist.id)
+    db.session.commit()
+    return checklist_ids
+
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'correlation-key'])
+def test_parallel_approvals_reconcile_ids(app, admin, serialized_writes, monkeypatch, returning):
+    monkeypatch.setattr(checklist_module, 'schedule_diagram_render', lambda checklist_id: None)
+    # 关闭 RETURNING 时走按 insert_key 回查的路径（MySQL 的情况）
+    monkeypatch.setattr(db.engine.dialect, 'insert_returning', returning)
+    checklist_ids = create_review_checklists()
+    admin_id = AdminUser.query.filter_by(username='admin').one().id
+    # 主线程不能持有写事务，否则所有审批线程都会等待
+    db.session.remove()
+
+    def approve(checklist_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin_id)
+        response = client.post('/checklists/review', json={'checklist_id': checklist_id, 'action': 'approve'})
+        return response.status_code, response.get_json()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(approve, checklist_ids))
+
+    assert [status for status, _ in results] == [200] * CHECKLISTS
+    platform_ids = [body['platform_checklist_id'] for _, body in results]
+    assert len(set(platform_ids)) == CHECKLISTS
+
+    db.session.remove()
+    for source_id, platform_id in zip(checklist_ids, platform_ids):
+        questions = PlatformChecklistQuestion.query.filter_by(checklist_id=platform_id).all()
+        by_id = {question.id: question for question in questions}
+        prefix = f'c{source_id - checklist_ids[0]}-'
+        assert len(questions) == QUESTIONS
+        assert all(question.question.startswith(prefix) for question in questions)
+        assert all(question.insert_key is None for question in questions)
+        for question in questions:
+            if question.parent_id is not None:
+                # 层级关系只指向同一个克隆内的问题
+                assert question.parent_id in by_id
+            for child_ids in (question.follow_up_questions or {}).values():
+                assert all(by_id[child_id].parent_id == question.id for child_id in child_ids)
@@ -0,0 +1,18 @@
+import diagram_utils
+from diagram_utils import schedule_diagram_render
+from shared_models import PlatformChecklist, db
+
+
+def test_pending_status_invalidates_cached_detail(client, login, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(diagram_utils.diagram_executor, 'submit', lambda *args: submitted.append(args))
+    checklist = PlatformChecklist(user_id=login.id, name='决策清单', mermaid_code='graph TD; A-->B')
+    db.session.add(checklist)
+    db.session.commit()
+    checklist_id = checklist.id
+
+    # 先请求一次详情，使响应进入缓存
+    assert client.get(f'/platform_checklists/{checklist_id}').get_json()['diagram_status'] is None
+    schedule_diagram_render(checklist_id)
+    assert len(submitted) == 1
+    assert client.get(f'/platform_checklists/{checklist_id}').get_json()['diagram_status'] == 'pending'
@@ -0,0 +1,50 @@
+import pytest
+from identity_cache import identity_cache, invalidate_identity, load_identity
+from shared_models import AdminUser, db
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    identity_cache.clear()
+    yield
+    identity_cache.clear()
+
+
+def statements_per_load(admin_id, statement_counter, loads=2):
+    counts = []
+    for _ in range(loads):
+        # 模拟新的请求：会话中没有已加载的用户对象
+        db.session.expunge_all()
+        with statement_counter() as statements:
+            assert load_identity(AdminUser, admin_id).username == 'admin'
+        counts.append(len(statements))
+    return counts
+
+
+def test_identity_is_cached(app, admin, statement_counter):
+    app.config['USER_CACHE_TTL'] = 30
+    assert statements_per_load(admin.id, statement_counter) == [1, 0]
+
+
+def test_zero_ttl_disables_cache(app, admin, statement_counter):
+    app.config['USER_CACHE_TTL'] = 0
+    assert statements_per_load(admin.id, statement_counter) == [1, 1]
+
+
+def test_invalidation_during_load_is_not_overwritten(app, admin, statement_counter, monkeypatch):
+    app.config['USER_CACHE_TTL'] = 30
+    get = db.session.get
+
+    def get_then_invalidate(model, identity):
+        instance = get(model, identity)
+        # 查询返回后、写回缓存前，其他请求提交了对该用户的修改
+        invalidate_identity(model, identity)
+        return instance
+
+    admin_id = admin.id
+    db.session.expunge_all()
+    monkeypatch.setattr(db.session, 'get', get_then_invalidate)
+    load_identity(AdminUser, admin_id)
+    monkeypatch.undo()
+    # 查询期间读到的旧数据不会被之后的请求当作缓存读到
+    assert statements_per_load(admin_id, statement_counter) == [1, 0]
@@ -0,0 +1,48 @@
+import os
+import time
+import pytest
+from shared_models import Inspiration, Reflection, db
+
+
+def add_inspirations(start, count):
+    # 每隔一条启发内容带一条或多条感想
+    for number in range(start, start + count):
+        inspiration = Inspiration(type='text', content=f'启发 {number}')
+        db.session.add(inspiration)
+        db.session.flush()
+        db.session.add_all([Reflection(content='感想', inspiration_id=inspiration.id)
+                            for _ in range(number % 2 * (number % 3 + 1))])
+    db.session.commit()
+
+
+def test_has_reflections_matches_relationship(list_page):
+    add_inspirations(0, 12)
+    body, _ = list_page('/api/admin/inspirations')
+
+    # 与原来逐条加载 reflections 关系得到的结果一致
+    expected = {inspiration.id: bool(inspiration.reflections) for inspiration in Inspiration.query}
+    assert {item['id']: item['has_reflections'] for item in body['data']} == expected
+    assert any(expected.values()) and not all(expected.values())
+
+
+def test_has_reflections_query_count_is_constant(assert_constant_list_queries):
+    assert_constant_list_queries('/api/admin/inspirations', add_inspirations, 'data')
+
+
+@pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason='设置 RUN_BENCHMARKS=1 运行性能基准')
+def test_benchmark_has_reflections(list_page):
+    # 感想数可用 BENCHMARK_REFLECTIONS 调整，集中在少数启发内容上
+    count = int(os.environ.get('BENCHMARK_REFLECTIONS', 5000))
+    add_inspirations(0, 50)
+    inspiration_ids = [inspiration.id for inspiration in Inspiration.query.filter(Inspiration.id % 5 == 0)]
+    db.session.execute(Reflection.__table__.insert(), [
+        {'content': '感想', 'inspiration_id': inspiration_ids[number % len(inspiration_ids)]} for number in range(count)])
+    db.session.commit()
+
+    _, statements = list_page('/api/admin/inspirations')
+    started = time.perf_counter()
+    for _ in range(20):
+        body, repeated = list_page('/api/admin/inspirations')
+    per_request_ms = (time.perf_counter() - started) / 20 * 1000
+    assert repeated == statements and len(body['data']) == 50
+    print(f'\n{count} reflections: {statements} statement(s), {per_request_ms:.1f} ms per list request')
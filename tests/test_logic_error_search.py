@@ -0,0 +1,46 @@
+import pytest
+from logic_error_search import logic_error_index
+from search_utils import InvertedIndex, tokenize
+from shared_models import LogicError, db
+
+
+@pytest.fixture
+def logic_errors(app):
+    db.session.add_all([
+        LogicError(name='偷换概念', term='equivocation', description='在论证中改变词语的含义', example='...'),
+        LogicError(name='稻草人谬误', term='straw man', description='歪曲对方的观点再加以反驳', example='...'),
+    ])
+    db.session.commit()
+    logic_error_index.built = False
+    yield
+    logic_error_index.built = False
+
+
+def test_tokenize_unigrams_only_for_index():
+    assert tokenize('概念') == ['概念']
+    assert tokenize('概念', unigrams=True) == ['概念', '概', '念']
+
+
+@pytest.mark.parametrize('query', ['念', '偷', '换概', '偷换概念'])
+def test_single_and_multi_character_queries(query):
+    index = InvertedIndex({'name': 1.0})
+    index.add(1, {'name': '偷换概念'})
+    index.add(2, {'name': '稻草人谬误'})
+    assert [doc_id for doc_id, _ in index.search(query)] == [1]
+
+
+def test_search_endpoint_finds_single_character(client, logic_errors):
+    response = client.get('/api/logic_errors_page', query_string={'search': '念'})
+    assert [item['name'] for item in response.get_json()['data']] == ['偷换概念']
+
+
+def test_index_reloads_after_ttl(app, logic_errors):
+    assert len(logic_error_index.search('稻草人')) == 1
+    # 模拟其他 worker 直接修改了数据库，本进程的索引未收到增量更新
+    LogicError.query.filter_by(term='straw man').update({'name': '人身攻击'})
+    db.session.commit()
+    assert len(logic_error_index.search('稻草人')) == 1
+
+    app.config['SEARCH_INDEX_TTL'] = 0
+    assert logic_error_index.search('稻草人') == []
+    assert [record['name'] for record in logic_error_index.search('人身攻击')] == ['人身攻击']
@@ -0,0 +1,120 @@
+import json
+import pytest
+from logic_errors import SUMMARY_LENGTH, validate_analysis_table
+from shared_models import AnalysisContent, AnalysisData, db
+
+
+def add_analysis(content, data_count):
+    analysis = AnalysisContent(user_id=1, content=content)
+    db.session.add(analysis)
+    db.session.flush()
+    db.session.add_all([AnalysisData(analysis_content_id=analysis.id, facts=[f'事实 {number}'],
+                                     opinion=f'观点 {number}', error='偷换概念') for number in range(data_count)])
+    db.session.commit()
+    return analysis.id
+
+
+@pytest.mark.parametrize('query', [{'page': 1}, {'cursor': ''}])
+def test_analysis_list_truncates_summary_in_sql(client, statement_counter, query):
+    long_content = '长' * (SUMMARY_LENGTH * 10)
+    add_analysis(long_content, 1)
+    add_analysis('短内容', 1)
+
+    with statement_counter() as statements:
+        response = client.get('/api/get_paged_analyses', query_string=query)
+    assert response.status_code == 200
+    summaries = {item['content'] for item in response.get_json()['data']}
+    assert summaries == {'长' * SUMMARY_LENGTH + '...', '短内容'}
+
+    # 完整的 content 不出现在查询列中，只取截断后的摘要
+    selects = [statement for statement in statements if 'FROM analysis_content' in statement]
+    assert selects and all('substr(analysis_content.content' in statement for statement in selects)
+    assert not any('analysis_content.content AS' in statement for statement in selects)
+
+
+def test_analysis_detail_loads_data_in_one_statement(client, statement_counter):
+    few_id = add_analysis('少量分析数据', 1)
+    many_id = add_analysis('大量分析数据', 20)
+
+    with statement_counter() as statements:
+        few = client.get(f'/api/analysis/{few_id}').get_json()['data']
+    few_count = len(statements)
+    with statement_counter() as statements:
+        many = client.get(f'/api/analysis/{many_id}').get_json()['data']
+
+    assert len(few['data']) == 1
+    assert [item['opinion'] for item in many['data']] == [f'观点 {number}' for number in range(20)]
+    assert many['data'][0] == {'facts': ['事实 0'], 'opinion': '观点 0', 'error': '偷换概念'}
+    # 分析数据随内容一次 JOIN 取出，语句数与分析数据条数无关
+    assert len(statements) == few_count == 1
+    assert 'JOIN analysis_data' in statements[0]
+
+
+def test_analysis_detail_not_found(client):
+    assert client.get('/api/analysis/404').status_code == 404
+
+
+@pytest.mark.parametrize('analysis_table, message', [
+    ({'error': {'name': '偷换概念'}}, 'analysisTable must be a list'),
+    (['偷换概念'], 'analysisTable[0] must be an object'),
+    ([{'facts': [], 'error': {}}], 'analysisTable[0].error.name is required'),
+    ([{'error': {'name': ''}}], 'analysisTable[0].error.name is required'),
+    ([{'error': '偷换概念'}], 'analysisTable[0].error.name is required'),
+    ([{'error': {'name': '偷换概念'}}, {'facts': '事实', 'error': {'name': '稻草人'}}], 'analysisTable[1].facts must be a list'),
+    ([{'opinion': ['观点'], 'error': {'name': '偷换概念'}}], 'analysisTable[0].opinion must be a string'),
+    ([{'error': {'name': '谬' * 256}}], 'analysisTable[0].error.name is too long'),
+])
+def test_validate_analysis_table_rejects_invalid_items(app, analysis_table, message):
+    assert validate_analysis_table(analysis_table) == (None, message)
+
+
+def test_validate_analysis_table_builds_rows(app):
+    rows, error = validate_analysis_table([
+        {'facts': ['事实'], 'opinion': '观点', 'error': {'name': '偷换概念', 'term': 'equivocation'}},
+        {'error': {'name': '稻草人'}},
+    ])
+    assert error is None
+    assert rows == [{'facts': ['事实'], 'opinion': '观点', 'error': '偷换概念'},
+                    {'facts': None, 'opinion': None, 'error': '稻草人'}]
+
+
+def test_save_analysis_inserts_data_with_executemany(client, login, execution_recorder):
+    analysis_table = [{'facts': [f'事实 {number}'], 'opinion': f'观点 {number}', 'error': {'name': '偷换概念'}}
+                      for number in range(10)]
+    with execution_recorder() as executions:
+        response = client.post('/api/save_fact_opinion_analysis',
+                               json={'content': '待分析的内容', 'analysisTable': analysis_table})
+    assert response.status_code == 200
+
+    inserts = [execution for execution in executions if execution.statement.startswith('INSERT INTO analysis_data')]
+    assert len(inserts) == 1 and inserts[0].executemany
+    analysis = AnalysisContent.query.one()
+    assert [(data.facts, data.opinion, data.error) for data in analysis.analysis_data] == [
+        ([f'事实 {number}'], f'观点 {number}', '偷换概念') for number in range(10)]
+
+
+def test_save_analysis_rejects_invalid_table_before_writing(client, login, statement_counter):
+    with statement_counter() as statements:
+        response = client.post('/api/save_fact_opinion_analysis', json={
+            'content': '待分析的内容', 'analysisTable': [{'facts': ['事实'], 'error': {'term': 'equivocation'}}]})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'analysisTable[0].error.name is required'
+    assert not any(statement.startswith('INSERT') for statement in statements)
+    assert AnalysisContent.query.count() == 0
+
+
+def test_migrate_facts_decodes_legacy_rows(app):
+    analysis_id = add_analysis('历史数据', 0)
+    facts = [['事实 1', '事实 2'], json.dumps(['事实 3']), json.dumps({'事实': 4}), '不是 JSON 的文本', None]
+    db.session.execute(AnalysisData.__table__.insert(), [
+        {'analysis_content_id': analysis_id, 'facts': value, 'error': '偷换概念'} for value in facts])
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['logic_errors', 'migrate-facts'])
+    assert result.exit_code == 0
+    assert '2 analysis_data row(s) migrated' in result.output
+    db.session.expire_all()
+    assert [data.facts for data in AnalysisData.query.order_by(AnalysisData.id)] == [
+        ['事实 1', '事实 2'], ['事实 3'], {'事实': 4}, '不是 JSON 的文本', None]
+    # 迁移后再次执行没有需要处理的行
+    assert '0 analysis_data row(s) migrated' in app.test_cli_runner().invoke(args=['logic_errors', 'migrate-facts']).output
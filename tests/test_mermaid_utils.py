@@ -0,0 +1,35 @@
+import pytest
+import mermaid_utils
+from mermaid_utils import MermaidRenderer
+
+
+@pytest.fixture
+def failing_renderer(monkeypatch):
+    # mmdc 不存在时每个任务都会失败
+    monkeypatch.setattr(mermaid_utils, 'MMDC_PATH', '/nonexistent/mmdc')
+    renderer = MermaidRenderer(workers=2)
+    return renderer
+
+
+def render_all(renderer, count):
+    futures = [renderer.submit(f'graph TD; A{index}-->B', 'svg') for index in range(count)]
+    # 等待工作线程退出，确保完成回调都已执行
+    renderer.executor.shutdown(wait=True)
+    return [job_id for job_id, _ in futures]
+
+
+def test_failed_jobs_are_capped(failing_renderer, monkeypatch):
+    monkeypatch.setattr(mermaid_utils, 'MAX_FAILED_JOBS', 5)
+    job_ids = render_all(failing_renderer, 20)
+    assert len(failing_renderer.jobs) <= 5
+    assert failing_renderer.jobs.keys() == failing_renderer.failed_at.keys()
+    # 最近的失败仍可查询
+    assert failing_renderer.status(job_ids[-1], 'svg')['status'] == 'failed'
+
+
+def test_failed_jobs_expire(failing_renderer, monkeypatch):
+    job_ids = render_all(failing_renderer, 3)
+    assert failing_renderer.status(job_ids[0], 'svg')['status'] == 'failed'
+    monkeypatch.setattr(mermaid_utils, 'FAILED_JOB_TTL', 0)
+    assert failing_renderer.status(job_ids[0], 'svg') is None
+    assert failing_renderer.jobs == {} and failing_renderer.failed_at == {}
@@ -0,0 +1,138 @@
+import subprocess
+import sys
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+from minio.error import S3Error
+import minio_utils
+
+
+def not_found(name):
+    return S3Error(None, 'NoSuchKey', 'Object does not exist', name, 'request', 'host')
+
+
+class MissingObjectClient:
+    """所有对象都不存在的客户端"""
+
+    def stat_object(self, bucket, name):
+        raise not_found(name)
+
+
+def test_import_does_not_load_minio():
+    code = 'import sys, minio_utils; print("minio" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=minio_utils.__file__.rsplit('/', 1)[0],
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+
+def test_s3_error_caught_before_client_initializes(client, monkeypatch):
+    monkeypatch.setattr(minio_utils, 'minio_client', MissingObjectClient())
+    response = client.get('/files/article/missing.pdf')
+    assert response.status_code == 404
+
+
+def test_thumbnail_of_missing_object_is_not_scheduled(client, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(minio_utils, 'minio_client', MissingObjectClient())
+    monkeypatch.setattr(minio_utils, 'schedule_derivatives', scheduled.append)
+    response = client.get('/files/article/missing.png?w=128')
+    assert response.status_code == 404
+    assert scheduled == []
+
+
+class OriginalOnlyClient:
+    """只有原图、还没有缩略图的客户端"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def stat_object(self, bucket, name):
+        if name.startswith(minio_utils.DERIVED_PREFIX):
+            raise not_found(name)
+        return SimpleNamespace(size=len(self.data), etag='etag', last_modified=None, content_type='image/png')
+
+    def get_object(self, bucket, name, offset=0, length=0):
+        data = self.data
+        return SimpleNamespace(stream=lambda chunk_size: iter([data]), close=lambda: None, release_conn=lambda: None)
+
+
+def test_thumbnail_miss_serves_original_and_schedules(client, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(minio_utils, 'minio_client', OriginalOnlyClient(b'png-bytes'))
+    monkeypatch.setattr(minio_utils, 'schedule_derivatives', scheduled.append)
+    response = client.get('/files/article/a.png?w=128')
+    assert response.status_code == 200
+    assert response.data == b'png-bytes'
+    assert scheduled == ['article/a.png']
+
+
+class RecordingClient:
+    """返回固定内容的客户端，记录 get_object 的参数和连接释放次数"""
+
+    def __init__(self, data):
+        self.data = data
+        self.requests = []
+        self.released = 0
+
+    def stat_object(self, bucket, name):
+        return SimpleNamespace(size=len(self.data), etag='etag-1', content_type='text/plain',
+                               last_modified=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def get_object(self, bucket, name, offset=0, length=0):
+        self.requests.append((offset, length))
+        data = self.data[offset:offset + length] if length else self.data[offset:]
+        client = self
+
+        def release_conn():
+            client.released += 1
+        return SimpleNamespace(stream=lambda chunk_size: iter([data]), close=lambda: None, release_conn=release_conn)
+
+
+@pytest.fixture
+def recording_client(monkeypatch):
+    fake = RecordingClient(b'0123456789')
+    monkeypatch.setattr(minio_utils, 'minio_client', fake)
+    return fake
+
+
+@pytest.mark.parametrize('method', ['GET', 'HEAD'])
+def test_connection_released_even_without_reading_body(client, recording_client, method):
+    response = client.open('/files/article/a.txt', method=method)
+    assert response.status_code == 200
+    assert response.headers['Content-Length'] == '10'
+    response.close()
+    assert recording_client.released == 1
+
+
+def test_range_request_returns_partial_content(client, recording_client):
+    response = client.get('/files/article/a.txt', headers={'Range': 'bytes=2-5'})
+    assert response.status_code == 206
+    assert response.data == b'2345'
+    assert response.headers['Content-Range'] == 'bytes 2-5/10'
+    assert recording_client.requests == [(2, 4)]
+    response.close()
+    assert recording_client.released == 1
+
+
+def test_unsatisfiable_range_returns_416(client, recording_client):
+    response = client.get('/files/article/a.txt', headers={'Range': 'bytes=20-30'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */10'
+    assert recording_client.requests == []
+
+
+def test_stale_if_range_returns_full_content(client, recording_client):
+    response = client.get('/files/article/a.txt', headers={'Range': 'bytes=2-5', 'If-Range': '"other"'})
+    assert response.status_code == 200
+    assert response.data == b'0123456789'
+
+
+@pytest.mark.parametrize('headers', [
+    {'If-None-Match': '"etag-1"'},
+    {'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'},
+])
+def test_conditional_request_returns_304(client, recording_client, headers):
+    response = client.get('/files/article/a.txt', headers=headers)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == '"etag-1"'
+    assert recording_client.requests == []
@@ -0,0 +1,43 @@
+import pytest
+from pagination_utils import MAX_PAGE_SIZE, PageSizeError, keyset_paginate, offset_cursor_page
+from shared_models import PlatformArticle, db
+
+
+@pytest.fixture
+def articles(app):
+    db.session.add_all([PlatformArticle(title=f'文章 {number}', content='', author='a', tags='', keywords='')
+                        for number in range(3)])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('limit', [0, -1, MAX_PAGE_SIZE + 1])
+def test_keyset_paginate_rejects_invalid_limit(articles, limit):
+    with pytest.raises(PageSizeError):
+        keyset_paginate(PlatformArticle.query, [(PlatformArticle.created_at, True), (PlatformArticle.id, True)], limit=limit)
+    with pytest.raises(PageSizeError):
+        offset_cursor_page([1, 2, 3], '', limit)
+
+
+def test_keyset_paginate_accepts_bounds(articles):
+    page = keyset_paginate(PlatformArticle.query, [(PlatformArticle.id, True)], limit=1)
+    assert len(page.items) == 1 and page.has_more
+    page = keyset_paginate(PlatformArticle.query, [(PlatformArticle.id, True)], limit=MAX_PAGE_SIZE)
+    assert len(page.items) == 3 and not page.has_more
+
+
+@pytest.mark.parametrize('path, size_arg', [
+    ('/checklists', 'page_size'),
+    ('/platform_checklists', 'page_size'),
+    ('/api/admin/users', 'per_page'),
+])
+@pytest.mark.parametrize('size', [0, -5, MAX_PAGE_SIZE + 1])
+def test_cursor_endpoints_return_400_for_invalid_page_size(client, login, path, size_arg, size):
+    response = client.get(path, query_string={'cursor': '', size_arg: size})
+    assert response.status_code == 400
+    assert 'Page size' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('query', [{'cursor': ''}, {'page': 1}])
+def test_article_search_returns_400_for_invalid_page_size(client, login, query):
+    response = client.get('/articles', query_string={'search': '决策', 'page_size': 0, **query})
+    assert response.status_code == 400
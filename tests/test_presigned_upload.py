@@ -0,0 +1,111 @@
+import base64
+import json
+import time
+from types import SimpleNamespace
+import pytest
+from minio import Minio
+import minio_utils
+
+
+@pytest.fixture
+def presigned_mode(app):
+    app.config['MINIO_PRESIGNED_MODE'] = True
+
+
+def test_presign_signs_size_and_content_type(client, presigned_mode, monkeypatch):
+    # 指定 region 后生成策略不需要访问 MinIO
+    monkeypatch.setattr(minio_utils, 'minio_client', Minio(
+        minio_utils.MINIO_ENDPOINT, access_key='minioadmin', secret_key='minioadmin',
+        secure=False, region='us-east-1'))
+    response = client.post('/upload/presign', json={'type': 'feedback', 'filename': 'report.pdf'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['method'] == 'POST'
+    assert body['fields']['key'] == body['filename']
+    assert body['fields']['Content-Type'] == 'application/pdf'
+
+    policy = json.loads(base64.b64decode(body['fields']['policy']))
+    conditions = policy['conditions']
+    assert ['eq', '$key', body['filename']] in conditions
+    assert ['eq', '$Content-Type', 'application/pdf'] in conditions
+    assert ['content-length-range', 1, minio_utils.ALLOWED_TYPES['feedback']['max_size']] in conditions
+
+
+def test_presign_rejects_disallowed_extension(client, presigned_mode):
+    response = client.post('/upload/presign', json={'type': 'avatar', 'filename': 'a.pdf'})
+    assert response.status_code == 400
+
+
+class FakeClient:
+    def __init__(self, size, content_type):
+        self.stat = SimpleNamespace(size=size, content_type=content_type)
+        self.removed = []
+
+    def stat_object(self, bucket, name):
+        return self.stat
+
+    def remove_object(self, bucket, name):
+        self.removed.append(name)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    def install(size=1024, content_type='image/png'):
+        fake = FakeClient(size, content_type)
+        monkeypatch.setattr(minio_utils, 'minio_client', fake)
+        monkeypatch.setattr(minio_utils, 'schedule_derivatives', lambda object_path: None)
+        return fake
+    return install
+
+
+def issue_token(app, filename):
+    with app.test_request_context():
+        return minio_utils.upload_token_serializer().dumps({'key': filename})
+
+
+@pytest.mark.parametrize('size, content_type, status', [
+    (1024, 'image/png', 200),
+    (minio_utils.MAX_FILE_SIZE + 1, 'image/png', 413),
+    (1024, 'text/html', 400),
+])
+def test_complete_rechecks_object(app, client, presigned_mode, fake_client, size, content_type, status):
+    fake = fake_client(size, content_type)
+    filename = 'avatar/1_a_0123456789abcdef.png'
+    response = client.post('/upload/complete', json={'filename': filename,
+                                                     'upload_token': issue_token(app, filename)})
+    assert response.status_code == status
+    assert fake.removed == ([] if status == 200 else [filename])
+
+
+@pytest.mark.parametrize('token_for', [None, 'avatar/1_other_0123456789abcdef.png'])
+def test_complete_requires_matching_token(app, client, presigned_mode, fake_client, token_for):
+    # 没有凭证或凭证签发给其他对象时，不读取也不删除请求中的对象（如 /upload 写入的旧对象）
+    fake = fake_client(size=minio_utils.MAX_FILE_SIZE + 1, content_type='text/html')
+    body = {'filename': 'avatar/1_a.png'}
+    if token_for:
+        body['upload_token'] = issue_token(app, token_for)
+    response = client.post('/upload/complete', json=body)
+    assert response.status_code == 403
+    assert fake.removed == []
+
+
+def test_complete_rejects_expired_token(app, client, presigned_mode, fake_client, monkeypatch):
+    fake = fake_client(content_type='text/html')
+    filename = 'avatar/1_a_0123456789abcdef.png'
+    token = issue_token(app, filename)
+    expired = time.time() + 2 * minio_utils.PRESIGNED_URL_EXPIRES.total_seconds() + 60
+    monkeypatch.setattr(time, 'time', lambda: expired)
+    response = client.post('/upload/complete', json={'filename': filename, 'upload_token': token})
+    assert response.status_code == 403
+    assert fake.removed == []
+
+
+def test_presign_issues_token_for_unique_key(client, presigned_mode, monkeypatch):
+    monkeypatch.setattr(minio_utils, 'minio_client', Minio(
+        minio_utils.MINIO_ENDPOINT, access_key='minioadmin', secret_key='minioadmin',
+        secure=False, region='us-east-1'))
+    first, second = [client.post('/upload/presign', json={'type': 'avatar', 'filename': 'a.png'}).get_json()
+                     for _ in range(2)]
+    # 同一秒内同名文件也得到不同的对象名
+    assert first['filename'] != second['filename']
+    assert first['upload_token'] != second['upload_token']
@@ -0,0 +1,68 @@
+import pytest
+from shared_models import PlatformChecklist, PlatformChecklistQuestion, db
+from question_tree import QuestionTreeError, write_question_tree
+
+
+def make_tree(size):
+    """每个选择题带两个子问题，子问题通过 parentTempId 和 followUpQuestions 关联"""
+    items = []
+    for index in range(0, size, 3):
+        items.append({'tempId': f't{index}', 'type': 'choice', 'question': f'Q{index}',
+                      'options': ['a', 'b'],
+                      'followUpQuestions': {'0': [f't{index + 1}'], '1': f't{index + 2}'}})
+        for child in (index + 1, index + 2):
+            items.append({'tempId': f't{child}', 'question': f'Q{child}', 'parentTempId': f't{index}'})
+    return items[:size]
+
+
+def new_checklist():
+    checklist = PlatformChecklist(user_id=1, name='tree', version=1)
+    db.session.add(checklist)
+    db.session.flush()
+    return checklist
+
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'correlation-key'])
+@pytest.mark.parametrize('size', [3, 30, 300])
+def test_write_question_tree_touches_only_linked_rows(app, execution_recorder, monkeypatch, size, returning):
+    # 关闭 RETURNING 时走按 insert_key 回查的路径（MySQL 的情况）
+    monkeypatch.setattr(db.engine.dialect, 'insert_returning', returning)
+    checklist = new_checklist()
+    # 问题树之外再加一些没有任何关系的独立问题
+    items = make_tree(size) + [{'tempId': f'plain{n}', 'question': f'P{n}'} for n in range(size // 3)]
+    with execution_recorder() as executions:
+        id_mapping = write_question_tree(checklist.id, items)
+    db.session.commit()
+    assert len(id_mapping) == len(items)
+
+    # 不使用 executemany（pymysql 会把 UPDATE executemany 拆成逐行执行）
+    assert not any(execution.executemany for execution in executions)
+    updates = [execution for execution in executions if execution.statement.startswith('UPDATE')]
+    clear_keys, link_update = updates
+    # 一条按前缀清空关联键，影响本批全部问题
+    assert 'insert_key LIKE' in clear_keys.statement and clear_keys.rowcount == len(items)
+    # 一条 CASE UPDATE 只回写有关系的问题：每个选择题的 follow-up 和每个子问题的 parent_id
+    linked = sum(1 for item in items if 'parentTempId' in item or item.get('followUpQuestions'))
+    assert 'CASE' in link_update.statement and link_update.rowcount == linked == size
+
+    questions = {q.id: q for q in PlatformChecklistQuestion.query.filter_by(checklist_id=checklist.id)}
+    root = questions[id_mapping['t0']]
+    assert root.follow_up_questions == {'0': [id_mapping['t1']], '1': [id_mapping['t2']]}
+    assert questions[id_mapping['t1']].parent_id == root.id
+    assert all(q.insert_key is None for q in questions.values())
+
+
+def test_questions_without_links_skip_link_update(app, execution_recorder):
+    checklist = new_checklist()
+    with execution_recorder() as executions:
+        write_question_tree(checklist.id, [{'tempId': n, 'question': f'Q{n}'} for n in range(5)])
+    assert not any('CASE' in execution.statement for execution in executions)
+    assert PlatformChecklistQuestion.query.filter_by(checklist_id=checklist.id, parent_id=None).count() == 5
+
+
+def test_write_question_tree_rejects_before_writing(app, statement_counter):
+    checklist = new_checklist()
+    with statement_counter() as statements:
+        with pytest.raises(QuestionTreeError):
+            write_question_tree(checklist.id, [{'tempId': 1, 'question': 'ok'}, {'tempId': 2, 'question': ''}])
+    assert statements == []
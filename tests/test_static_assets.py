@@ -0,0 +1,92 @@
+import gzip
+import os
+import pytest
+from static_assets import IMMUTABLE_CACHE_CONTROL, MEMORY_MAX_SIZE, REVALIDATE_CACHE_CONTROL, static_assets
+
+INDEX_HTML = b'<!doctype html><div id="root"></div>' + b'<script src="/static/js/main.3f2a1b9c.js"></script>' * 40
+MAIN_JS = b'console.log("decision");\n' * 200
+
+
+@pytest.fixture
+def build(app, tmp_path):
+    root = tmp_path / 'build'
+    (root / 'static' / 'js').mkdir(parents=True)
+    (root / 'index.html').write_bytes(INDEX_HTML)
+    (root / 'static' / 'js' / 'main.3f2a1b9c.js').write_bytes(MAIN_JS)
+    (tmp_path / 'secret.txt').write_bytes(b'secret')
+    # 清单是进程级的，按本测试的构建目录同步重建
+    static_assets.assets = {}
+    static_assets.build(app)
+    return root
+
+
+def test_gzip_negotiation(client, build):
+    response = client.get('/static/js/main.3f2a1b9c.js', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == MAIN_JS
+
+    response = client.get('/static/js/main.3f2a1b9c.js', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == MAIN_JS
+
+
+def test_brotli_preferred_over_gzip(client, build):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/static/js/main.3f2a1b9c.js', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == MAIN_JS
+
+
+def test_etag_per_encoding_and_not_modified(client, build):
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    plain_etag, compressed_etag = plain.headers['ETag'], compressed.headers['ETag']
+    assert plain_etag != compressed_etag
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': compressed_etag})
+    assert response.status_code == 304
+    # 另一种编码的 ETag 不能匹配本次响应
+    response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain_etag})
+    assert response.status_code == 200
+
+
+def test_cache_control(client, build):
+    assert client.get('/static/js/main.3f2a1b9c.js').headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+    assert client.get('/').headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+    # 前端路由回落到 index.html，同样需要每次确认
+    assert client.get('/settings/profile').headers['Cache-Control'] == REVALIDATE_CACHE_CONTROL
+
+
+def test_index_reloads_when_mtime_changes(client, build):
+    etag = client.get('/').headers['ETag']
+    index = build / 'index.html'
+    index.write_bytes(b'<!doctype html><p>rebuilt</p>')
+    stat = os.stat(index)
+    os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.data == b'<!doctype html><p>rebuilt</p>'
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('path', ['/static/../secret.txt', '/%2e%2e/secret.txt', '/static/..%2f..%2fsecret.txt',
+                                  '/images/%2e%2e/%2e%2e/secret.txt'])
+def test_path_traversal_is_rejected(client, build, path):
+    response = client.get(path, headers={'Accept-Encoding': 'identity'})
+    assert b'secret' not in response.data
+    assert response.status_code == 404 or response.data == INDEX_HTML
+    assert static_assets.get('../secret.txt') is None
+
+
+def test_missing_fingerprinted_file_returns_not_found(client, build):
+    # 超过 MEMORY_MAX_SIZE 且不压缩的文件从磁盘发送
+    image = build / 'static' / 'media' / 'photo.6ce24c58023cc2f8.png'
+    image.parent.mkdir()
+    image.write_bytes(b'\x89PNG' + b'\x00' * MEMORY_MAX_SIZE)
+    assert client.get('/static/media/photo.6ce24c58023cc2f8.png').status_code == 200
+
+    image.unlink()
+    assert client.get('/static/media/photo.6ce24c58023cc2f8.png').status_code == 404
+    assert 'static/media/photo.6ce24c58023cc2f8.png' not in static_assets.assets
@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import pytest
+import pytz
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql
+from shared_models import Article, DailyCount, RollupState, User, db
+from statistics_rollup import ensure_fresh, refresh_entity, rollup_total
+from statistics_trend import build_trend, trend_buckets
+
+TIMEZONES = ['UTC', 'Asia/Shanghai', 'America/New_York', 'Asia/Kolkata']
+
+
+def add_users(moments):
+    db.session.add_all([User(username=f'user{number}', email=f'user{number}@example.com', password_hash='x',
+                             created_at=moment) for number, moment in enumerate(moments)])
+    db.session.commit()
+
+
+@contextmanager
+def capture_queries(engine):
+    """记录代码块内执行的 SQLAlchemy 语句对象，以便再按其他方言编译"""
+    queries = []
+
+    def before_execute(conn, clauseelement, multiparams, params, execution_options):
+        queries.append(clauseelement)
+
+    event.listen(engine, 'before_execute', before_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_execute', before_execute)
+
+
+def compile_mysql(query):
+    return str(query.compile(dialect=mysql.dialect()))
+
+
+def expected_trend(moments, buckets):
+    """不经过数据库，直接按区间的 UTC 边界数出每个区间的记录数"""
+    return [(start_day, sum(start_at <= moment < end_at for moment in moments))
+            for start_day, _, start_at, end_at in buckets]
+
+
+def expected_daily(moments, tz, before):
+    counts = {}
+    for moment in moments:
+        day = pytz.utc.localize(moment).astimezone(tz).date()
+        if day < before:
+            counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+@pytest.fixture
+def recent_users(app):
+    # 覆盖 UTC 零点前后及各时区零点附近的时刻，最近一条在几分钟前（尚未汇总的今天）
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    moments = [now - timedelta(days=days, hours=hours, minutes=minutes)
+               for days in range(0, 40, 3) for hours in (0, 5, 8, 13, 16, 19) for minutes in (5, 35)]
+    add_users(moments)
+    return moments
+
+
+@pytest.mark.parametrize('granularity', ['day', 'week'])
+@pytest.mark.parametrize('business_tz', TIMEZONES)
+@pytest.mark.parametrize('requested_tz', TIMEZONES)
+def test_trend_matches_raw_counts(app, recent_users, statement_counter, business_tz, requested_tz, granularity):
+    app.config['STATISTICS_TIMEZONE'] = business_tz
+    tz = pytz.timezone(requested_tz)
+    ensure_fresh('users')
+
+    with statement_counter() as statements:
+        trend = build_trend('users', 30, granularity, tz)
+    assert trend == expected_trend(recent_users, trend_buckets(30, granularity, tz))
+    # 请求业务时区时读取 daily_counts，不再扫描原表的整个时间范围
+    used_rollups = any('daily_counts' in statement for statement in statements)
+    assert used_rollups == (requested_tz == business_tz or {requested_tz, business_tz} == {'UTC'})
+    assert rollup_total('users') == len(recent_users)
+
+
+@pytest.mark.parametrize('business_tz, moments', [
+    # 美东 2025-03-09 07:00 UTC 开始夏令时，2025-11-02 06:00 UTC 结束
+    ('America/New_York', [datetime(2025, 3, 9, hour, 30) for hour in range(3, 9)]
+                         + [datetime(2025, 11, 2, hour, 30) for hour in range(2, 8)]),
+    # 偏移不是整小时的时区按分钟换算
+    ('Asia/Kathmandu', [datetime(2025, 3, 8, 18, minute) for minute in range(0, 60, 5)]),
+    ('Asia/Kolkata', [datetime(2025, 3, 8, 18, minute) for minute in range(0, 60, 5)]),
+])
+def test_rollups_use_business_timezone_days(app, business_tz, moments):
+    app.config['STATISTICS_TIMEZONE'] = business_tz
+    add_users(moments)
+    today = date(2025, 11, 5)
+    refresh_entity('users', full=True, today=today)
+
+    rollups = {row.day: row.count for row in DailyCount.query.filter_by(entity='users')}
+    assert rollups == expected_daily(moments, pytz.timezone(business_tz), today)
+    assert db.session.get(RollupState, 'users').total == len(moments)
+
+
+def test_timezone_change_rebuilds_rollups(app):
+    # UTC 16:30 在上海已是第二天
+    moment = datetime.utcnow().replace(hour=16, minute=30) - timedelta(days=3)
+    add_users([moment])
+    app.config['STATISTICS_TIMEZONE'] = 'UTC'
+    ensure_fresh('users')
+    assert [row.day for row in DailyCount.query.filter_by(entity='users')] == [moment.date()]
+
+    app.config['STATISTICS_TIMEZONE'] = 'Asia/Shanghai'
+    state = ensure_fresh('users')
+    assert state.timezone == 'Asia/Shanghai'
+    assert [row.day for row in DailyCount.query.filter_by(entity='users')] == [moment.date() + timedelta(days=1)]
+
+
+SINGLE_SERIES = ['users', 'articles', 'checklists', 'checklist_decisions', 'ahp_data', 'balanced_decision_data']
+
+
+def test_dashboard_matches_single_series_endpoints(client, login, recent_users):
+    db.session.add_all([Article(title=f'文章 {number}', content='...', author='a', created_at=moment)
+                        for number, moment in enumerate(recent_users[::5])])
+    db.session.commit()
+    query = {'days': 30, 'granularity': 'week', 'tz': 'Asia/Shanghai'}
+
+    response = client.get('/api/statistics/dashboard', query_string=query)
+    assert response.status_code == 200
+    dashboard = response.get_json()
+    assert set(dashboard) == set(SINGLE_SERIES)
+    for name in SINGLE_SERIES:
+        assert dashboard[name] == client.get(f'/api/statistics/{name}', query_string=query).get_json(), name
+    assert dashboard['users']['total_users'] == len(recent_users)
+    assert dashboard['articles']['total_articles'] == len(recent_users[::5])
+
+
+@pytest.mark.parametrize('series, expected', [
+    ('users', {'users'}),
+    ('articles,users', {'articles', 'users'}),
+    # 重复传参与逗号分隔等价，重复的序列只返回一次
+    (['ahp_data', 'users, ahp_data'], {'ahp_data', 'users'}),
+])
+def test_dashboard_series_selection(client, login, series, expected):
+    response = client.get('/api/statistics/dashboard', query_string={'series': series})
+    assert response.status_code == 200
+    assert set(response.get_json()) == expected
+
+
+def test_dashboard_rejects_unknown_series(client, login):
+    response = client.get('/api/statistics/dashboard', query_string={'series': 'users,reviews'})
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == 'Unknown series: reviews'
+    assert body['allowed_series'] == SINGLE_SERIES
+
+
+@pytest.mark.parametrize('requested_tz', ['Asia/Shanghai', 'America/New_York'])
+def test_trend_queries_compile_for_mysql(app, recent_users, requested_tz):
+    app.config['STATISTICS_TIMEZONE'] = 'Asia/Shanghai'
+    ensure_fresh('users')
+    with capture_queries(db.engine) as queries:
+        build_trend('users', 30, 'day', pytz.timezone(requested_tz))
+    statements = [compile_mysql(query) for query in queries]
+    trend = next(statement for statement in statements if 'calendar' in statement)
+
+    # MySQL 中日历派生表的列显式转换为日期类型；SQLite 中保持原值
+    assert 'CAST(%s AS DATE) AS start_day' in trend
+    assert 'CAST(%s AS DATETIME) AS start_at' in trend
+    assert 'CAST(' not in str(next(query for query in queries if 'calendar' in str(query)).compile(db.engine))
+    if requested_tz == 'Asia/Shanghai':
+        assert 'daily_counts.day >= calendar.start_day' in trend
+    else:
+        # 按 created_at 的范围 JOIN 原表，可以使用 created_at 索引
+        assert 'user.created_at >= calendar.start_at AND user.created_at < calendar.end_at' in trend
+
+
+@pytest.mark.parametrize('business_tz, group_by', [
+    ('UTC', 'GROUP BY date(user.created_at)'),
+    ('Asia/Shanghai', 'GROUP BY date(user.created_at), EXTRACT(hour FROM user.created_at)'),
+    ('Asia/Kathmandu', 'GROUP BY date(user.created_at), EXTRACT(hour FROM user.created_at), '
+                       'EXTRACT(minute FROM user.created_at)'),
+])
+def test_rollup_queries_compile_for_mysql(app, business_tz, group_by):
+    app.config['STATISTICS_TIMEZONE'] = business_tz
+    add_users([datetime(2025, 3, 8, 18, 30)])
+    with capture_queries(db.engine) as queries:
+        refresh_entity('users', full=True, today=date(2025, 3, 10))
+    counts = next(compile_mysql(query) for query in queries if 'count(user.id)' in compile_mysql(query))
+
+    # 过滤条件直接比较 created_at，不对列套函数；SELECT 与 GROUP BY 的列一致（ONLY_FULL_GROUP_BY）
+    assert 'WHERE user.created_at >= %s AND user.created_at < %s' in counts
+    assert counts.endswith(group_by)
+    columns = counts[:counts.index('\nFROM')]
+    assert all(f'{expression} AS' in columns for expression in group_by[len('GROUP BY '):].split(', '))
+
+
+def test_refresh_rollups_command(app, recent_users):
+    result = app.test_cli_runner().invoke(args=['statistics', 'refresh-rollups', '--full'])
+    assert result.exit_code == 0
+    assert 'users: ' in result.output and 'balanced_decisions: ' in result.output
+    assert db.session.get(RollupState, 'users').refreshed_through is not None
+    assert rollup_total('users') == len(recent_users)
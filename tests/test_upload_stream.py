@@ -0,0 +1,91 @@
+import io
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+import minio_utils
+from minio_utils import LimitedUploadStream, UPLOAD_METRICS
+
+
+class CountingStream(io.BytesIO):
+    """记录实际从底层流读取了多少字节"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.consumed += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = super().readline(size)
+        self.consumed += len(data)
+        return data
+
+
+def test_limited_stream_reads_at_most_limit_plus_one():
+    source = CountingStream(b'x' * 10_000)
+    stream = LimitedUploadStream(source, 1000)
+    with pytest.raises(RequestEntityTooLarge):
+        while stream.read(4096):
+            pass
+    assert source.consumed == 1001
+
+
+def test_limited_stream_passes_small_bodies():
+    stream = LimitedUploadStream(CountingStream(b'line\n' * 10), 1000)
+    assert b''.join(stream) == b'line\n' * 10
+
+
+class RecordingClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def put_object(self, bucket, name, stream, size, content_type=None, **kwargs):
+        if self.fail:
+            raise OSError('connection reset')
+        self.calls.append((name, stream.read(), kwargs))
+
+
+@pytest.fixture
+def recording_client(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(minio_utils, 'minio_client', client)
+    monkeypatch.setattr(minio_utils, 'schedule_derivatives', lambda object_path: None)
+    # 每个测试从零开始统计
+    monkeypatch.setattr(minio_utils, 'UPLOAD_METRICS', {
+        mode: {'count': 0, 'bytes': 0, 'seconds': 0.0, 'failures': 0} for mode in UPLOAD_METRICS
+    })
+    return client
+
+
+def test_upload_under_limit_records_metrics(client, recording_client):
+    response = client.post('/upload?type=article', data={
+        'type': 'article', 'file': (io.BytesIO(b'png' * 100), 'a.png')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert recording_client.calls[0][1] == b'png' * 100
+    metrics = client.get('/upload/metrics').get_json()
+    assert metrics['single']['count'] == 1 and metrics['single']['bytes'] == 300
+
+
+def test_upload_over_limit_is_rejected_without_storing(client, recording_client, monkeypatch):
+    monkeypatch.setitem(minio_utils.ALLOWED_TYPES, 'article', {'prefix': 'article/', 'max_size': 1024})
+    response = client.post('/upload?type=article', data={
+        'type': 'article', 'file': (io.BytesIO(b'x' * 200_000), 'a.png')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert recording_client.calls == []
+    assert client.get('/upload/metrics').get_json()['single']['count'] == 0
+
+
+def test_large_upload_uses_multipart_and_failures_are_counted(recording_client):
+    minio_utils.upload_stream('feedback/big.pdf', io.BytesIO(b'x' * (minio_utils.MULTIPART_THRESHOLD + 1)))
+    assert recording_client.calls[0][2]['num_parallel_uploads'] == minio_utils.MULTIPART_PARALLELISM
+    assert minio_utils.UPLOAD_METRICS['multipart']['count'] == 1
+
+    recording_client.fail = True
+    with pytest.raises(OSError):
+        minio_utils.upload_stream('feedback/small.pdf', io.BytesIO(b'x'))
+    assert minio_utils.UPLOAD_METRICS['single']['failures'] == 1